@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import operator
+
 from oslo_config import cfg
 from oslo_log import log as logging
 from six import iteritems
@@ -133,7 +135,11 @@ def get_sorts(request, attr_info):
         msg = _("The number of sort_keys and sort_dirs must be same")
         raise exc.HTTPBadRequest(explanation=msg)
     valid_dirs = [constants.SORT_DIRECTION_ASC, constants.SORT_DIRECTION_DESC]
-    absent_keys = [x for x in sort_keys if x not in attr_info]
+    # a resource marking its sort keys is only sorted by those, they are
+    # the indexed columns of its table
+    valid_keys = ([key for (key, info) in iteritems(attr_info)
+                   if info.get('is_sort_key')] or attr_info)
+    absent_keys = [x for x in sort_keys if x not in valid_keys]
     if absent_keys:
         msg = _("%s is invalid attribute for sort_keys") % absent_keys
         raise exc.HTTPBadRequest(explanation=msg)
@@ -154,6 +160,11 @@ def get_page_reverse(request):
     return data.lower() == "true"
 
 
+def get_detail(request):
+    data = request.GET.get('detail', 'False')
+    return data.lower() == "true"
+
+
 def get_pagination_links(request, items, limit,
                          marker, page_reverse, key="id"):
     key = key if key else 'id'
@@ -269,13 +280,12 @@ class SortingEmulatedHelper(SortingHelper):
                 fields_to_add.append(key)
 
     def sort(self, items):
-        def cmp_func(obj1, obj2):
-            for key, direction in self.sort_dict:
-                ret = cmp(obj1[key], obj2[key])
-                if ret:
-                    return ret * (1 if direction else -1)
-            return 0
-        return sorted(items, cmp=cmp_func)
+        # sorts are stable, so sorting by the least significant key first
+        # gives the order of all the keys
+        for key, direction in reversed(list(self.sort_dict)):
+            items = sorted(items, key=operator.itemgetter(key),
+                           reverse=not direction)
+        return items
 
 
 class SortingNativeHelper(SortingHelper):
@@ -17,6 +17,7 @@ import netaddr
 from six import iteritems
 import webob.exc
 
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from tacker.api import api_common
@@ -62,6 +63,14 @@ class Controller(object):
         self._native_sorting = self._is_native_sorting_supported()
         self._policy_attrs = [name for (name, info) in self._attr_info.items()
                               if info.get('required_by_policy')]
+        # attributes marked is_detail are left out of list responses unless
+        # they are asked for with ?detail=true or ?fields=
+        self._list_fields = None
+        if any(info.get('is_detail') for info in self._attr_info.values()):
+            self._list_fields = [name for (name, info)
+                                 in self._attr_info.items()
+                                 if info.get('is_visible') and
+                                 not info.get('is_detail')]
         self._notifier = n_rpc.get_notifier('nfv')
         self._member_actions = member_actions
         self._primary_key = self._get_primary_key()
@@ -210,9 +219,13 @@ class Controller(object):
         # plugin before returning.
         original_fields, fields_to_add = self._do_field_list(
             api_common.list_args(request, 'fields'))
+        if (not original_fields and self._list_fields and
+                not api_common.get_detail(request)):
+            original_fields = list(self._list_fields)
         filters = api_common.get_filters(request, self._attr_info,
                                          ['fields', 'sort_key', 'sort_dir',
-                                          'limit', 'marker', 'page_reverse'])
+                                          'limit', 'marker', 'page_reverse',
+                                          'detail'])
         kwargs = {'filters': filters,
                   'fields': original_fields}
         sorting_helper = self._get_sorting_helper(request)
@@ -272,11 +285,17 @@ class Controller(object):
             policy.enforce(request.context, action, obj)
         return obj
 
+    @staticmethod
+    def _use_slave(request, actions):
+        if cfg.CONF.api_slave_reads in actions:
+            request.context.use_slave = True
+
     def index(self, request, **kwargs):
         """Returns a list of the requested entity."""
         parent_id = kwargs.get(self._parent_id_name)
         # Ensure policy engine is initialized
         policy.init()
+        self._use_slave(request, ('list', 'all'))
         return self._items(request, True, parent_id)
 
     def show(self, request, id, **kwargs):
@@ -290,6 +309,7 @@ class Controller(object):
             parent_id = kwargs.get(self._parent_id_name)
             # Ensure policy engine is initialized
             policy.init()
+            self._use_slave(request, ('all', ))
             return {self._resource:
                     self._view(request.context,
                                self._item(request,
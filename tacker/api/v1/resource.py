@@ -20,6 +20,7 @@ Utility methods for working with WSGI servers redux
 import sys
 
 import netaddr
+from oslo_config import cfg
 from oslo_log import log as logging
 import six
 import webob.dec
@@ -27,6 +28,7 @@ import webob.exc
 
 from tacker.api.v1 import attributes
 from tacker.common import exceptions
+from tacker.db import api as db_api
 from tacker.openstack.common import gettextutils
 from tacker import wsgi
 
@@ -144,9 +146,16 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
             content_type = ''
             body = None
 
-        return webob.Response(request=request, status=status,
-                              content_type=content_type,
-                              body=body)
+        response = webob.Response(request=request, status=status,
+                                  content_type=content_type,
+                                  body=body)
+        if cfg.CONF.sql_instrumentation.enabled:
+            statements, seconds = db_api.pop_request_stats(
+                request.context.request_id)
+            if cfg.CONF.debug:
+                response.headers['X-DB-Statements'] = str(statements)
+                response.headers['X-DB-Time'] = '%.3f' % seconds
+        return response
     return resource
 
 
@@ -37,7 +37,8 @@ def build_plural_mappings(special_mappings, resource_map):
 
 def build_resource_info(plural_mappings, resource_map, which_service,
                         action_map=None,
-                        translate_name=False, allow_bulk=False):
+                        translate_name=False, allow_bulk=False,
+                        allow_pagination=None, allow_sorting=None):
     """Build resources for advanced services.
 
     Takes the resource information, and singular/plural mappings, and creates
@@ -55,11 +56,19 @@ def build_resource_info(plural_mappings, resource_map, which_service,
     :param action_map: custom resource actions
     :param translate_name: replaces underscores with dashes
     :param allow_bulk: True if bulk create are allowed
+    :param allow_pagination: False to not paginate the resources, defaults to
+                             the allow_pagination option
+    :param allow_sorting: False to not sort the resources, defaults to the
+                          allow_sorting option
     """
     resources = []
     if not which_service:
         which_service = constants.CORE
     action_map = action_map or {}
+    if allow_pagination is None:
+        allow_pagination = cfg.CONF.allow_pagination
+    if allow_sorting is None:
+        allow_sorting = cfg.CONF.allow_sorting
     plugin = manager.TackerManager.get_service_plugins()[which_service]
     for collection_name in resource_map:
         resource_name = plural_mappings[collection_name]
@@ -71,8 +80,8 @@ def build_resource_info(plural_mappings, resource_map, which_service,
             collection_name, resource_name, plugin, params,
             member_actions=member_actions,
             allow_bulk=allow_bulk,
-            allow_pagination=cfg.CONF.allow_pagination,
-            allow_sorting=cfg.CONF.allow_sorting)
+            allow_pagination=allow_pagination,
+            allow_sorting=allow_sorting)
         resource = extensions.ResourceExtension(
             collection_name,
             controller,
@@ -56,6 +56,13 @@ core_opts = [
                help=_("The maximum number of items returned in a single "
                       "response, value was 'infinite' or negative integer "
                       "means no limit")),
+    cfg.StrOpt('api_slave_reads', default='none',
+               choices=['none', 'list', 'all'],
+               help=_("GET requests served by the [database] "
+                      "slave_connection, lagging behind the changes made "
+                      "on the main database. 'list' reads listings from the "
+                      "slave and shows from the main database, 'all' reads "
+                      "both from the slave")),
     cfg.StrOpt('host', default=utils.get_hostname(),
                help=_("The hostname Tacker is running on")),
     cfg.StrOpt('nova_url',
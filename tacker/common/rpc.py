@@ -78,6 +78,15 @@ def get_notifier(service=None, host=None, publisher_id=None):
     return NOTIFIER.prepare(publisher_id=publisher_id)
 
 
+def get_notification_listener(targets, endpoints, executor='eventlet',
+                              pool=None):
+    assert TRANSPORT is not None
+    return oslo_messaging.get_notification_listener(TRANSPORT, targets,
+                                                    endpoints,
+                                                    executor=executor,
+                                                    pool=pool)
+
+
 class PluginRpcSerializer(om_serializer.Serializer):
     """Serializer.
 
@@ -153,10 +153,14 @@ class ContextBase(oslo_context.RequestContext):
 
 
 class Context(ContextBase):
+    # set on contexts that only read, before their session is used, so that
+    # they are served by the slave database
+    use_slave = False
+
     @property
     def session(self):
         if self._session is None:
-            self._session = db_api.get_session()
+            self._session = db_api.get_session(use_slave=self.use_slave)
         return self._session
 
 
@@ -13,17 +13,49 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import time
+
 from oslo_config import cfg
 from oslo_db.sqlalchemy import enginefacade
 from oslo_log import log as logging
+import sqlalchemy
+
+from tacker.i18n import _LW
+from tacker.openstack.common import local
 
 
 LOG = logging.getLogger(__name__)
+OPTS = [
+    cfg.BoolOpt('enabled', default=False,
+                help=_("Count the SQL statements and the time spent in the "
+                       "database per API request. With debug enabled the "
+                       "totals are returned as the X-DB-Statements and "
+                       "X-DB-Time response headers")),
+    cfg.FloatOpt('slow_query_threshold', default=1.0,
+                 help=_("Log the statements taking longer than that many "
+                        "seconds, without their parameters. 0 disables the "
+                        "log")),
+    cfg.IntOpt('report_interval', default=300,
+               help=_("Log the statements, database time and slow "
+                      "statements of the process at most every that many "
+                      "seconds. 0 disables the report")),
+]
+cfg.CONF.register_opts(OPTS, group='sql_instrumentation')
 
 context_manager = enginefacade.transaction_context()
 
 _FACADE = None
 
+# requests whose statistics were not popped, dropped oldest first
+REQUEST_STATS_SIZE = 1024
+# request id -> [statements, seconds] of the requests in flight
+_request_stats = collections.OrderedDict()
+# statements, seconds and slow statements over all requests
+_totals = collections.Counter()
+# time the totals were last logged
+_reported_at = time.time()
+
 
 def _create_facade_lazily():
     global _FACADE
@@ -31,18 +63,96 @@ def _create_facade_lazily():
     if _FACADE is None:
         context_manager.configure(sqlite_fk=True, **cfg.CONF.database)
         _FACADE = context_manager._factory.get_legacy_facade()
+        if cfg.CONF.sql_instrumentation.enabled:
+            # the slave engine is the main one without a slave_connection
+            for engine in set([_FACADE.get_engine(),
+                               _FACADE.get_engine(use_slave=True)]):
+                _instrument(engine)
 
     return _FACADE
 
 
-def get_engine():
+def _instrument(engine):
+    sqlalchemy.event.listen(engine, 'before_cursor_execute',
+                            _before_cursor_execute)
+    sqlalchemy.event.listen(engine, 'after_cursor_execute',
+                            _after_cursor_execute)
+
+
+# the start time is kept on the execution context of the statement, a
+# statement that fails never reaches after_cursor_execute and its context is
+# dropped with it. Statements run without a context, like the defaults
+# fetched while compiling an insert, are not counted.
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context._tacker_statement_start = time.time()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    global _reported_at
+
+    start = getattr(context, '_tacker_statement_start', None)
+    if start is None:
+        return
+    now = time.time()
+    elapsed = now - start
+    _totals['statements'] += 1
+    _totals['seconds'] += elapsed
+
+    # the context of the request is the last one created in this thread
+    request_context = getattr(local.store, 'context', None)
+    request_id = request_context and request_context.request_id
+    if request_id:
+        stats = _request_stats.get(request_id)
+        if stats is None:
+            stats = _request_stats[request_id] = [0, 0.0]
+            while len(_request_stats) > REQUEST_STATS_SIZE:
+                _request_stats.popitem(last=False)
+        stats[0] += 1
+        stats[1] += elapsed
+
+    threshold = cfg.CONF.sql_instrumentation.slow_query_threshold
+    if threshold and elapsed >= threshold:
+        _totals['slow_statements'] += 1
+        LOG.warning(_LW('slow statement of request %(request_id)s took '
+                        '%(elapsed).3fs: %(statement)s'),
+                    {'request_id': request_id, 'elapsed': elapsed,
+                     'statement': statement})
+
+    interval = cfg.CONF.sql_instrumentation.report_interval
+    if interval and now - _reported_at >= interval:
+        _reported_at = now
+        LOG.info(_('%(statements)d SQL statements took %(seconds).3fs in '
+                   'the database, %(slow_statements)d of them were slow'),
+                 get_stats())
+
+
+def pop_request_stats(request_id):
+    """Return the statements and seconds in the database of a request."""
+    return tuple(_request_stats.pop(request_id, (0, 0.0)))
+
+
+def get_stats():
+    """Return the statements, seconds and slow statements of all requests."""
+    return dict(statements=_totals['statements'],
+                seconds=_totals['seconds'],
+                slow_statements=_totals['slow_statements'])
+
+
+def get_engine(use_slave=False):
     """Helper method to grab engine."""
     facade = _create_facade_lazily()
-    return facade.get_engine()
+    return facade.get_engine(use_slave=use_slave)
+
 
+def get_session(autocommit=True, expire_on_commit=False, use_slave=False):
+    """Helper method to grab session.
 
-def get_session(autocommit=True, expire_on_commit=False):
-    """Helper method to grab session."""
+    :param use_slave: read from the slave_connection database, falls back to
+                      the main database when no slave_connection is set
+    """
     facade = _create_facade_lazily()
-    return facade.get_session(autocommit=autocommit,
+    return facade.get_session(use_slave=use_slave, autocommit=autocommit,
                               expire_on_commit=expire_on_commit)
@@ -120,8 +120,10 @@ class CommonDbMixin(object):
             tenant_id = context.tenant_id
         return tenant_id
 
-    def _get_by_id(self, context, model, id):
+    def _get_by_id(self, context, model, id, options=None):
         query = self._model_query(context, model)
+        if options:
+            query = query.options(*options)
         return query.filter(model.id == id).one()
 
     def _apply_filters_to_query(self, query, model, filters):
@@ -155,9 +157,13 @@ class CommonDbMixin(object):
 
     def _get_collection_query(self, context, model, filters=None,
                               sorts=None, limit=None, marker_obj=None,
-                              page_reverse=False):
+                              page_reverse=False, options=None):
         collection = self._model_query(context, model)
         collection = self._apply_filters_to_query(collection, model, filters)
+        if options:
+            # loader options, so that building the dicts of the collection
+            # does not load the relationships of every item one by one
+            collection = collection.options(*options)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
         collection = sqlalchemyutils.paginate_query(collection, model, limit,
@@ -167,12 +173,13 @@ class CommonDbMixin(object):
 
     def _get_collection(self, context, model, dict_func, filters=None,
                         fields=None, sorts=None, limit=None, marker_obj=None,
-                        page_reverse=False):
+                        page_reverse=False, options=None):
         query = self._get_collection_query(context, model, filters=filters,
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
-                                           page_reverse=page_reverse)
+                                           page_reverse=page_reverse,
+                                           options=options)
         items = [dict_func(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
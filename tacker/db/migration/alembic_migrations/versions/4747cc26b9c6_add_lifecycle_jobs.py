@@ -0,0 +1,51 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add lifecyclejobs table
+
+Revision ID: 4747cc26b9c6
+Revises: 22f5385a3d3f
+Create Date: 2016-07-04 10:12:41.185307
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4747cc26b9c6'
+down_revision = '22f5385a3d3f'
+
+from alembic import op
+import sqlalchemy as sa
+
+from tacker.db import types
+
+
+def upgrade(active_plugins=None, options=None):
+    op.create_table(
+        'lifecyclejobs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('device_id', sa.String(length=36), nullable=False),
+        sa.Column('action', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=64), nullable=False),
+        sa.Column('payload', types.Json, nullable=True),
+        sa.Column('owner', sa.String(length=255), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_engine='InnoDB'
+    )
+    op.create_index('ix_lifecyclejobs_device_id', 'lifecyclejobs',
+                    ['device_id'])
+    op.create_index('ix_lifecyclejobs_status', 'lifecyclejobs', ['status'])
@@ -0,0 +1,34 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add updated_at to device
+
+Revision ID: a5d8e2c47b19
+Revises: f3a9c7e21d54
+Create Date: 2016-08-02 09:47:15.208364
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a5d8e2c47b19'
+down_revision = 'f3a9c7e21d54'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('devices', sa.Column('updated_at', sa.DateTime(),
+                                       nullable=True))
@@ -0,0 +1,35 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add tenant_id indexes for paginated listings
+
+Revision ID: a5f0e8d3b912
+Revises: c2f9a6d85e31
+Create Date: 2016-07-18 11:05:27.561930
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a5f0e8d3b912'
+down_revision = 'c2f9a6d85e31'
+
+from alembic import op
+
+
+def upgrade(active_plugins=None, options=None):
+    # the pages of a non admin listing are scoped to its tenant and ordered
+    # by id, which the secondary index carries along with tenant_id
+    for table in ('devices', 'devicetemplates', 'vims'):
+        op.create_index('ix_%s_tenant_id' % table, table, ['tenant_id'])
@@ -0,0 +1,60 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Store device and template attributes as json
+
+Revision ID: c2f9a6d85e31
+Revises: d7e41b9a2f53
+Create Date: 2016-07-14 09:32:51.208645
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c2f9a6d85e31'
+down_revision = 'd7e41b9a2f53'
+
+import collections
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+def _migrate_attributes(table, attributes_table, fk_column):
+    # all the attributes of a row are in one document now, a vnfd or a heat
+    # template alone may exceed the 64k of a mysql TEXT
+    op.add_column(table, sa.Column(
+        'attributes', sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+        nullable=True))
+
+    meta = sa.MetaData(bind=op.get_bind())
+    t = sa.Table(table, meta, autoload=True)
+    attributes_t = sa.Table(attributes_table, meta, autoload=True)
+    attributes = collections.defaultdict(dict)
+    for r in attributes_t.select().execute():
+        attributes[getattr(r, fk_column)][r.key] = r.value
+
+    op.execute(t.update().values(attributes=json.dumps({})))
+    for row_id, values in attributes.items():
+        op.execute(t.update().where(t.c.id == row_id).values(
+            attributes=json.dumps(values)))
+    op.drop_table(attributes_table)
+
+
+def upgrade(active_plugins=None, options=None):
+    _migrate_attributes('devices', 'deviceattributes', 'device_id')
+    _migrate_attributes('devicetemplates', 'devicetemplateattributes',
+                        'template_id')
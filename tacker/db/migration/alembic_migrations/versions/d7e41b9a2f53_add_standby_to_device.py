@@ -0,0 +1,35 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add standby to device
+
+Revision ID: d7e41b9a2f53
+Revises: 4747cc26b9c6
+Create Date: 2016-07-11 14:21:09.736512
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd7e41b9a2f53'
+down_revision = '4747cc26b9c6'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('devices', sa.Column('standby', sa.Boolean(),
+                                       server_default=sa.sql.false(),
+                                       nullable=False))
@@ -0,0 +1,35 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add indexes for the sort keys of listings
+
+Revision ID: e3b6d1f04a27
+Revises: a5f0e8d3b912
+Create Date: 2016-07-19 16:42:10.318274
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e3b6d1f04a27'
+down_revision = 'a5f0e8d3b912'
+
+from alembic import op
+
+
+def upgrade(active_plugins=None, options=None):
+    op.create_index('ix_devices_name', 'devices', ['name'])
+    op.create_index('ix_devices_status', 'devices', ['status'])
+    op.create_index('ix_devicetemplates_name', 'devicetemplates', ['name'])
+    op.create_index('ix_vims_name', 'vims', ['name'])
@@ -0,0 +1,37 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add indexes for device, service type and VIM auth lookups
+
+Revision ID: f3a9c7e21d54
+Revises: e3b6d1f04a27
+Create Date: 2016-07-21 10:05:37.614920
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c7e21d54'
+down_revision = 'e3b6d1f04a27'
+
+from alembic import op
+
+
+def upgrade(active_plugins=None, options=None):
+    op.create_index('ix_devices_vim_id', 'devices', ['vim_id'])
+    op.create_index('ix_devices_template_id_vim_id', 'devices',
+                    ['template_id', 'vim_id'])
+    op.create_index('ix_servicetypes_template_id', 'servicetypes',
+                    ['template_id'])
+    op.create_index('ix_vimauths_vim_id', 'vimauths', ['vim_id'])
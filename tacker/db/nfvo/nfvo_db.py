@@ -38,8 +38,10 @@ VIM_AUTH_ATTRIBUTES = ('auth_url', 'vim_project', 'password', 'auth_cred')
 
 
 class Vim(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
+    # listings are scoped to the tenant
+    tenant_id = sa.Column(sa.String(64), nullable=False, index=True)
     type = sa.Column(sa.String(64), nullable=False)
-    name = sa.Column(sa.String(255), nullable=False)
+    name = sa.Column(sa.String(255), nullable=False, index=True)
     description = sa.Column(sa.Text, nullable=True)
     placement_attr = sa.Column(types.Json, nullable=True)
     shared = sa.Column(sa.Boolean, default=True, server_default=sql.true(
@@ -50,7 +52,7 @@ class Vim(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
 
 class VimAuth(model_base.BASE, models_v1.HasId):
     vim_id = sa.Column(types.Uuid, sa.ForeignKey('vims.id'),
-                       nullable=False)
+                       nullable=False, index=True)
     password = sa.Column(sa.String(128), nullable=False)
     auth_url = sa.Column(sa.String(255), nullable=False)
     vim_project = sa.Column(types.Json, nullable=False)
@@ -137,9 +139,19 @@ class NfvoPluginDb(nfvo.NFVOPluginBase, db_base.CommonDbMixin):
         vim_db = self._get_resource(context, Vim, vim_id)
         return self._make_vim_dict(vim_db, mask_password=mask_password)
 
-    def get_vims(self, context, filters=None, fields=None):
+    # the marker of a page of vims
+    def _get_vim_db(self, context, vim_id):
+        return self._get_resource(context, Vim, vim_id)
+
+    def get_vims(self, context, filters=None, fields=None, sorts=None,
+                 limit=None, marker=None, page_reverse=False):
+        marker_obj = self._get_marker_obj(context, 'vim_db', limit, marker)
         return self._get_collection(context, Vim, self._make_vim_dict,
-                                    filters=filters, fields=fields)
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse,
+                                    options=[orm.subqueryload(Vim.vim_auth)])
 
     def update_vim(self, context, vim_id, vim):
         with context.session.begin(subtransactions=True):
@@ -157,12 +169,14 @@ class NfvoPluginDb(nfvo.NFVOPluginBase, db_base.CommonDbMixin):
 
     def update_vim_status(self, context, vim_id, status):
         with context.session.begin(subtransactions=True):
-            try:
-                vim_db = (self._model_query(context, Vim).filter(
-                    Vim.id == vim_id).with_lockmode('update').one())
-            except orm_exc.NoResultFound:
-                    raise nfvo.VimNotFoundException(vim_id=vim_id)
-            vim_db.update({'status': status})
+            updated = (self._model_query(context, Vim).
+                       filter(Vim.id == vim_id).
+                       update({'status': status}, synchronize_session=False))
+            if not updated:
+                raise nfvo.VimNotFoundException(vim_id=vim_id)
+            vim_db = (self._model_query(context, Vim).populate_existing().
+                      options(orm.subqueryload(Vim.vim_auth)).
+                      filter(Vim.id == vim_id).one())
         return self._make_vim_dict(vim_db)
 
     def get_vim_by_name(self, context, vim_name, fields=None,
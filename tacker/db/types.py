@@ -15,6 +15,7 @@
 import json
 import uuid
 
+from sqlalchemy.dialects import mysql
 from sqlalchemy.types import String
 from sqlalchemy.types import Text
 from sqlalchemy.types import TypeDecorator
@@ -47,3 +48,12 @@ class Json(TypeDecorator):
         if value is None:
             return None
         return json.loads(value)
+
+
+class MediumJson(Json):
+    """Json stored as MEDIUMTEXT on mysql, beyond the 64k of a TEXT."""
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'mysql':
+            return dialect.type_descriptor(mysql.MEDIUMTEXT())
+        return dialect.type_descriptor(Text())
@@ -0,0 +1,147 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+import uuid
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+import sqlalchemy as sa
+
+from tacker.db import db_base
+from tacker.db import model_base
+from tacker.db import models_v1
+from tacker.db import types
+
+LOG = logging.getLogger(__name__)
+
+JOB_PENDING = 'PENDING'
+JOB_RUNNING = 'RUNNING'
+
+
+class LifecycleJob(model_base.BASE, models_v1.HasId):
+    """Represents a durable step of a device lifecycle operation.
+
+    A job is claimed by a worker by taking a lease on it. A worker that
+    dies leaves an expired lease behind, so the job can be claimed again
+    by any tacker-server process sharing the database.
+    """
+    device_id = sa.Column(types.Uuid, nullable=False, index=True)
+    # name of the handler registered with the lifecycle executor
+    action = sa.Column(sa.String(64), nullable=False)
+    status = sa.Column(sa.String(64), nullable=False, index=True)
+    # handler specific arguments. Never contains decrypted vim auth.
+    payload = sa.Column(types.Json, nullable=True)
+    owner = sa.Column(sa.String(255), nullable=True)
+    lease_expires_at = sa.Column(sa.DateTime, nullable=True)
+    attempts = sa.Column(sa.Integer, nullable=False, default=0)
+    created_at = sa.Column(sa.DateTime, nullable=False)
+
+
+class LifecycleJobDbMixin(db_base.CommonDbMixin):
+
+    @staticmethod
+    def _make_job_dict(job_db):
+        key_list = ('id', 'device_id', 'action', 'status', 'payload',
+                    'owner', 'lease_expires_at', 'attempts')
+        return dict((key, job_db[key]) for key in key_list)
+
+    def _create_job(self, context, device_id, action, payload=None):
+        with context.session.begin(subtransactions=True):
+            job_db = LifecycleJob(id=str(uuid.uuid4()),
+                                  device_id=device_id,
+                                  action=action,
+                                  status=JOB_PENDING,
+                                  payload=payload or {},
+                                  owner=None,
+                                  lease_expires_at=None,
+                                  attempts=0,
+                                  created_at=timeutils.utcnow())
+            context.session.add(job_db)
+        return self._make_job_dict(job_db)
+
+    def _claim_job(self, context, job_id, owner, lease_time):
+        """Take the lease of a job unless another worker holds it.
+
+        The claim is a single conditional UPDATE so that concurrent
+        workers, possibly in other processes, can race on the same job
+        and only one of them wins.
+        """
+        now = timeutils.utcnow()
+        with context.session.begin(subtransactions=True):
+            claimed = (
+                context.session.query(LifecycleJob).
+                filter(LifecycleJob.id == job_id).
+                filter(sa.or_(LifecycleJob.status == JOB_PENDING,
+                              LifecycleJob.lease_expires_at < now)).
+                update({'status': JOB_RUNNING,
+                        'owner': owner,
+                        'lease_expires_at':
+                        now + datetime.timedelta(seconds=lease_time),
+                        'attempts': LifecycleJob.attempts + 1},
+                       synchronize_session=False))
+        if not claimed:
+            return None
+        job_db = (context.session.query(LifecycleJob).
+                  populate_existing().get(job_id))
+        return self._make_job_dict(job_db)
+
+    def _renew_job_lease(self, context, job_id, owner, lease_time):
+        expires_at = (timeutils.utcnow() +
+                      datetime.timedelta(seconds=lease_time))
+        with context.session.begin(subtransactions=True):
+            return (context.session.query(LifecycleJob).
+                    filter(LifecycleJob.id == job_id).
+                    filter(LifecycleJob.owner == owner).
+                    update({'lease_expires_at': expires_at},
+                           synchronize_session=False))
+
+    def _release_job(self, context, job_id, owner):
+        with context.session.begin(subtransactions=True):
+            (context.session.query(LifecycleJob).
+             filter(LifecycleJob.id == job_id).
+             filter(LifecycleJob.owner == owner).
+             update({'status': JOB_PENDING, 'owner': None,
+                     'lease_expires_at': None},
+                    synchronize_session=False))
+
+    def _delete_job(self, context, job_id):
+        with context.session.begin(subtransactions=True):
+            (context.session.query(LifecycleJob).
+             filter(LifecycleJob.id == job_id).
+             delete(synchronize_session=False))
+
+    def _get_claimable_job_ids(self, context, grace_time, limit):
+        """Return ids of jobs nobody is working on.
+
+        Pending jobs are left to the process that submitted them for
+        grace_time seconds before other workers are allowed to pick them.
+        """
+        now = timeutils.utcnow()
+        pending_before = now - datetime.timedelta(seconds=grace_time)
+        query = (context.session.query(LifecycleJob.id).
+                 filter(sa.or_(
+                     sa.and_(LifecycleJob.status == JOB_PENDING,
+                             LifecycleJob.created_at < pending_before),
+                     sa.and_(LifecycleJob.status == JOB_RUNNING,
+                             LifecycleJob.lease_expires_at < now))).
+                 order_by(LifecycleJob.created_at).
+                 limit(limit))
+        return [job_id for (job_id, ) in query]
+
+    def _get_jobs_by_device(self, context, device_ids):
+        if not device_ids:
+            return []
+        query = (context.session.query(LifecycleJob).
+                 populate_existing().
+                 filter(LifecycleJob.device_id.in_(device_ids)))
+        return [self._make_job_dict(job_db) for job_db in query]
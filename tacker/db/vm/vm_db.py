@@ -17,9 +17,11 @@
 import uuid
 
 from oslo_log import log as logging
+from oslo_utils import timeutils
 import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import exc as orm_exc
+from sqlalchemy import sql
 
 from tacker.api.v1 import attributes
 from tacker import context as t_context
@@ -45,8 +47,11 @@ CREATE_STATES = (constants.PENDING_CREATE, constants.DEAD)
 class DeviceTemplate(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
     """Represents template to create hosting device."""
 
+    # listings are scoped to the tenant
+    tenant_id = sa.Column(sa.String(64), nullable=False, index=True)
+
     # Descriptive name
-    name = sa.Column(sa.String(255), nullable=False)
+    name = sa.Column(sa.String(255), nullable=False, index=True)
     description = sa.Column(sa.Text)
 
     # service type that this service vm provides.
@@ -60,9 +65,9 @@ class DeviceTemplate(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
     # driver to communicate with service managment
     mgmt_driver = sa.Column(sa.String(255))
 
-    # (key, value) pair to spin up
-    attributes = orm.relationship('DeviceTemplateAttribute',
-                                  backref='template')
+    # (key, value) pairs to spin up as one json document, e.g. the vnfd.
+    # The interpretation is up to the actual driver of hosting device.
+    attributes = sa.Column(types.MediumJson, nullable=True)
 
 
 class ServiceType(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
@@ -72,33 +77,22 @@ class ServiceType(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
     relationship.
     """
     template_id = sa.Column(types.Uuid, sa.ForeignKey('devicetemplates.id'),
-                            nullable=False)
+                            nullable=False, index=True)
     service_type = sa.Column(sa.String(64), nullable=False)
 
 
-class DeviceTemplateAttribute(model_base.BASE, models_v1.HasId):
-    """Represents attributes necessary for spinning up VM in (key, value) pair
-
-    key value pair is adopted for being agnostic to actuall manager of VMs
-    like nova, heat or others. e.g. image-id, flavor-id for Nova.
-    The interpretation is up to actual driver of hosting device.
-    """
-    template_id = sa.Column(types.Uuid, sa.ForeignKey('devicetemplates.id'),
-                            nullable=False)
-    key = sa.Column(sa.String(255), nullable=False)
-    value = sa.Column(sa.TEXT(65535), nullable=True)
-
-
 class Device(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
     """Represents devices that hosts services.
 
     Here the term, 'VM', is intentionally avoided because it can be
     VM or other container.
     """
+    # listings are scoped to the tenant
+    tenant_id = sa.Column(sa.String(64), nullable=False, index=True)
     template_id = sa.Column(types.Uuid, sa.ForeignKey('devicetemplates.id'))
     template = orm.relationship('DeviceTemplate')
 
-    name = sa.Column(sa.String(255), nullable=False)
+    name = sa.Column(sa.String(255), nullable=False, index=True)
     description = sa.Column(sa.Text, nullable=True)
 
     # sufficient information to uniquely identify hosting device.
@@ -109,28 +103,68 @@ class Device(model_base.BASE, models_v1.HasId, models_v1.HasTenant):
     # opaque string.
     # e.g. (driver, mgmt_url) = (ssh, ip address), ...
     mgmt_url = sa.Column(sa.String(255), nullable=True)
-    attributes = orm.relationship("DeviceAttribute", backref="device")
 
-    status = sa.Column(sa.String(64), nullable=False)
-    vim_id = sa.Column(types.Uuid, sa.ForeignKey('vims.id'), nullable=False)
+    # kwargs necessary for spinning up VM as one json document of
+    # (key, value) pairs. e.g. image-id, flavor-id for Nova.
+    attributes = sa.Column(types.MediumJson, nullable=True)
+
+    status = sa.Column(sa.String(64), nullable=False, index=True)
+    vim_id = sa.Column(types.Uuid, sa.ForeignKey('vims.id'), nullable=False,
+                       index=True)
     placement_attr = sa.Column(types.Json, nullable=True)
     vim = orm.relationship('Vim')
     error_reason = sa.Column(sa.Text, nullable=True)
+    updated_at = sa.Column(sa.DateTime, nullable=True,
+                           default=timeutils.utcnow,
+                           onupdate=timeutils.utcnow)
+
+    # pre-instantiated device of a standby pool not handed out yet
+    standby = sa.Column(sa.Boolean, nullable=False, default=False,
+                        server_default=sql.false())
 
+    # devices of a template, and the standby devices of a template on a vim
+    __table_args__ = (sa.Index('ix_devices_template_id_vim_id',
+                               'template_id', 'vim_id'),
+                      model_base.BASE.__table_args__)
 
-class DeviceAttribute(model_base.BASE, models_v1.HasId):
-    """Represents kwargs necessary for spinning up VM in (key, value) pair.
 
-    key value pair is adopted for being agnostic to actuall manager of VMs
-    like nova, heat or others. e.g. image-id, flavor-id for Nova.
-    The interpretation is up to actual driver of hosting device.
+# load the relationships of a listing with one query per relationship
+TEMPLATE_LOAD_OPTIONS = (orm.subqueryload(DeviceTemplate.service_types), )
+DEVICE_LOAD_OPTIONS = (
+    orm.joinedload(Device.template).subqueryload(
+        DeviceTemplate.service_types), )
+
+# the columns making up the dicts of templates and devices
+TEMPLATE_COLUMNS = ('id', 'tenant_id', 'name', 'description', 'infra_driver',
+                    'mgmt_driver')
+DEVICE_COLUMNS = ('id', 'tenant_id', 'name', 'description', 'instance_id',
+                  'vim_id', 'placement_attr', 'template_id', 'status',
+                  'mgmt_url', 'error_reason')
+
+
+def _template_load_options(fields):
+    """Return the loader options for the template dicts with fields."""
+    if not fields:
+        return TEMPLATE_LOAD_OPTIONS
+    columns = set(TEMPLATE_COLUMNS + ('attributes', )) & set(fields)
+    options = [orm.load_only(*(columns | set(['id'])))]
+    if 'service_types' in fields:
+        options.extend(TEMPLATE_LOAD_OPTIONS)
+    return options
+
+
+def _device_load_options(fields):
+    """Return the loader options for the device dicts with fields.
+
+    Columns and relationships no field is built from are not loaded.
     """
-    device_id = sa.Column(types.Uuid, sa.ForeignKey('devices.id'),
-                          nullable=False)
-    key = sa.Column(sa.String(255), nullable=False)
-    # json encoded value. example
-    # "nic": [{"net-id": <net-uuid>}, {"port-id": <port-uuid>}]
-    value = sa.Column(sa.TEXT(65535), nullable=True)
+    if not fields:
+        return DEVICE_LOAD_OPTIONS
+    columns = set(DEVICE_COLUMNS + ('attributes', )) & set(fields)
+    options = [orm.load_only(*(columns | set(['id'])))]
+    if 'device_template' in fields:
+        options.extend(DEVICE_LOAD_OPTIONS)
+    return options
 
 
 class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
@@ -146,9 +180,9 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
     def __init__(self):
         super(VNFMPluginDb, self).__init__()
 
-    def _get_resource(self, context, model, id):
+    def _get_resource(self, context, model, id, options=None):
         try:
-            return self._get_by_id(context, model, id)
+            return self._get_by_id(context, model, id, options=options)
         except orm_exc.NoResultFound:
             if issubclass(model, DeviceTemplate):
                 raise vnfm.DeviceTemplateNotFound(device_template_id=id)
@@ -160,40 +194,47 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                 raise
 
     def _make_attributes_dict(self, attributes_db):
-        return dict((attr.key, attr.value) for attr in attributes_db)
+        return dict(attributes_db or {})
 
     def _make_service_types_list(self, service_types):
         return [{'id': service_type.id,
                  'service_type': service_type.service_type}
                 for service_type in service_types]
 
-    def _make_template_dict(self, template, fields=None):
-        res = {
-            'attributes': self._make_attributes_dict(template['attributes']),
-            'service_types': self._make_service_types_list(
+    def _make_template_dict(self, template, fields=None, template_dicts=None):
+        if template_dicts is not None:
+            # devices of a listing share the dict of their template
+            if template.id not in template_dicts:
+                template_dicts[template.id] = self._make_template_dict(
+                    template)
+            return template_dicts[template.id]
+
+        res = {}
+        if not fields or 'attributes' in fields:
+            res['attributes'] = self._make_attributes_dict(
+                template['attributes'])
+        if not fields or 'service_types' in fields:
+            res['service_types'] = self._make_service_types_list(
                 template.service_types)
-        }
-        key_list = ('id', 'tenant_id', 'name', 'description',
-                    'infra_driver', 'mgmt_driver')
-        res.update((key, template[key]) for key in key_list)
-        return self._fields(res, fields)
+        res.update((key, template[key]) for key in TEMPLATE_COLUMNS
+                   if not fields or key in fields)
+        return res
 
     def _make_dev_attrs_dict(self, dev_attrs_db):
-        return dict((arg.key, arg.value) for arg in dev_attrs_db)
-
-    def _make_device_dict(self, device_db, fields=None):
-        LOG.debug(_('device_db %s'), device_db)
-        LOG.debug(_('device_db attributes %s'), device_db.attributes)
-        res = {
-            'device_template':
-            self._make_template_dict(device_db.template),
-            'attributes': self._make_dev_attrs_dict(device_db.attributes),
-        }
-        key_list = ('id', 'tenant_id', 'name', 'description', 'instance_id',
-                    'vim_id', 'placement_attr', 'template_id', 'status',
-                    'mgmt_url', 'error_reason')
-        res.update((key, device_db[key]) for key in key_list)
-        return self._fields(res, fields)
+        return dict(dev_attrs_db or {})
+
+    def _make_device_dict(self, device_db, fields=None, template_dicts=None):
+        # only the parts in fields are built, the others may not be loaded
+        res = {}
+        if not fields or 'device_template' in fields:
+            res['device_template'] = self._make_template_dict(
+                device_db.template, template_dicts=template_dicts)
+        if not fields or 'attributes' in fields:
+            res['attributes'] = self._make_dev_attrs_dict(
+                device_db.attributes)
+        res.update((key, device_db[key]) for key in DEVICE_COLUMNS
+                   if not fields or key in fields)
+        return res
 
     @staticmethod
     def _infra_driver_name(device_dict):
@@ -233,15 +274,9 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                 name=template.get('name'),
                 description=template.get('description'),
                 infra_driver=infra_driver,
-                mgmt_driver=mgmt_driver)
+                mgmt_driver=mgmt_driver,
+                attributes=template.get('attributes', {}))
             context.session.add(template_db)
-            for (key, value) in template.get('attributes', {}).items():
-                attribute_db = DeviceTemplateAttribute(
-                    id=str(uuid.uuid4()),
-                    template_id=template_id,
-                    key=key,
-                    value=value)
-                context.session.add(attribute_db)
             for service_type in (item['service_type']
                                  for item in template['service_types']):
                 service_type_db = ServiceType(
@@ -251,9 +286,7 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                     service_type=service_type)
                 context.session.add(service_type_db)
 
-        LOG.debug(_('template_db %(template_db)s %(attributes)s '),
-                  {'template_db': template_db,
-                   'attributes': template_db.attributes})
+        LOG.debug(_('template_db %s'), template_db)
         return self._make_template_dict(template_db)
 
     def update_device_template(self, context, device_template_id,
@@ -276,21 +309,31 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
 
             context.session.query(ServiceType).filter_by(
                 template_id=device_template_id).delete()
-            context.session.query(DeviceTemplateAttribute).filter_by(
-                template_id=device_template_id).delete()
             template_db = self._get_resource(context, DeviceTemplate,
                                              device_template_id)
             context.session.delete(template_db)
 
     def get_device_template(self, context, device_template_id, fields=None):
-        template_db = self._get_resource(context, DeviceTemplate,
-                                         device_template_id)
-        return self._make_template_dict(template_db)
-
-    def get_device_templates(self, context, filters, fields=None):
+        template_db = self._get_resource(
+            context, DeviceTemplate, device_template_id,
+            options=_template_load_options(fields))
+        return self._make_template_dict(template_db, fields)
+
+    # the marker of a page of templates
+    def _get_device_template(self, context, device_template_id):
+        return self._get_resource(context, DeviceTemplate, device_template_id)
+
+    def get_device_templates(self, context, filters, fields=None, sorts=None,
+                             limit=None, marker=None, page_reverse=False):
+        marker_obj = self._get_marker_obj(context, 'device_template', limit,
+                                          marker)
         return self._get_collection(context, DeviceTemplate,
                                     self._make_template_dict,
-                                    filters=filters, fields=fields)
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse,
+                                    options=_template_load_options(fields))
 
     def choose_device_template(self, context, service_type,
                                required_attributes=None):
@@ -304,62 +347,73 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                     where(sa.and_(
                         DeviceTemplate.id == ServiceType.template_id,
                         ServiceType.service_type == service_type))))
-            for key in required_attributes:
-                query = query.filter(
-                    sa.exists().
-                    where(sa.and_(
-                        DeviceTemplate.id ==
-                        DeviceTemplateAttribute.template_id,
-                        DeviceTemplateAttribute.key == key)))
             LOG.debug(_('statements %s'), query)
-            template_db = query.first()
-            if template_db:
-                return self._make_template_dict(template_db)
-
-    def _device_attribute_update_or_create(
-            self, context, device_id, key, value):
-        arg = (self._model_query(context, DeviceAttribute).
-               filter(DeviceAttribute.device_id == device_id).
-               filter(DeviceAttribute.key == key).first())
-        if arg:
-            arg.value = value
-        else:
-            arg = DeviceAttribute(
-                id=str(uuid.uuid4()), device_id=device_id,
-                key=key, value=value)
-            context.session.add(arg)
+            # the attribute keys are inside the json document of a template
+            for template_db in query:
+                if set(required_attributes).issubset(
+                        template_db.attributes or {}):
+                    return self._make_template_dict(template_db)
+
+    @staticmethod
+    def _set_device_attributes(device_db, attributes):
+        """Merge attributes into the json document of device_db.
+
+        The document is assigned as a whole, so that it is written with the
+        next UPDATE of the device.
+        """
+        new_attributes = dict(device_db.attributes or {})
+        # do not store decrypted vim auth in device attributes
+        new_attributes.update((key, value)
+                              for (key, value) in attributes.items()
+                              if 'vim_auth' not in key)
+        device_db.attributes = new_attributes
+
+    def _device_attributes_update(self, context, device_id, attributes):
+        with context.session.begin(subtransactions=True):
+            # lock the row, other keys may be written concurrently
+            device_db = (self._model_query(context, Device).
+                         filter(Device.id == device_id).
+                         with_lockmode('update').first())
+            if device_db is not None:
+                self._set_device_attributes(device_db, attributes)
 
     # called internally, not by REST API
     def _create_device_pre(self, context, device):
-        LOG.debug(_('device %s'), device)
-        tenant_id = self._get_tenant_id_for_create(context, device)
-        template_id = device['template_id']
-        name = device.get('name')
-        device_id = str(uuid.uuid4())
-        attributes = device.get('attributes', {})
-        vim_id = device.get('vim_id')
-        placement_attr = device.get('placement_attr', {})
-        with context.session.begin(subtransactions=True):
-            template_db = self._get_resource(context, DeviceTemplate,
-                                             template_id)
-            device_db = Device(id=device_id,
-                               tenant_id=tenant_id,
-                               name=name,
-                               description=template_db.description,
-                               instance_id=None,
-                               template_id=template_id,
-                               vim_id=vim_id,
-                               placement_attr=placement_attr,
-                               status=constants.PENDING_CREATE,
-                               error_reason=None)
-            context.session.add(device_db)
-            for key, value in attributes.items():
-                    arg = DeviceAttribute(
-                        id=str(uuid.uuid4()), device_id=device_id,
-                        key=key, value=value)
-                    context.session.add(arg)
+        return self._create_devices_pre(context, [device])[0]
 
-        return self._make_device_dict(device_db)
+    # called internally, not by REST API
+    # all devices are inserted in one transaction, so either all of them or
+    # none of them are created
+    def _create_devices_pre(self, context, devices):
+        LOG.debug(_('devices %s'), devices)
+        device_dbs = []
+        templates = {}
+        with context.session.begin(subtransactions=True):
+            for device in devices:
+                tenant_id = self._get_tenant_id_for_create(context, device)
+                template_id = device['template_id']
+                device_id = str(uuid.uuid4())
+                if template_id not in templates:
+                    templates[template_id] = self._get_resource(
+                        context, DeviceTemplate, template_id)
+                device_db = Device(id=device_id,
+                                   tenant_id=tenant_id,
+                                   name=device.get('name'),
+                                   description=templates[
+                                       template_id].description,
+                                   instance_id=None,
+                                   template_id=template_id,
+                                   vim_id=device.get('vim_id'),
+                                   placement_attr=device.get(
+                                       'placement_attr', {}),
+                                   status=constants.PENDING_CREATE,
+                                   error_reason=None,
+                                   standby=device.get('standby', False),
+                                   attributes=device.get('attributes', {}))
+                device_dbs.append(device_db)
+                context.session.add(device_db)
+
+        return [self._make_device_dict(device_db) for device_db in device_dbs]
 
     # called internally, not by REST API
     # intsance_id = None means error on creation
@@ -374,12 +428,22 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
             query.update({'instance_id': instance_id, 'mgmt_url': mgmt_url})
             if instance_id is None or device_dict['status'] == constants.ERROR:
                 query.update({'status': constants.ERROR})
+            self._set_device_attributes(query, device_dict['attributes'])
 
-            for (key, value) in device_dict['attributes'].items():
-                # do not store decrypted vim auth in device attr table
-                if 'vim_auth' not in key:
-                    self._device_attribute_update_or_create(context, device_id,
-                                                            key, value)
+    # called internally, not by REST API
+    # records the instance created by the infra driver so that waiting for
+    # its completion can be resumed by another worker
+    def _create_device_instance(self, context, device_id, instance_id,
+                                device_dict):
+        with context.session.begin(subtransactions=True):
+            device_db = (self._model_query(context, Device).
+                         filter(Device.id == device_id).
+                         filter(Device.status.in_(CREATE_STATES)).
+                         with_lockmode('update').first())
+            if device_db is not None:
+                device_db.instance_id = instance_id
+                self._set_device_attributes(device_db,
+                                            device_dict['attributes'])
 
     def _create_device_status(self, context, device_id, new_status):
         with context.session.begin(subtransactions=True):
@@ -388,18 +452,96 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                      filter(Device.status.in_(CREATE_STATES)).one())
             query.update({'status': new_status})
 
-    def _get_device_db(self, context, device_id, current_statuses, new_status):
-        try:
-            device_db = (
-                self._model_query(context, Device).
-                filter(Device.id == device_id).
-                filter(Device.status.in_(current_statuses)).
+    def _get_standby_devices(self, context, template_id, vim_id):
+        return (context.session.query(Device).
+                filter(Device.template_id == template_id).
+                filter(Device.vim_id == vim_id).
+                filter(Device.standby == sql.true()).
+                all())
+
+    # called internally, not by REST API
+    # refills of the standby pool of a template hold this lock while they
+    # count and insert the standby devices, so that concurrent workers do
+    # not both top the pool up
+    def _lock_device_template(self, context, template_id):
+        return (context.session.query(DeviceTemplate).
+                filter(DeviceTemplate.id == template_id).
                 with_lockmode('update').one())
-        except orm_exc.NoResultFound:
+
+    # called internally, not by REST API
+    def _get_devices_updated_before(self, context, device_ids, before):
+        # devices older than the updated_at column count as not updated
+        query = (context.session.query(Device.id).
+                 filter(Device.id.in_(device_ids)).
+                 filter(sa.or_(Device.updated_at.is_(None),
+                               Device.updated_at < before)))
+        return set(row.id for row in query)
+
+    # called internally, not by REST API
+    # the infra driver removes a member of a group of devices sharing one
+    # instance by rewriting the instance. Holding the rows of the members
+    # serializes the removals.
+    def _lock_instance_group(self, context, instance_id_prefix):
+        return (context.session.query(Device).
+                filter(Device.instance_id.like(instance_id_prefix + '%')).
+                with_lockmode('update').all())
+
+    # called internally, not by REST API
+    def _claim_standby_device(self, context, template_id, vim_id, device,
+                              candidates=5):
+        """Hand an ACTIVE standby device over to the creator of device.
+
+        Every candidate is taken with a single conditional UPDATE, so API
+        workers racing for the same device never both get it.
+        """
+        admin_context = t_context.get_admin_context()
+        tenant_id = self._get_tenant_id_for_create(context, device)
+        device_ids = [device_id for (device_id, ) in (
+            admin_context.session.query(Device.id).
+            filter(Device.template_id == template_id).
+            filter(Device.vim_id == vim_id).
+            filter(Device.standby == sql.true()).
+            filter(Device.status == constants.ACTIVE).
+            limit(candidates))]
+        values = {'standby': False, 'tenant_id': tenant_id}
+        for key in ('name', 'description'):
+            if device.get(key):
+                values[key] = device[key]
+        for device_id in device_ids:
+            with admin_context.session.begin(subtransactions=True):
+                claimed = (
+                    admin_context.session.query(Device).
+                    filter(Device.id == device_id).
+                    filter(Device.standby == sql.true()).
+                    filter(Device.status == constants.ACTIVE).
+                    update(values, synchronize_session=False))
+                if not claimed:
+                    continue
+                self._device_attributes_update(
+                    admin_context, device_id, device.get('attributes', {}))
+            device_db = (admin_context.session.query(Device).
+                         populate_existing().get(device_id))
+            return self._make_device_dict(device_db)
+
+    def _get_device_db(self, context, device_id, current_statuses, new_status):
+        # compare and set the status in one UPDATE instead of locking the
+        # row to check the status in python
+        updated = (
+            self._model_query(context, Device).
+            filter(Device.id == device_id).
+            filter(Device.status.in_(current_statuses)).
+            filter(Device.status != constants.PENDING_UPDATE).
+            update({'status': new_status}, synchronize_session=False))
+        device_db = (self._model_query(context, Device).
+                     populate_existing().
+                     options(*DEVICE_LOAD_OPTIONS).
+                     filter(Device.id == device_id).first())
+        if not updated:
+            if (device_db is not None and
+                    device_db.status == constants.PENDING_UPDATE and
+                    device_db.status in current_statuses):
+                raise vnfm.DeviceInUse(device_id=device_id)
             raise vnfm.DeviceNotFound(device_id=device_id)
-        if device_db.status == constants.PENDING_UPDATE:
-            raise vnfm.DeviceInUse(device_id=device_id)
-        device_db.update({'status': new_status})
         return device_db
 
     def _update_device_pre(self, context, device_id):
@@ -411,21 +553,19 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
     def _update_device_post(self, context, device_id, new_status,
                             new_device_dict=None):
         with context.session.begin(subtransactions=True):
+            values = {'status': new_status}
+            if new_device_dict.get('mgmt_url'):
+                # scaling changes the management addresses
+                values['mgmt_url'] = new_device_dict['mgmt_url']
+            # the new attributes replace the stored ones in the same UPDATE
+            values['attributes'] = dict(
+                (key, value) for (key, value)
+                in new_device_dict.get('attributes', {}).items()
+                if 'vim_auth' not in key)
             (self._model_query(context, Device).
              filter(Device.id == device_id).
              filter(Device.status == constants.PENDING_UPDATE).
-             update({'status': new_status}))
-
-            dev_attrs = new_device_dict.get('attributes', {})
-            (context.session.query(DeviceAttribute).
-             filter(DeviceAttribute.device_id == device_id).
-             filter(~DeviceAttribute.key.in_(dev_attrs.keys())).
-             delete(synchronize_session='fetch'))
-
-            for (key, value) in dev_attrs.items():
-                if 'vim_auth' not in key:
-                    self._device_attribute_update_or_create(context, device_id,
-                                                        key, value)
+             update(values))
 
     def _delete_device_pre(self, context, device_id):
         with context.session.begin(subtransactions=True):
@@ -444,8 +584,6 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
             if error:
                 query.update({'status': constants.ERROR})
             else:
-                (self._model_query(context, DeviceAttribute).
-                 filter(DeviceAttribute.device_id == device_id).delete())
                 query.delete()
 
     # reference implementation. needs to be overrided by subclass
@@ -480,12 +618,29 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
         self._delete_device_post(context, device_id, False)
 
     def get_device(self, context, device_id, fields=None):
-        device_db = self._get_resource(context, Device, device_id)
+        device_db = self._get_resource(context, Device, device_id,
+                                       options=_device_load_options(fields))
         return self._make_device_dict(device_db, fields)
 
-    def get_devices(self, context, filters=None, fields=None):
-        return self._get_collection(context, Device, self._make_device_dict,
-                                    filters=filters, fields=fields)
+    # the marker of a page of devices
+    def _get_device(self, context, device_id):
+        return self._get_resource(context, Device, device_id)
+
+    def get_devices(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
+        marker_obj = self._get_marker_obj(context, 'device', limit, marker)
+        template_dicts = {}
+
+        def _make_device_dict(device_db, fields):
+            return self._make_device_dict(device_db, fields,
+                                          template_dicts=template_dicts)
+
+        return self._get_collection(context, Device, _make_device_dict,
+                                    filters=filters, fields=fields,
+                                    sorts=sorts, limit=limit,
+                                    marker_obj=marker_obj,
+                                    page_reverse=page_reverse,
+                                    options=_device_load_options(fields))
 
     def set_device_error_status_reason(self, context, device_id, new_reason):
         with context.session.begin(subtransactions=True):
@@ -493,20 +648,21 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                 filter(Device.id == device_id).
                 update({'error_reason': new_reason}))
 
+    def set_device_progress(self, context, device_id, progress):
+        self._device_attributes_update(context, device_id,
+                                       {'progress': progress})
+
     def _mark_device_status(self, device_id, exclude_status, new_status):
         context = t_context.get_admin_context()
         with context.session.begin(subtransactions=True):
-            try:
-                device_db = (
-                    self._model_query(context, Device).
-                    filter(Device.id == device_id).
-                    filter(~Device.status.in_(exclude_status)).
-                    with_lockmode('update').one())
-            except orm_exc.NoResultFound:
-                LOG.warning(_('no device found %s'), device_id)
-                return False
-
-            device_db.update({'status': new_status})
+            updated = (
+                self._model_query(context, Device).
+                filter(Device.id == device_id).
+                filter(~Device.status.in_(exclude_status)).
+                update({'status': new_status}, synchronize_session=False))
+        if not updated:
+            LOG.warning(_('no device found %s'), device_id)
+            return False
         return True
 
     def _mark_device_error(self, device_id):
@@ -524,11 +680,34 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
         return self._mark_device_status(
             device_id, exclude_status, constants.DEAD)
 
-    def get_vnfs(self, context, filters=None, fields=None):
-        return self.get_devices(context, filters, fields)
+    @staticmethod
+    def _vnf_fields(fields):
+        # the vnfd of a vnf is the template of its device
+        if fields:
+            fields = ['template_id' if key == 'vnfd_id' else key
+                      for key in fields]
+        return fields
+
+    @staticmethod
+    def _make_vnf_dict(device_dict):
+        if 'template_id' in device_dict:
+            device_dict['vnfd_id'] = device_dict.pop('template_id')
+        return device_dict
+
+    def get_vnfs(self, context, filters=None, fields=None, sorts=None,
+                 limit=None, marker=None, page_reverse=False):
+        if sorts:
+            sorts = [('template_id' if key == 'vnfd_id' else key, direction)
+                     for (key, direction) in sorts]
+        fields = self._vnf_fields(fields)
+        return [self._make_vnf_dict(device_dict) for device_dict in
+                self.get_devices(context, filters, fields, sorts=sorts,
+                                 limit=limit, marker=marker,
+                                 page_reverse=page_reverse)]
 
     def get_vnf(self, context, vnf_id, fields=None):
-        return self.get_device(context, vnf_id, fields)
+        return self._make_vnf_dict(
+            self.get_device(context, vnf_id, self._vnf_fields(fields)))
 
     def delete_vnfd(self, context, vnfd_id):
         self.delete_device_template(context, vnfd_id)
@@ -536,5 +715,26 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
     def get_vnfd(self, context, vnfd_id, fields=None):
         return self.get_device_template(context, vnfd_id, fields)
 
-    def get_vnfds(self, context, filters=None, fields=None):
-        return self.get_device_templates(context, filters, fields)
+    def get_vnfds(self, context, filters=None, fields=None, sorts=None,
+                  limit=None, marker=None, page_reverse=False):
+        return self.get_device_templates(context, filters, fields,
+                                         sorts=sorts, limit=limit,
+                                         marker=marker,
+                                         page_reverse=page_reverse)
+
+    def get_vnf_summaries(self, context, filters=None, fields=None):
+        """Count the devices by status, vim, template and tenant."""
+        filters = dict(filters or {})
+        if 'vnfd_id' in filters:
+            filters['template_id'] = filters.pop('vnfd_id')
+        group_by = (Device.tenant_id, Device.template_id, Device.vim_id,
+                    Device.status)
+        query = self._model_query(context, Device)
+        query = self._apply_filters_to_query(query, Device, filters)
+        query = (query.with_entities(*(group_by +
+                                       (sa.func.count(Device.id), ))).
+                 group_by(*group_by))
+        return [self._fields({'tenant_id': tenant_id, 'vnfd_id': template_id,
+                              'vim_id': vim_id, 'status': status,
+                              'count': count}, fields)
+                for (tenant_id, template_id, vim_id, status, count) in query]
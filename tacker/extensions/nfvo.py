@@ -75,13 +75,15 @@ RESOURCE_ATTRIBUTE_MAP = {
             'validate': {'type:uuid': None},
             'is_visible': True,
             'primary_key': True,
+            'is_sort_key': True,
         },
         'tenant_id': {
             'allow_post': True,
             'allow_put': False,
             'validate': {'type:string': None},
             'required_by_policy': True,
-            'is_visible': True
+            'is_visible': True,
+            'is_sort_key': True,
         },
         'type': {
             'allow_post': True,
@@ -112,6 +114,7 @@ RESOURCE_ATTRIBUTE_MAP = {
             'allow_put': True,
             'validate': {'type:string': None},
             'is_visible': True,
+            'is_sort_key': True,
         },
         'description': {
             'allow_post': True,
@@ -211,7 +214,8 @@ class NFVOPluginBase(service_base.NFVPluginBase):
         pass
 
     @abc.abstractmethod
-    def get_vims(self, context, filters=None, fields=None):
+    def get_vims(self, context, filters=None, fields=None, sorts=None,
+                 limit=None, marker=None, page_reverse=False):
         pass
 
     def get_vim_by_name(self, context, vim_name, fields=None,
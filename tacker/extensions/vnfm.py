@@ -69,6 +69,14 @@ class DeviceCreateWaitFailed(exceptions.TackerException):
     message = _('%(reason)s')
 
 
+class DeviceUpdateWaitFailed(exceptions.TackerException):
+    message = _('%(reason)s')
+
+
+class InvalidScaleRequest(exceptions.InvalidInput):
+    message = _('VDU %(vdu)s can not be scaled: %(reason)s')
+
+
 class DeviceDeleteFailed(exceptions.TackerException):
     message = _('deleting VNF %(device_id)s failed')
 
@@ -162,6 +170,11 @@ def _validate_service_type_list(data, valid_values=None):
 attr.validators['type:service_type_list'] = _validate_service_type_list
 
 
+# collections accepting a list of resources in one create request
+BULK_COLLECTIONS = ('vnfs', )
+# read-only aggregates, neither paginated nor sorted
+SUMMARY_COLLECTIONS = ('vnf_summaries', )
+
 RESOURCE_ATTRIBUTE_MAP = {
 
     'vnfds': {
@@ -171,6 +184,7 @@ RESOURCE_ATTRIBUTE_MAP = {
             'validate': {'type:uuid': None},
             'is_visible': True,
             'primary_key': True,
+            'is_sort_key': True,
         },
         'tenant_id': {
             'allow_post': True,
@@ -178,12 +192,14 @@ RESOURCE_ATTRIBUTE_MAP = {
             'validate': {'type:string': None},
             'required_by_policy': True,
             'is_visible': True,
+            'is_sort_key': True,
         },
         'name': {
             'allow_post': True,
             'allow_put': True,
             'validate': {'type:string': None},
             'is_visible': True,
+            'is_sort_key': True,
         },
         'description': {
             'allow_post': True,
@@ -221,6 +237,7 @@ RESOURCE_ATTRIBUTE_MAP = {
             'validate': {'type:dict_or_nodata': None},
             'is_visible': True,
             'default': None,
+            'is_detail': True,
         },
     },
 
@@ -230,20 +247,23 @@ RESOURCE_ATTRIBUTE_MAP = {
             'allow_put': False,
             'validate': {'type:uuid': None},
             'is_visible': True,
-            'primary_key': True
+            'primary_key': True,
+            'is_sort_key': True,
         },
         'tenant_id': {
             'allow_post': True,
             'allow_put': False,
             'validate': {'type:string': None},
             'required_by_policy': True,
-            'is_visible': True
+            'is_visible': True,
+            'is_sort_key': True,
         },
         'vnfd_id': {
             'allow_post': True,
             'allow_put': False,
             'validate': {'type:uuid': None},
             'is_visible': True,
+            'is_sort_key': True,
         },
         'vim_id': {
             'allow_post': True,
@@ -251,12 +271,14 @@ RESOURCE_ATTRIBUTE_MAP = {
             'validate': {'type:string': None},
             'is_visible': True,
             'default': '',
+            'is_sort_key': True,
         },
         'name': {
             'allow_post': True,
             'allow_put': True,
             'validate': {'type:string': None},
             'is_visible': True,
+            'is_sort_key': True,
         },
         'description': {
             'allow_post': True,
@@ -283,6 +305,7 @@ RESOURCE_ATTRIBUTE_MAP = {
             'validate': {'type:dict_or_none': None},
             'is_visible': True,
             'default': {},
+            'is_detail': True,
         },
         'placement_attr': {
             'allow_post': True,
@@ -295,6 +318,7 @@ RESOURCE_ATTRIBUTE_MAP = {
             'allow_post': False,
             'allow_put': False,
             'is_visible': True,
+            'is_sort_key': True,
         },
         'error_reason': {
             'allow_post': False,
@@ -302,6 +326,35 @@ RESOURCE_ATTRIBUTE_MAP = {
             'is_visible': True,
         },
     },
+
+    'vnf_summaries': {
+        'tenant_id': {
+            'allow_post': False,
+            'allow_put': False,
+            'required_by_policy': True,
+            'is_visible': True,
+        },
+        'vnfd_id': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'vim_id': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'status': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'count': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+    },
 }
 
 
@@ -328,14 +381,21 @@ class Vnfm(extensions.ExtensionDescriptor):
 
     @classmethod
     def get_resources(cls):
-        special_mappings = {}
+        special_mappings = {'vnf_summaries': 'vnf_summary'}
         plural_mappings = resource_helper.build_plural_mappings(
             special_mappings, RESOURCE_ATTRIBUTE_MAP)
         plural_mappings['service_types'] = 'service_type'
         attr.PLURALS.update(plural_mappings)
-        return resource_helper.build_resource_info(
-            plural_mappings, RESOURCE_ATTRIBUTE_MAP, constants.VNFM,
-            translate_name=True)
+        resources = []
+        for collection, resource_map in RESOURCE_ATTRIBUTE_MAP.items():
+            kwargs = {}
+            if collection in SUMMARY_COLLECTIONS:
+                kwargs.update(allow_pagination=False, allow_sorting=False)
+            resources.extend(resource_helper.build_resource_info(
+                plural_mappings, {collection: resource_map}, constants.VNFM,
+                translate_name=True,
+                allow_bulk=collection in BULK_COLLECTIONS, **kwargs))
+        return resources
 
     @classmethod
     def get_plugin_interface(cls):
@@ -374,11 +434,13 @@ class VNFMPluginBase(service_base.NFVPluginBase):
         pass
 
     @abc.abstractmethod
-    def get_vnfds(self, context, filters=None, fields=None):
+    def get_vnfds(self, context, filters=None, fields=None, sorts=None,
+                  limit=None, marker=None, page_reverse=False):
         pass
 
     @abc.abstractmethod
-    def get_vnfs(self, context, filters=None, fields=None):
+    def get_vnfs(self, context, filters=None, fields=None, sorts=None,
+                 limit=None, marker=None, page_reverse=False):
         pass
 
     @abc.abstractmethod
@@ -397,3 +459,21 @@ class VNFMPluginBase(service_base.NFVPluginBase):
     @abc.abstractmethod
     def delete_vnf(self, context, vnf_id):
         pass
+
+    @abc.abstractmethod
+    def get_vnf_summaries(self, context, filters=None, fields=None):
+        pass
+
+    # vnf summaries are only listed. The controller routes the other
+    # requests of the collection here and they are answered with 501.
+    def get_vnf_summary(self, context, id, fields=None):
+        raise NotImplementedError()
+
+    def create_vnf_summary(self, context, vnf_summary):
+        raise NotImplementedError()
+
+    def update_vnf_summary(self, context, id, vnf_summary):
+        raise NotImplementedError()
+
+    def delete_vnf_summary(self, context, id):
+        raise NotImplementedError()
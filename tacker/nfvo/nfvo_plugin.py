@@ -27,6 +27,7 @@ from tacker.common import log
 from tacker.common import utils
 from tacker import context as t_context
 from tacker.db.nfvo import nfvo_db
+from tacker.vm import vim_client
 
 LOG = logging.getLogger(__name__)
 
@@ -40,6 +41,8 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb):
     extension for providing the specified VIM information
     """
     supported_extension_aliases = ['nfvo']
+    __native_pagination_support = True
+    __native_sorting_support = True
     _lock = threading.RLock()
 
     OPTS = [
@@ -107,6 +110,8 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb):
             with excutils.save_and_reraise_exception():
                 self._vim_drivers.invoke(vim_type, 'delete_vim_auth',
                                          vim_id=vim_obj['id'])
+        finally:
+            vim_client.VimClient.invalidate(vim_id)
 
     @log.log
     def delete_vim(self, context, vim_id):
@@ -115,6 +120,7 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb):
                                  vim_id=vim_id)
         with self._lock:
             self._created_vims.pop(vim_id, None)
+        vim_client.VimClient.invalidate(vim_id)
         super(NfvoPlugin, self).delete_vim(context, vim_id)
 
     @log.log
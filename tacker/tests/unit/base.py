@@ -28,6 +28,10 @@ class TestCase(base.BaseTestCase):
         super(TestCase, self).setUp()
         self.config_fixture = self.useFixture(config_fixture.Config(CONF))
 
+    def config(self, **kw):
+        """Override configuration values for the current test."""
+        self.config_fixture.config(**kw)
+
     def _mock(self, target, new=mock.DEFAULT):
         patcher = mock.patch(target, new)
         return patcher.start()
@@ -0,0 +1,79 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+from oslo_db import exception as db_exc
+import sqlalchemy
+
+from tacker import context
+from tacker.db import api as db_api
+from tacker.tests.unit.db import base
+
+
+class TestSqlInstrumentation(base.SqlTestCase):
+
+    def setUp(self):
+        super(TestSqlInstrumentation, self).setUp()
+        self.engine = db_api.get_engine()
+        db_api._instrument(self.engine)
+        self.addCleanup(sqlalchemy.event.remove, self.engine,
+                        'before_cursor_execute',
+                        db_api._before_cursor_execute)
+        self.addCleanup(sqlalchemy.event.remove, self.engine,
+                        'after_cursor_execute', db_api._after_cursor_execute)
+        self.context = context.Context('user_id', 'tenant_id',
+                                       request_id='req-1')
+
+    def test_request_stats(self):
+        with self.engine.connect() as conn:
+            # checking the connection out pings the database
+            db_api.pop_request_stats('req-1')
+            totals = db_api.get_stats()
+            conn.execute('SELECT 1')
+            conn.execute('SELECT 2')
+        statements, seconds = db_api.pop_request_stats('req-1')
+        self.assertEqual(2, statements)
+        self.assertTrue(seconds >= 0)
+        self.assertEqual(totals['statements'] + 2,
+                         db_api.get_stats()['statements'])
+        self.assertEqual((0, 0.0), db_api.pop_request_stats('req-1'))
+
+    def test_slow_statement_logged_without_parameters(self):
+        self.config(slow_query_threshold=0.000001,
+                    group='sql_instrumentation')
+        with mock.patch.object(db_api.LOG, 'warning') as warning:
+            self.engine.execute('SELECT ?', 'secret')
+        args = warning.call_args[0][1]
+        self.assertEqual('req-1', args['request_id'])
+        self.assertEqual('SELECT ?', args['statement'])
+        self.assertNotIn('secret', str(warning.call_args))
+
+    def test_failed_statement_is_not_timed(self):
+        with self.engine.connect() as conn:
+            db_api.pop_request_stats('req-1')
+            # the failed statement starts at 0, the next one at 100
+            with mock.patch.object(db_api, 'time') as mock_time:
+                mock_time.time.side_effect = [0.0, 100.0, 101.0]
+                self.assertRaises(db_exc.DBError,
+                                  conn.execute, 'SELECT * FROM missing')
+                conn.execute('SELECT 1')
+        self.assertEqual((1, 1.0), db_api.pop_request_stats('req-1'))
+
+    def test_totals_reported(self):
+        self.config(report_interval=60, group='sql_instrumentation')
+        with mock.patch.object(db_api, '_reported_at', 0), \
+                mock.patch.object(db_api.LOG, 'info') as info:
+            self.engine.execute('SELECT 1')
+            self.engine.execute('SELECT 2')
+        # reported once per interval
+        self.assertEqual(1, info.call_count)
+        self.assertIn('slow_statements', info.call_args[0][1])
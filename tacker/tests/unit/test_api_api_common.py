@@ -14,6 +14,7 @@
 #    under the License.
 
 from testtools import matchers
+import webob
 from webob import exc
 
 from tacker.api import api_common as common
@@ -92,3 +93,32 @@ class APICommonTestCase(base.BaseTestCase):
                           self.controller._prepare_request_body,
                           body,
                           params)
+
+    def _get_request(self, query):
+        return webob.Request.blank('/vnfs?' + query)
+
+    def test_get_sorts_by_sort_keys(self):
+        attr_info = {'id': {'is_sort_key': True},
+                     'name': {'is_sort_key': True},
+                     'description': {}}
+        request = self._get_request('sort_key=name&sort_dir=desc')
+        self.assertEqual([('name', False)],
+                         list(common.get_sorts(request, attr_info)))
+        request = self._get_request('sort_key=description&sort_dir=asc')
+        self.assertRaises(exc.HTTPBadRequest, common.get_sorts, request,
+                          attr_info)
+
+    def test_get_sorts_without_sort_keys(self):
+        attr_info = {'id': {}, 'description': {}}
+        request = self._get_request('sort_key=description&sort_dir=asc')
+        self.assertEqual([('description', True)],
+                         list(common.get_sorts(request, attr_info)))
+
+    def test_emulated_sort(self):
+        request = self._get_request('sort_key=name&sort_dir=desc&'
+                                    'sort_key=id&sort_dir=asc')
+        helper = common.SortingEmulatedHelper(request, {'id': {}, 'name': {}})
+        items = [{'id': 1, 'name': 'a'}, {'id': 3, 'name': 'b'},
+                 {'id': 2, 'name': 'b'}]
+        self.assertEqual([2, 3, 1],
+                         [item['id'] for item in helper.sort(items)])
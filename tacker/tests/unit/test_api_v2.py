@@ -1373,6 +1373,73 @@ class TestSubresourcePlugin(object):
             return
 
 
+class ListDetailTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(ListDetailTestCase, self).setUp()
+        self.plugin = mock.Mock(spec=['get_dummies'])
+        self.plugin.get_dummies.return_value = []
+        attr_info = {
+            'id': {'is_visible': True, 'primary_key': True},
+            'tenant_id': {'is_visible': True, 'required_by_policy': True},
+            'blob': {'is_visible': True, 'is_detail': True},
+        }
+        self.controller = v2_base.Controller(self.plugin, 'dummies', 'dummy',
+                                             attr_info)
+
+    def _index(self, query):
+        request = webob.Request.blank('/dummies?' + query)
+        request.context = context.get_admin_context()
+        self.controller.index(request)
+        return self.plugin.get_dummies.call_args[1]['fields']
+
+    def test_list_without_detail(self):
+        self.assertEqual(set(['id', 'tenant_id']), set(self._index('')))
+
+    def test_list_with_detail(self):
+        self.assertFalse(self._index('detail=true'))
+
+    def test_list_with_detail_field(self):
+        self.assertEqual(set(['blob', 'tenant_id']),
+                         set(self._index('fields=blob')))
+
+
+class SlaveReadsTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(SlaveReadsTestCase, self).setUp()
+        self.plugin = mock.Mock(spec=['get_dummies', 'get_dummy'])
+        self.plugin.get_dummies.return_value = []
+        self.plugin.get_dummy.return_value = {'id': 'id',
+                                              'tenant_id': 'tenant_id'}
+        attr_info = {
+            'id': {'is_visible': True, 'primary_key': True},
+            'tenant_id': {'is_visible': True, 'required_by_policy': True},
+        }
+        self.controller = v2_base.Controller(self.plugin, 'dummies', 'dummy',
+                                             attr_info)
+
+    def _request(self, path):
+        request = webob.Request.blank(path)
+        request.context = context.Context('user_id', 'tenant_id')
+        return request
+
+    def _use_slave(self, slave_reads):
+        cfg.CONF.set_override('api_slave_reads', slave_reads)
+        index = self._request('/dummies')
+        self.controller.index(index)
+        show = self._request('/dummies/id')
+        self.controller.show(show, 'id')
+        return index.context.use_slave, show.context.use_slave
+
+    def test_slave_reads_none(self):
+        self.assertEqual((False, False), self._use_slave('none'))
+
+    def test_slave_reads_list(self):
+        self.assertEqual((True, False), self._use_slave('list'))
+
+    def test_slave_reads_all(self):
+        self.assertEqual((True, True), self._use_slave('all'))
+
+
 class ListArgsTestCase(base.BaseTestCase):
     def test_list_args(self):
         path = '/?fields=4&foo=3&fields=2&bar=1'
@@ -88,6 +88,17 @@ class TestTackerContext(base.BaseTestCase):
         self.assertIsNotNone(ctx.session)
         self.assertNotIn('session', ctx_dict)
 
+    def test_tacker_context_session(self):
+        ctx = context.Context('user_id', 'tenant_id')
+        self.assertIs(self.db_api_session.return_value, ctx.session)
+        self.db_api_session.assert_called_once_with(use_slave=False)
+
+    def test_tacker_context_slave_session(self):
+        ctx = context.Context('user_id', 'tenant_id')
+        ctx.use_slave = True
+        self.assertIs(self.db_api_session.return_value, ctx.session)
+        self.db_api_session.assert_called_once_with(use_slave=True)
+
     def test_tacker_context_admin_without_session_to_dict(self):
         ctx = context.get_admin_context_without_session()
         ctx_dict = ctx.to_dict()
@@ -19,6 +19,7 @@ import os
 import yaml
 
 from tacker import context
+from tacker.extensions import vnfm
 from tacker.tests.unit import base
 from tacker.tests.unit.db import utils
 from tacker.vm.infra_drivers.heat import heat
@@ -167,6 +168,19 @@ class TestDeviceHeat(base.TestCase):
         self.heat_client.create.assert_called_once_with(expected_fields)
         self.assertEqual(expected_result, result)
 
+    def test_create_reuses_translation(self):
+        translate = mock.patch.object(
+            self.heat_driver, '_translate_vnfd',
+            wraps=self.heat_driver._translate_vnfd).start()
+        for _i in range(2):
+            self.heat_driver.create(plugin=None, context=self.context,
+                                    device=utils.get_dummy_device_obj(),
+                                    auth_attr=utils.get_vim_auth_obj())
+        self.assertEqual(1, translate.call_count)
+        self.assertEqual(2, self.heat_client.create.call_count)
+        self.assertEqual(self.heat_client.create.call_args_list[0],
+                         self.heat_client.create.call_args_list[1])
+
     def test_create_wait(self):
         device_obj = utils.get_dummy_device_obj()
         expected_result = self._get_expected_device_wait_obj()
@@ -178,6 +192,76 @@ class TestDeviceHeat(base.TestCase):
                                      auth_attr=utils.get_vim_auth_obj())
         self.assertEqual(device_obj, expected_result)
 
+    def test_create_wait_on_stack_events(self):
+        self.heat_driver._stack_events = mock.Mock(poll_interval=60)
+        self.heat_client.get.side_effect = [
+            mock.Mock(stack_status='CREATE_IN_PROGRESS'),
+            FakeHeatClient.Stack()]
+        device_id = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
+        self.heat_driver.create_wait(plugin=None,
+                                     context=self.context,
+                                     device_dict=utils.get_dummy_device_obj(),
+                                     device_id=device_id,
+                                     auth_attr=utils.get_vim_auth_obj())
+        self.heat_driver._stack_events.wait.assert_called_once_with(
+            device_id, 60)
+
+    def _get_event(self, event_id, resource_name, status, physical_id=None):
+        return mock.Mock(id=event_id, resource_name=resource_name,
+                         resource_status=status,
+                         physical_resource_id=physical_id or 'server-id')
+
+    def test_create_wait_on_events(self):
+        self.config(track_stack_events=True, group='tacker_heat')
+        self.heat_driver._stack_events = mock.Mock(poll_interval=None)
+        device_id = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
+        self.heat_client.events_list.side_effect = [
+            [self._get_event('e1', 'VDU1', 'CREATE_IN_PROGRESS'),
+             self._get_event('e2', 'CP1', 'CREATE_COMPLETE')],
+            [],
+            [self._get_event('e3', 'VDU1', 'CREATE_COMPLETE'),
+             self._get_event('e4', 'stack', 'CREATE_COMPLETE', device_id)]]
+        plugin = mock.Mock()
+        device_dict = utils.get_dummy_device_obj()
+        device_dict['attributes']['heat_template'] = self.hot_template
+        self.heat_driver.create_wait(plugin=plugin,
+                                     context=self.context,
+                                     device_dict=device_dict,
+                                     device_id=device_id,
+                                     auth_attr=utils.get_vim_auth_obj())
+        self.assertEqual(
+            [mock.call(device_id, marker=None, sort_dir='asc'),
+             mock.call(device_id, marker='e2', sort_dir='asc'),
+             mock.call(device_id, marker='e2', sort_dir='asc')],
+            self.heat_client.events_list.call_args_list)
+        total = len(yaml.safe_load(self.hot_template)['resources'])
+        self.assertEqual(
+            [mock.call(self.context, device_dict['id'],
+                       '1/%d resources complete' % total),
+             mock.call(self.context, device_dict['id'],
+                       '2/%d resources complete' % total)],
+            plugin.set_device_progress.call_args_list)
+        self.heat_client.get.assert_called_once_with(device_id)
+        self.assertEqual('{"vdu1": "192.168.120.31"}',
+                         device_dict['mgmt_url'])
+
+    def test_create_wait_on_events_failed(self):
+        self.config(track_stack_events=True, group='tacker_heat')
+        self.heat_driver._stack_events = mock.Mock(poll_interval=None)
+        device_id = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
+        self.heat_client.events_list.return_value = [
+            self._get_event('e1', 'stack', 'CREATE_FAILED', device_id)]
+        self.heat_client.get.side_effect = None
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='CREATE_FAILED', stack_status_reason='no capacity')
+        self.assertRaises(vnfm.DeviceCreateWaitFailed,
+                          self.heat_driver.create_wait,
+                          plugin=None, context=self.context,
+                          device_dict=utils.get_dummy_device_obj(),
+                          device_id=device_id,
+                          auth_attr=utils.get_vim_auth_obj())
+        self.assertFalse(self.heat_driver._stack_events.wait.called)
+
     def test_delete(self):
         device_id = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
         self.heat_driver.delete(plugin=None, context=self.context,
@@ -185,6 +269,131 @@ class TestDeviceHeat(base.TestCase):
                                 auth_attr=utils.get_vim_auth_obj())
         self.heat_client.delete.assert_called_once_with(device_id)
 
+    def test_create_group(self):
+        devices = [utils.get_dummy_device_obj() for _i in range(2)]
+        devices[1]['id'] = 'c1cd2e1f-2bb1-4a5e-9d04-4b4b3a3e3a1d'
+        result = self.heat_driver.create_group(
+            plugin=None, context=self.context, devices=devices,
+            auth_attr=utils.get_vim_auth_obj())
+        stack_id = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
+        self.assertEqual({devices[0]['id']: stack_id + '#vnf0',
+                          devices[1]['id']: stack_id + '#vnf1'}, result)
+        self.assertEqual(1, self.heat_client.create.call_count)
+        fields = self.heat_client.create.call_args[0][0]
+        self.assertEqual(['vnf-0.yaml'], list(fields['files']))
+        template = yaml.safe_load(fields['template'])
+        self.assertEqual({'type': 'vnf-0.yaml', 'properties': {}},
+                         template['resources']['vnf1'])
+        self.assertEqual({'value': {'get_attr': ['vnf1', 'mgmt_ip-vdu1']}},
+                         template['outputs']['vnf1:mgmt_ip-vdu1'])
+
+    def _get_group_stack(self, status):
+        return mock.Mock(stack_status=status, outputs=[
+            {'output_key': 'vnf0:mgmt_ip-vdu1',
+             'output_value': '192.168.120.31'},
+            {'output_key': 'vnf1:mgmt_ip-vdu1',
+             'output_value': '192.168.120.32'}])
+
+    def test_create_wait_group_member(self):
+        self.heat_client.get.return_value = self._get_group_stack(
+            'CREATE_COMPLETE')
+        device_obj = utils.get_dummy_device_obj()
+        self.heat_driver.create_wait(plugin=None, context=self.context,
+                                     device_dict=device_obj,
+                                     device_id='stack#vnf1',
+                                     auth_attr=utils.get_vim_auth_obj())
+        self.heat_client.get.assert_called_once_with('stack')
+        self.assertEqual('{"vdu1": "192.168.120.32"}', device_obj['mgmt_url'])
+
+    def test_create_wait_group_member_of_failed_stack(self):
+        self.heat_client.get.return_value = self._get_group_stack(
+            'CREATE_FAILED')
+        self.heat_client.resource_get.return_value = mock.Mock(
+            resource_status='CREATE_FAILED', resource_status_reason='reason')
+        self.assertRaises(vnfm.DeviceCreateWaitFailed,
+                          self.heat_driver.create_wait,
+                          plugin=None, context=self.context,
+                          device_dict=utils.get_dummy_device_obj(),
+                          device_id='stack#vnf1',
+                          auth_attr=utils.get_vim_auth_obj())
+        self.heat_client.resource_get.assert_called_once_with('stack', 'vnf1')
+
+    def _delete_group_member(self):
+        self.plugin = mock.Mock()
+        self.heat_driver.delete(plugin=self.plugin, context=mock.MagicMock(),
+                                device_id='stack#vnf0',
+                                auth_attr=utils.get_vim_auth_obj())
+
+    def test_delete_group_member(self):
+        self.heat_client.stacks.template.return_value = {
+            'resources': {'vnf0': {}, 'vnf1': {}},
+            'outputs': {'vnf0:mgmt_ip-vdu1': {}, 'vnf1:mgmt_ip-vdu1': {}}}
+        self._delete_group_member()
+        self.plugin._lock_instance_group.assert_called_once_with(
+            mock.ANY, 'stack#')
+        self.heat_client.stacks.update.assert_called_once_with(
+            'stack', existing=True,
+            template={'resources': {'vnf1': {}},
+                      'outputs': {'vnf1:mgmt_ip-vdu1': {}}})
+        self.assertFalse(self.heat_client.delete.called)
+
+    @mock.patch('time.sleep')
+    def test_delete_group_member_of_busy_stack(self, mock_sleep):
+        # another member is being removed, its template is not final yet
+        self.heat_client.get.side_effect = [
+            mock.Mock(stack_status='UPDATE_IN_PROGRESS'),
+            mock.Mock(stack_status='UPDATE_COMPLETE')]
+        self.heat_client.stacks.template.return_value = {
+            'resources': {'vnf0': {}, 'vnf1': {}}}
+        self._delete_group_member()
+        self.assertEqual(2, self.plugin._lock_instance_group.call_count)
+        self.assertEqual(1, self.heat_client.stacks.template.call_count)
+        self.heat_client.stacks.update.assert_called_once_with(
+            'stack', existing=True, template={'resources': {'vnf1': {}}})
+
+    def test_delete_last_group_member(self):
+        self.heat_client.stacks.template.return_value = {
+            'resources': {'vnf0': {}}}
+        self._delete_group_member()
+        self.heat_client.delete.assert_called_once_with('stack')
+
+    def _respawn_vdu(self):
+        device_obj = utils.get_dummy_device_obj()
+        device_obj['instance_id'] = 'stack'
+        device_obj['mgmt_url'] = None
+        result = self.heat_driver.respawn_vdu(
+            plugin=None, context=self.context, device_dict=device_obj,
+            vdu_name='vdu1', auth_attr=utils.get_vim_auth_obj())
+        return result, device_obj
+
+    def test_respawn_vdu_in_stack_mode(self):
+        self.assertFalse(self._respawn_vdu()[0])
+        self.assertFalse(self.heat_client.resource_mark_unhealthy.called)
+
+    def test_respawn_vdu(self):
+        self.config(respawn_mode='vdu', group='tacker_heat')
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='UPDATE_COMPLETE',
+            outputs=FakeHeatClient.Stack.outputs)
+        self.heat_client.resource_get.return_value = mock.Mock(
+            resource_status='UPDATE_COMPLETE')
+        result, device_obj = self._respawn_vdu()
+        self.assertTrue(result)
+        self.heat_client.resource_mark_unhealthy.assert_called_once_with(
+            'stack', 'vdu1', mock.ANY)
+        self.heat_client.update.assert_called_once_with('stack',
+                                                        existing=True)
+        self.assertFalse(self.heat_client.delete.called)
+        self.assertEqual('{"vdu1": "192.168.120.31"}', device_obj['mgmt_url'])
+
+    def test_respawn_vdu_failed_update(self):
+        self.config(respawn_mode='vdu', group='tacker_heat')
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='UPDATE_FAILED', stack_status_reason='reason')
+        self.heat_client.resource_get.return_value = mock.Mock(
+            resource_status='UPDATE_FAILED')
+        self.assertRaises(vnfm.DeviceCreateWaitFailed, self._respawn_vdu)
+
     def test_update(self):
         device_obj = utils.get_dummy_device_obj_config_attr()
         device_config_obj = utils.get_dummy_device_update_config_attr()
@@ -196,6 +405,88 @@ class TestDeviceHeat(base.TestCase):
                                 auth_attr=utils.get_vim_auth_obj())
         self.assertEqual(device_obj, expected_device_update)
 
+    def _scale(self, scale):
+        self.heat_client.stacks.template.return_value = {
+            'resources': {'vdu1': {'type': 'OS::Heat::ResourceGroup',
+                                   'properties': {'count': 1}},
+                          'vdu2': {'type': 'OS::Nova::Server'}}}
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='CREATE_COMPLETE', updated_time=None)
+        device_dict = utils.get_dummy_device_obj()
+        self.heat_driver.update(plugin=None, context=self.context,
+                                device_id='stack',
+                                device_dict=device_dict,
+                                device={'device': {'attributes': {
+                                    'scale': scale}}},
+                                auth_attr=utils.get_vim_auth_obj())
+        return device_dict
+
+    def test_update_scale(self):
+        device_dict = self._scale({'vdu1': 3})
+        self.heat_client.update.assert_called_once_with(
+            'stack', existing=True,
+            template={'resources': {
+                'vdu1': {'type': 'OS::Heat::ResourceGroup',
+                         'properties': {'count': 3}},
+                'vdu2': {'type': 'OS::Nova::Server'}}})
+        self.assertEqual(
+            '', device_dict['attributes'][heat.SCALE_UPDATED_TIME])
+
+    def test_update_scale_not_a_group(self):
+        self.assertRaises(vnfm.InvalidScaleRequest, self._scale,
+                          {'vdu2': 3})
+        self.assertFalse(self.heat_client.update.called)
+
+    def test_update_scale_invalid_count(self):
+        self.assertRaises(vnfm.InvalidScaleRequest, self._scale,
+                          {'vdu1': -1})
+        self.assertFalse(self.heat_client.update.called)
+
+    def test_update_wait_refreshes_mgmt_url(self):
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='UPDATE_COMPLETE', outputs=[
+                {'output_key': 'mgmt_ip-vdu1',
+                 'output_value': ['192.168.120.31', '192.168.120.32']}])
+        device_obj = utils.get_dummy_device_obj()
+        self.heat_driver.update_wait(plugin=None, context=self.context,
+                                     device_id='stack',
+                                     auth_attr=utils.get_vim_auth_obj(),
+                                     device_dict=device_obj)
+        self.assertEqual('{"vdu1": ["192.168.120.31", "192.168.120.32"]}',
+                         device_obj['mgmt_url'])
+
+    def test_update_wait_for_scaling_to_start(self):
+        self.heat_driver._stack_events = mock.Mock(poll_interval=None)
+        outputs = [{'output_key': 'mgmt_ip-vdu1',
+                    'output_value': ['192.168.120.31', '192.168.120.32']}]
+        # heat still shows the previous update right after the request
+        self.heat_client.get.side_effect = [
+            mock.Mock(stack_status='UPDATE_COMPLETE', updated_time='t0',
+                      outputs=[]),
+            mock.Mock(stack_status='UPDATE_IN_PROGRESS', updated_time='t1'),
+            mock.Mock(stack_status='UPDATE_COMPLETE', updated_time='t1',
+                      outputs=outputs)]
+        device_obj = utils.get_dummy_device_obj()
+        device_obj['attributes'][heat.SCALE_UPDATED_TIME] = 't0'
+        self.heat_driver.update_wait(plugin=None, context=self.context,
+                                     device_id='stack',
+                                     auth_attr=utils.get_vim_auth_obj(),
+                                     device_dict=device_obj)
+        self.assertEqual(3, self.heat_client.get.call_count)
+        self.assertEqual('{"vdu1": ["192.168.120.31", "192.168.120.32"]}',
+                         device_obj['mgmt_url'])
+        self.assertNotIn(heat.SCALE_UPDATED_TIME, device_obj['attributes'])
+
+    def test_update_wait_failed(self):
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='UPDATE_FAILED', stack_status_reason='reason')
+        self.assertRaises(vnfm.DeviceUpdateWaitFailed,
+                          self.heat_driver.update_wait,
+                          plugin=None, context=self.context,
+                          device_id='stack',
+                          auth_attr=utils.get_vim_auth_obj(),
+                          device_dict=utils.get_dummy_device_obj())
+
     def test_create_device_template_pre_tosca(self):
         tosca_tpl = _get_template('test_tosca_openwrt.yaml')
         dtemplate = self._get_device_template(tosca_tpl)
@@ -274,6 +565,40 @@ class TestDeviceHeat(base.TestCase):
         self._test_assert_equal_for_tosca_templates('test_tosca_flavor.yaml',
             'hot_flavor.yaml')
 
+    def _create_tosca_with_shared_flavor(self):
+        self.config(share_flavors_and_images=True, group='tacker_heat')
+        self.heat_client.get.return_value = mock.Mock(
+            stack_status='CREATE_COMPLETE',
+            outputs=[{'output_key': 'id', 'output_value': 'flavor-id'}])
+        device = self._get_dummy_tosca_device('test_tosca_flavor.yaml')
+        self.heat_driver.create(plugin=None, context=self.context,
+                                device=device,
+                                auth_attr=utils.get_vim_auth_obj())
+        fields = self.heat_client.create.call_args[0][0]
+        template = yaml.safe_load(fields['template'])
+        self.assertEqual('flavor-id',
+                         template['resources']['VDU1']['properties']['flavor'])
+        self.assertNotIn('VDU1_flavor', template['resources'])
+        return fields
+
+    def test_create_tosca_with_shared_flavor(self):
+        self.heat_client.list.return_value = []
+        self._create_tosca_with_shared_flavor()
+        self.assertEqual(2, self.heat_client.create.call_count)
+        shared_fields = self.heat_client.create.call_args_list[0][0][0]
+        self.assertTrue(shared_fields['stack_name'].startswith(
+            heat.SHARED_STACK_PREFIX + 'flavor-'))
+        shared_template = yaml.safe_load(shared_fields['template'])
+        self.assertEqual({'type': 'OS::Nova::Flavor',
+                          'properties': {'disk': 10, 'ram': 512, 'vcpus': 2}},
+                         shared_template['resources']['flavor'])
+
+    def test_create_tosca_with_existing_shared_flavor(self):
+        self.heat_client.list.return_value = [mock.Mock(id='shared')]
+        self._create_tosca_with_shared_flavor()
+        self.heat_client.get.assert_called_once_with('shared')
+        self.assertEqual(1, self.heat_client.create.call_count)
+
     def test_create_tosca_with_new_flavor_with_defaults(self):
         self._test_assert_equal_for_tosca_templates(
             'test_tosca_flavor_defaults.yaml',
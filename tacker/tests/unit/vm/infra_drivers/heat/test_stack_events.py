@@ -0,0 +1,106 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+
+import eventlet
+import mock
+from oslo_config import cfg
+import oslo_messaging
+
+from tacker.common import rpc as n_rpc
+from tacker.tests import base
+from tacker.vm.infra_drivers.heat import stack_events
+
+STACK_ID = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
+STACK_IDENTITY = ('arn:openstack:heat::ad7ebc56538745a08ef7c5e97f8bd437:'
+                  'stacks/vnf/' + STACK_ID)
+
+
+class TestStackEvents(base.BaseTestCase):
+    def setUp(self):
+        super(TestStackEvents, self).setUp()
+        self.config(stack_notifications=True, group='tacker_heat')
+        self.config(lock_path=self.temp_dir, group='oslo_concurrency')
+        self.stack_events = stack_events.StackEvents()
+        self.stack_events.start()
+        self.addCleanup(self.stack_events._listener.stop)
+
+    def _notify(self):
+        self.stack_events.info({}, 'orchestration.host',
+                               'orchestration.stack.create.end',
+                               {'stack_identity': STACK_IDENTITY}, {})
+
+    def test_start_listens_on_fake_transport(self):
+        self.assertIsNotNone(self.stack_events._listener)
+        self.assertEqual(60, self.stack_events.poll_interval)
+
+    @mock.patch('os.getpid', return_value=4242)
+    @mock.patch.object(stack_events.lockutils, 'InterProcessLock')
+    @mock.patch.object(n_rpc, 'get_notification_listener')
+    def test_listener_per_worker(self, mock_get_listener, mock_lock,
+                                 mock_getpid):
+        # a forked API worker listens in a pool of its own, index 0 is
+        # held by the parent
+        mock_lock.return_value.acquire.side_effect = [False, True]
+        self.assertEqual(60, self.stack_events.poll_interval)
+        mock_get_listener.assert_called_once_with(
+            mock.ANY, [self.stack_events],
+            pool='tacker-%s-1' % cfg.CONF.host)
+        mock_lock.assert_called_with(
+            os.path.join(self.temp_dir, 'tacker-heat-notifications-1'))
+        self.assertEqual(60, self.stack_events.poll_interval)
+        self.assertEqual(1, mock_get_listener.call_count)
+
+    @mock.patch.object(n_rpc, 'get_notification_listener')
+    def test_listener_without_lock_path(self, mock_get_listener):
+        self.config(lock_path=None, group='oslo_concurrency')
+        stack_events.StackEvents().start()
+        mock_get_listener.assert_called_once_with(
+            mock.ANY, mock.ANY, pool='tacker-%s-0' % cfg.CONF.host)
+
+    def test_notification_wakes_waiter(self):
+        eventlet.spawn_after(0, self._notify)
+        with eventlet.Timeout(5):
+            self.stack_events.wait(STACK_ID, 60)
+        self.assertEqual({}, self.stack_events._waiters)
+
+    def test_notification_before_wait(self):
+        self._notify()
+        with eventlet.Timeout(5):
+            self.stack_events.wait(STACK_ID, 60)
+        self.assertNotIn(STACK_ID, self.stack_events._finished)
+
+    def test_heat_notification_over_fake_transport(self):
+        notifier = oslo_messaging.Notifier(
+            n_rpc.TRANSPORT, 'orchestration.host', driver='messaging',
+            topics=['notifications'])
+        eventlet.spawn_after(0, notifier.info, {},
+                             'orchestration.stack.delete.end',
+                             {'stack_identity': STACK_IDENTITY})
+        with eventlet.Timeout(5):
+            self.stack_events.wait(STACK_ID, 60)
+
+    def test_wait_times_out(self):
+        with eventlet.Timeout(5):
+            self.stack_events.wait(STACK_ID, 0.01)
+        self.assertEqual({}, self.stack_events._waiters)
+
+
+class TestStackEventsDisabled(base.BaseTestCase):
+    @mock.patch('time.sleep')
+    def test_wait_sleeps(self, mock_sleep):
+        events = stack_events.StackEvents()
+        events.start()
+        self.assertIsNone(events.poll_interval)
+        events.wait(STACK_ID, 5)
+        mock_sleep.assert_called_once_with(5)
@@ -0,0 +1,87 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import eventlet
+import mock
+
+from tacker.tests.unit import base
+from tacker.vm.infra_drivers.nova import nova
+
+
+def _get_server(server_id, status, updated='2016-07-01T10:00:00Z'):
+    return mock.Mock(id=server_id, status=status, updated=updated)
+
+
+def _built(status):
+    return status != 'BUILD'
+
+
+class TestServerPoller(base.TestCase):
+    def setUp(self):
+        super(TestServerPoller, self).setUp()
+        self.config(server_poll_interval=0, group='tacker_nova')
+        self.nova_client = mock.Mock()
+        self.poller = nova.ServerPoller(lambda: self.nova_client)
+
+    def test_wait_done(self):
+        status = self.poller.wait(_get_server('vm1', 'ACTIVE'), _built, 1)
+        self.assertEqual('ACTIVE', status)
+        self.assertFalse(self.nova_client.servers.list.called)
+
+    def test_wait_polls_servers_together(self):
+        self.nova_client.servers.list.return_value = [
+            _get_server('vm1', 'ACTIVE'), _get_server('vm2', 'ERROR'),
+            _get_server('vm3', 'ACTIVE')]
+        waits = [eventlet.spawn(self.poller.wait, server, _built, 1)
+                 for server in (
+                     _get_server('vm1', 'BUILD', '2016-07-01T10:00:05Z'),
+                     _get_server('vm2', 'BUILD', '2016-07-01T10:00:01Z'))]
+        self.assertEqual(['ACTIVE', 'ERROR'], [gt.wait() for gt in waits])
+        self.nova_client.servers.list.assert_any_call(
+            search_opts={'changes-since': '2016-07-01T10:00:01Z'})
+        self.assertEqual({}, self.poller._waiters)
+
+    def test_wait_timeout(self):
+        self.nova_client.servers.list.return_value = []
+        status = self.poller.wait(_get_server('vm1', 'BUILD'), _built,
+                                  0.01)
+        self.assertIsNone(status)
+        self.assertEqual({}, self.poller._waiters)
+
+
+class TestDeviceNova(base.TestCase):
+    def setUp(self):
+        super(TestDeviceNova, self).setUp()
+        self.nova_driver = nova.DeviceNova()
+        self.nova_client = mock.Mock()
+        self.make_nova_client = mock.Mock(return_value=self.nova_client)
+        self.nova_driver._make_nova_client = self.make_nova_client
+
+    def test_nova_client_is_cached(self):
+        self.assertIs(self.nova_client, self.nova_driver._nova_client())
+        self.assertIs(self.nova_client, self.nova_driver._nova_client())
+        self.make_nova_client.assert_called_once_with()
+
+    def test_create_wait_timeout(self):
+        self.nova_driver._poller = mock.Mock()
+        self.nova_driver._poller.wait.return_value = None
+        self.assertRaises(RuntimeError, self.nova_driver.create_wait,
+                          None, None, {}, 'vm1')
+        self.nova_client.servers.get.assert_called_once_with('vm1')
+
+    def test_delete_wait_deleted(self):
+        self.nova_driver._poller = mock.Mock()
+        self.nova_driver._poller.wait.return_value = 'DELETED'
+        self.nova_driver.delete_wait(None, None, 'vm1')
+        done = self.nova_driver._poller.wait.call_args[0][1]
+        self.assertTrue(done('DELETED'))
+        self.assertFalse(done('ACTIVE'))
@@ -0,0 +1,24 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from tacker.tests.unit import base
+from tacker.vm.infra_drivers import noop
+
+
+class TestDeviceNoop(base.TestCase):
+    def test_create_group_creates_devices_one_by_one(self):
+        driver = noop.DeviceNoop()
+        instance_ids = driver.create_group(
+            plugin=None, context=None, devices=[{'id': 'a'}, {'id': 'b'}],
+            auth_attr={})
+        self.assertEqual(['a', 'b'], sorted(instance_ids))
+        self.assertEqual(set(instance_ids.values()), driver._instances)
@@ -0,0 +1,107 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+
+from tacker import context
+from tacker.db.vm import lifecycle_db
+from tacker.tests.unit.db import base as db_base
+from tacker.vm import lifecycle
+
+DEVICE_ID = '6261579e-d6f3-49ad-8bc3-a9cb974778ff'
+
+
+class FakePlugin(lifecycle_db.LifecycleJobDbMixin):
+    def __init__(self):
+        super(FakePlugin, self).__init__()
+        self.spawn_n = mock.Mock()
+
+
+class TestLifecycleExecutor(db_base.SqlTestCase):
+    def setUp(self):
+        super(TestLifecycleExecutor, self).setUp()
+        self.addCleanup(mock.patch.stopall)
+        self._mock('eventlet.spawn')
+        self.context = context.get_admin_context()
+        self.plugin = FakePlugin()
+        self.executor = lifecycle.LifecycleExecutor(self.plugin)
+        self.handler = mock.Mock()
+        self.executor.register('create_wait', self.handler)
+
+    def _get_jobs(self):
+        return self.plugin._get_jobs_by_device(self.context, [DEVICE_ID])
+
+    def test_submit_persists_job(self):
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait',
+                                   {'key': 'value'})
+        self.plugin.spawn_n.assert_called_once_with(
+            self.executor._dispatch, self.context, job['id'])
+        jobs = self._get_jobs()
+        self.assertEqual(1, len(jobs))
+        self.assertEqual(lifecycle_db.JOB_PENDING, jobs[0]['status'])
+        self.assertEqual({'key': 'value'}, jobs[0]['payload'])
+
+    def test_dispatch_runs_handler_and_removes_job(self):
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait')
+        self.executor._dispatch(self.context, job['id'])
+        self.handler.assert_called_once_with(self.context, DEVICE_ID, {})
+        self.assertEqual([], self._get_jobs())
+
+    def test_dispatch_passes_in_memory_arguments(self):
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait',
+                                   vim_auth='auth')
+        self.plugin.spawn_n.assert_called_once_with(
+            self.executor._dispatch, self.context, job['id'],
+            vim_auth='auth')
+        self.executor._dispatch(self.context, job['id'], vim_auth='auth')
+        self.handler.assert_called_once_with(self.context, DEVICE_ID, {},
+                                             vim_auth='auth')
+        self.assertEqual([], self._get_jobs())
+
+    def test_dispatch_skips_job_claimed_by_other_worker(self):
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait')
+        self.plugin._claim_job(self.context, job['id'], 'other:1', 120)
+        self.executor._dispatch(self.context, job['id'])
+        self.assertFalse(self.handler.called)
+        self.assertEqual('other:1', self._get_jobs()[0]['owner'])
+
+    def test_dispatch_releases_failed_job_for_retry(self):
+        self.handler.side_effect = RuntimeError
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait')
+        self.executor._dispatch(self.context, job['id'])
+        jobs = self._get_jobs()
+        self.assertEqual(lifecycle_db.JOB_PENDING, jobs[0]['status'])
+        self.assertEqual(1, jobs[0]['attempts'])
+
+    def test_dispatch_drops_job_after_max_attempts(self):
+        self.handler.side_effect = RuntimeError
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait')
+        for _i in range(self.executor._max_attempts):
+            self.executor._dispatch(self.context, job['id'])
+        self.assertEqual(self.executor._max_attempts,
+                         self.handler.call_count)
+        self.assertEqual([], self._get_jobs())
+
+    def test_run_once_resumes_expired_lease(self):
+        job = self.executor.submit(self.context, DEVICE_ID, 'create_wait')
+        self.plugin._claim_job(self.context, job['id'], 'dead:1', 120)
+        self.plugin.spawn_n.reset_mock()
+        self.assertEqual([], self.executor.run_once())
+
+        expired = timeutils.utcnow() + datetime.timedelta(seconds=300)
+        with mock.patch.object(timeutils, 'utcnow', return_value=expired):
+            self.assertEqual([job['id']], self.executor.run_once())
+        self.plugin.spawn_n.assert_called_once_with(
+            self.executor._dispatch, mock.ANY, job['id'])
@@ -18,6 +18,7 @@ import mock
 from oslo_utils import timeutils
 import testtools
 
+from tacker.vm import monitor
 from tacker.vm.monitor import VNFMonitor
 
 MOCK_DEVICE_ID = 'a737497c-761c-11e5-89c3-9cb6541d805d'
@@ -107,3 +108,39 @@ class TestVNFMonitor(testtools.TestCase):
         self.mock_monitor_manager\
             .invoke.assert_called_once_with('ping', 'monitor_call', device={},
                                             kwargs=mock_kwargs)
+
+
+class TestActionRespawnHeat(testtools.TestCase):
+
+    def setUp(self):
+        super(TestActionRespawnHeat, self).setUp()
+        self.plugin = mock.Mock()
+        self.device_dict = {'id': MOCK_DEVICE_ID, 'instance_id': 'stack',
+                            'mgmt_url': '{"vdu1": "a.b.c.d"}',
+                            'attributes': {}}
+
+    def test_execute_action_replaces_vdu(self):
+        self.plugin._device_manager.invoke.return_value = True
+        monitor.ActionRespawnHeat.execute_action(
+            self.plugin, self.device_dict, 'auth', vdu='vdu1')
+        self.plugin._device_manager.invoke.assert_called_once_with(
+            'heat', 'respawn_vdu', plugin=self.plugin, context=mock.ANY,
+            device_dict=self.device_dict, vdu_name='vdu1', auth_attr='auth')
+        self.plugin._create_device_post.assert_called_once_with(
+            mock.ANY, MOCK_DEVICE_ID, 'stack', '{"vdu1": "a.b.c.d"}',
+            self.device_dict)
+        self.assertFalse(self.plugin.create_device_sync.called)
+        self.plugin.add_device_to_monitor.assert_called_once_with(
+            self.device_dict, 'auth')
+
+    def test_execute_action_recreates_stack(self):
+        self.plugin._device_manager.invoke.return_value = False
+        monitor.ActionRespawnHeat.execute_action(
+            self.plugin, self.device_dict, 'auth', vdu='vdu1')
+        self.plugin._device_manager.invoke.assert_called_with(
+            'heat', 'delete', plugin=self.plugin, context=mock.ANY,
+            device_id='stack', auth_attr='auth', region_name=None)
+        self.assertEqual('stack',
+                         self.device_dict['attributes']['dead_instance_id_1'])
+        self.plugin.create_device_sync.assert_called_once_with(
+            mock.ANY, self.device_dict)
@@ -13,12 +13,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+import json
+import re
+import socket
 import uuid
 
 import mock
+from oslo_utils import timeutils
+import sqlalchemy
 
 from tacker import context
+from tacker.db import api as db_api
 from tacker.db.nfvo import nfvo_db
+from tacker.db.vm import lifecycle_db
 from tacker.db.vm import vm_db
 from tacker.extensions import vnfm
 from tacker.tests.unit.db import base as db_base
@@ -26,6 +34,12 @@ from tacker.tests.unit.db import utils
 from tacker.vm import plugin
 
 
+# the connection ping of oslo.db and the transaction statements, which do
+# not touch the tables
+NON_TABLE_STATEMENT = re.compile(
+    r'\s*(SELECT 1|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.I)
+
+
 class FakeDriverManager(mock.Mock):
     def invoke(self, *args, **kwargs):
         if 'create' in args:
@@ -54,6 +68,8 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         self._mock_device_manager()
         self._mock_vnf_monitor()
         self._mock_green_pool()
+        self._mock('tacker.vm.lifecycle.LifecycleExecutor.start')
+        self._mock('tacker.vm.reconciler.DeviceReconciler.start')
         self._insert_dummy_vim()
         self.vnfm_plugin = plugin.VNFMPlugin()
 
@@ -95,10 +111,11 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         self._mock(
             'tacker.vm.monitor.VNFMonitor', fake_vnf_monitor)
 
-    def _insert_dummy_device_template(self):
+    def _insert_dummy_device_template(
+            self, template_id='eb094833-995e-49f0-a047-dfb56aaf7c4e'):
         session = self.context.session
         device_template = vm_db.DeviceTemplate(
-            id='eb094833-995e-49f0-a047-dfb56aaf7c4e',
+            id=template_id,
             tenant_id='ad7ebc56538745a08ef7c5e97f8bd437',
             name='fake_template',
             description='fake_template_description',
@@ -145,6 +162,14 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         session.add(vim_auth_db)
         session.flush()
 
+    def _assert_lifecycle_job(self, device_id, action):
+        jobs = self.vnfm_plugin._get_jobs_by_device(self.context,
+                                                    [device_id])
+        self.assertEqual(1, len(jobs))
+        self.assertEqual(action, jobs[0]['action'])
+        self.assertEqual(lifecycle_db.JOB_PENDING, jobs[0]['status'])
+        return jobs[0]
+
     def test_create_vnfd(self):
         vnfd_obj = utils.get_dummy_vnfd_obj()
         result = self.vnfm_plugin.create_vnfd(self.context, vnfd_obj)
@@ -188,7 +213,36 @@ class TestVNFMPlugin(db_base.SqlTestCase):
                                                        context=mock.ANY,
                                                        device=mock.ANY,
                                                        auth_attr=mock.ANY)
-        self._pool.spawn_n.assert_called_once_with(mock.ANY)
+        self._pool.spawn_n.assert_called_once_with(mock.ANY, mock.ANY,
+                                                   mock.ANY)
+        self._assert_lifecycle_job(result['id'], 'create_wait')
+
+    def test_create_vnf_bulk(self):
+        self._insert_dummy_device_template()
+        vnfs = {'vnfs': [utils.get_dummy_vnf_obj() for _i in range(3)]}
+        result = self.vnfm_plugin.create_vnf_bulk(self.context, vnfs)
+        self.assertEqual(3, len(result))
+        self.vim_client.get_vim.assert_called_once_with(
+            mock.ANY, '6261579e-d6f3-49ad-8bc3-a9cb974778ff', None)
+        self.assertEqual(3, self._pool.spawn_n.call_count)
+        self._pool.spawn_n.assert_called_with(mock.ANY, mock.ANY, mock.ANY,
+                                              vim_auth=mock.ANY)
+        for vnf in result:
+            self.assertEqual('PENDING_CREATE', vnf['status'])
+            self.assertIn('vnfd_id', vnf)
+            self._assert_lifecycle_job(vnf['id'], 'create')
+
+    def test_create_vnf_bulk_placement_group(self):
+        self._insert_dummy_device_template()
+        # a placement group size of 2 for every driver
+        self._device_manager.invoke = mock.Mock(return_value=2)
+        vnfs = {'vnfs': [utils.get_dummy_vnf_obj() for _i in range(3)]}
+        result = self.vnfm_plugin.create_vnf_bulk(self.context, vnfs)
+        self.assertEqual(2, self._pool.spawn_n.call_count)
+        job = self._assert_lifecycle_job(result[0]['id'], 'create_group')
+        self.assertEqual([result[0]['id'], result[1]['id']],
+                         job['payload']['device_ids'])
+        self._assert_lifecycle_job(result[2]['id'], 'create')
 
     def test_delete_vnf(self):
         self._insert_dummy_device_template()
@@ -203,7 +257,281 @@ class TestVNFMPlugin(db_base.SqlTestCase):
                                                        region_name=mock.ANY)
         self._vnf_monitor.delete_hosting_vnf.assert_called_with(mock.ANY)
         self._pool.spawn_n.assert_called_once_with(mock.ANY, mock.ANY,
-                                                   mock.ANY, mock.ANY)
+                                                   mock.ANY)
+        self._assert_lifecycle_job(dummy_device_obj['id'], 'delete_wait')
+
+    def _insert_standby_device(
+            self, device_id, status='ACTIVE',
+            template_id='eb094833-995e-49f0-a047-dfb56aaf7c4e'):
+        session = self.context.session
+        device_db = vm_db.Device(
+            id=device_id,
+            tenant_id='ad7ebc56538745a08ef7c5e97f8bd437',
+            name='standby-fake_template',
+            instance_id='da85ea1a-4ec4-4201-bbb2-8d9249eca7ec',
+            template_id=template_id,
+            vim_id='6261579e-d6f3-49ad-8bc3-a9cb974778ff',
+            placement_attr={},
+            status=status,
+            standby=True)
+        session.add(device_db)
+        session.flush()
+        return device_db
+
+    def test_create_vnf_claims_standby_device(self):
+        self.config(pools=['eb094833-995e-49f0-a047-dfb56aaf7c4e:'
+                           '6261579e-d6f3-49ad-8bc3-a9cb974778ff:1'],
+                    group='standby_pool')
+        self._mock('tacker.vm.standby.StandbyPool.start')
+        self.vnfm_plugin = plugin.VNFMPlugin()
+        self._insert_dummy_device_template()
+        self._insert_standby_device('ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61',
+                                    status='PENDING_CREATE')
+        standby_device = self._insert_standby_device(
+            'c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39')
+        vnf_obj = utils.get_dummy_vnf_obj()
+        vnf_obj['vnf']['attributes'] = {'config': 'config'}
+        result = self.vnfm_plugin.create_vnf(self.context, vnf_obj)
+        self.assertEqual(standby_device['id'], result['id'])
+        self.assertEqual('ACTIVE', result['status'])
+        self.assertEqual('config', result['attributes']['config'])
+        self.assertFalse(self._device_manager.invoke.called)
+        self._pool.spawn_n.assert_called_once_with(
+            self.vnfm_plugin.config_device, self.context, mock.ANY)
+
+        # the device is handed out only once
+        self.assertIsNone(self.vnfm_plugin._claim_standby_device(
+            self.context, standby_device['template_id'],
+            standby_device['vim_id'], {}))
+
+    def _count_queries(self, func, *args):
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, *args):
+            if not NON_TABLE_STATEMENT.match(statement):
+                statements.append(statement)
+
+        engine = db_api.get_engine()
+        sqlalchemy.event.listen(engine, 'before_cursor_execute',
+                                _before_cursor_execute)
+        try:
+            self.context.session.expunge_all()
+            result = func(*args)
+        finally:
+            sqlalchemy.event.remove(engine, 'before_cursor_execute',
+                                    _before_cursor_execute)
+        return result, len(statements)
+
+    def _query_plan(self, query):
+        engine = db_api.get_engine()
+        compiled = query.statement.compile(dialect=engine.dialect)
+        params = compiled.construct_params()
+        plan = engine.execute('EXPLAIN QUERY PLAN ' + str(compiled),
+                              tuple(params[name]
+                                    for name in compiled.positiontup))
+        return ' '.join(row['detail'] for row in plan)
+
+    def test_lookups_use_indexes(self):
+        session = self.context.session
+        template_id = 'eb094833-995e-49f0-a047-dfb56aaf7c4e'
+        vim_id = '6261579e-d6f3-49ad-8bc3-a9cb974778ff'
+        lookups = {
+            'ix_devices_status': session.query(vm_db.Device).filter(
+                vm_db.Device.status.in_(['PENDING_CREATE', 'ERROR'])),
+            'ix_devices_vim_id': session.query(vm_db.Device).filter(
+                vm_db.Device.vim_id == vim_id),
+            'ix_devices_template_id_vim_id': session.query(
+                vm_db.Device).filter(
+                vm_db.Device.template_id == template_id).filter(
+                vm_db.Device.vim_id == vim_id).filter(
+                vm_db.Device.standby == sqlalchemy.sql.true()),
+            'ix_servicetypes_template_id': session.query(
+                vm_db.ServiceType).filter(
+                vm_db.ServiceType.template_id == template_id),
+            'ix_vimauths_vim_id': session.query(nfvo_db.VimAuth).filter(
+                nfvo_db.VimAuth.vim_id == vim_id),
+            'ix_vims_name': session.query(nfvo_db.Vim).filter(
+                nfvo_db.Vim.name == 'fake_vim'),
+        }
+        for index, query in lookups.items():
+            self.assertIn('USING INDEX %s ' % index, self._query_plan(query))
+
+    def test_get_vnfs_loads_relationships_eagerly(self):
+        self._insert_dummy_device_template()
+        self._insert_standby_device('ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61')
+        self.vnfm_plugin.set_device_progress(
+            self.context, 'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61', '1/1')
+        vnfs, queries = self._count_queries(self.vnfm_plugin.get_vnfs,
+                                            self.context)
+        self.assertEqual(1, len(vnfs))
+
+        for device_id in ('c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39',
+                          '0b4d5a9c-3b1f-4c4e-8a3e-2f8d4c1e5b27'):
+            self._insert_standby_device(device_id)
+            self.vnfm_plugin.set_device_progress(self.context, device_id,
+                                                 '1/1')
+        vnfs, more_queries = self._count_queries(self.vnfm_plugin.get_vnfs,
+                                                 self.context)
+        self.assertEqual(3, len(vnfs))
+        self.assertEqual(queries, more_queries)
+        self.assertIs(vnfs[0]['device_template'], vnfs[2]['device_template'])
+        self.assertEqual({'progress': '1/1'}, vnfs[2]['attributes'])
+
+    def test_get_vnfs_paginated(self):
+        self._insert_dummy_device_template()
+        device_ids = sorted(['ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61',
+                             'c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39',
+                             '0b4d5a9c-3b1f-4c4e-8a3e-2f8d4c1e5b27'])
+        for device_id in device_ids:
+            self._insert_standby_device(device_id)
+        sorts = [('id', True)]
+        vnfs = self.vnfm_plugin.get_vnfs(self.context, sorts=sorts, limit=2)
+        self.assertEqual(device_ids[:2], [vnf['id'] for vnf in vnfs])
+        vnfs = self.vnfm_plugin.get_vnfs(self.context, sorts=sorts, limit=2,
+                                         marker=device_ids[1])
+        self.assertEqual(device_ids[2:], [vnf['id'] for vnf in vnfs])
+        vnfs = self.vnfm_plugin.get_vnfs(self.context, sorts=sorts, limit=2,
+                                         marker=device_ids[2],
+                                         page_reverse=True)
+        self.assertEqual(device_ids[:2], [vnf['id'] for vnf in vnfs])
+
+    def test_get_vnfs_sorted_by_vnfd_id(self):
+        vnfd_ids = ['eb094833-995e-49f0-a047-dfb56aaf7c4e',
+                    'f3c1b9d2-6a4e-4f8b-9c7d-2e5a8b1f0d36']
+        for vnfd_id in vnfd_ids:
+            self._insert_dummy_device_template(vnfd_id)
+        self._insert_standby_device('0b4d5a9c-3b1f-4c4e-8a3e-2f8d4c1e5b27',
+                                    template_id=vnfd_ids[0])
+        self._insert_standby_device('ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61',
+                                    template_id=vnfd_ids[1])
+        self._insert_standby_device('c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39',
+                                    template_id=vnfd_ids[0])
+        vnfs = self.vnfm_plugin.get_vnfs(
+            self.context, sorts=[('vnfd_id', False), ('id', True)])
+        self.assertEqual(['ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61',
+                          '0b4d5a9c-3b1f-4c4e-8a3e-2f8d4c1e5b27',
+                          'c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39'],
+                         [vnf['id'] for vnf in vnfs])
+        self.assertEqual([vnfd_ids[1], vnfd_ids[0], vnfd_ids[0]],
+                         [vnf['vnfd_id'] for vnf in vnfs])
+        vnfs = self.vnfm_plugin.get_vnfs(
+            self.context, sorts=[('vnfd_id', True), ('id', True)])
+        self.assertEqual([vnfd_ids[0], vnfd_ids[0], vnfd_ids[1]],
+                         [vnf['vnfd_id'] for vnf in vnfs])
+
+    def test_get_vnfs_loads_requested_fields_only(self):
+        self._insert_dummy_device_template()
+        self._insert_standby_device('ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61')
+        vnfs, queries = self._count_queries(self.vnfm_plugin.get_vnfs,
+                                            self.context, None,
+                                            ['id', 'status'])
+        self.assertEqual(1, queries)
+        self.assertEqual([{'id': 'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61',
+                           'status': 'ACTIVE'}], vnfs)
+        vnf, queries = self._count_queries(
+            self.vnfm_plugin.get_vnf, self.context,
+            'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61', ['vnfd_id'])
+        self.assertEqual(1, queries)
+        self.assertEqual(
+            {'vnfd_id': 'eb094833-995e-49f0-a047-dfb56aaf7c4e'}, vnf)
+
+    def test_get_vnf_summaries(self):
+        self._insert_dummy_device_template()
+        self._insert_standby_device('ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61')
+        self._insert_standby_device('c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39')
+        self._insert_standby_device('0b4d5a9c-3b1f-4c4e-8a3e-2f8d4c1e5b27',
+                                    status='ERROR')
+        summaries, queries = self._count_queries(
+            self.vnfm_plugin.get_vnf_summaries, self.context)
+        self.assertEqual(1, queries)
+        summary = {'tenant_id': 'ad7ebc56538745a08ef7c5e97f8bd437',
+                   'vnfd_id': 'eb094833-995e-49f0-a047-dfb56aaf7c4e',
+                   'vim_id': '6261579e-d6f3-49ad-8bc3-a9cb974778ff'}
+        self.assertEqual(
+            sorted([dict(summary, status='ACTIVE', count=2),
+                    dict(summary, status='ERROR', count=1)]),
+            sorted(summaries))
+        self.assertEqual(
+            [dict(summary, status='ERROR', count=1)],
+            self.vnfm_plugin.get_vnf_summaries(
+                self.context, filters={'status': ['ERROR']}))
+        other_context = context.Context('fake_user', 'other_tenant')
+        self.assertEqual(
+            [], self.vnfm_plugin.get_vnf_summaries(other_context))
+
+    def test_update_vnf_in_use(self):
+        self._insert_dummy_device_template()
+        device_db = self._insert_standby_device(
+            'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61', status='PENDING_UPDATE')
+        self.assertRaises(vnfm.DeviceInUse,
+                          self.vnfm_plugin._update_device_pre,
+                          self.context, device_db['id'])
+        self.assertRaises(vnfm.DeviceNotFound,
+                          self.vnfm_plugin._update_device_pre,
+                          self.context, 'c2a4ad49-4b95-4e3c-9d35-4d1b6c4b6b39')
+
+    def test_device_status_transitions_without_locking(self):
+        self._insert_dummy_device_template()
+        device_db = self._insert_standby_device(
+            'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61')
+        device_dict, queries = self._count_queries(
+            self.vnfm_plugin._delete_device_pre, self.context,
+            device_db['id'])
+        self.assertEqual('PENDING_DELETE', device_dict['status'])
+        # the conditional update, then the device and its template
+        self.assertEqual(3, queries)
+        self.assertTrue(self.vnfm_plugin._mark_device_error(device_db['id']))
+        self.assertEqual('ERROR', self.vnfm_plugin.get_vnf(
+            self.context, device_db['id'])['status'])
+        self.assertFalse(self.vnfm_plugin._mark_device_dead(device_db['id']))
+
+    def test_device_update_sets_updated_at(self):
+        self._insert_dummy_device_template()
+        device_id = self._insert_dummy_device()['id']
+        created_at = timeutils.utcnow()
+        later = created_at + datetime.timedelta(seconds=10)
+        self.assertEqual(set([device_id]),
+                         self.vnfm_plugin._get_devices_updated_before(
+                             self.context, [device_id], later))
+        timeutils.set_time_override(later)
+        self.addCleanup(timeutils.clear_time_override)
+        self.vnfm_plugin.set_device_error_status_reason(
+            self.context, device_id, 'reason')
+        self.assertEqual(set(),
+                         self.vnfm_plugin._get_devices_updated_before(
+                             self.context, [device_id], later))
+
+    def test_device_attributes_written_in_one_update(self):
+        self._insert_dummy_device_template()
+        device_db = self._insert_standby_device(
+            'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61', status='PENDING_CREATE')
+        self.vnfm_plugin.set_device_progress(self.context, device_db['id'],
+                                             '1/2 resources complete')
+        device_dict = {'status': 'PENDING_CREATE',
+                       'attributes': {'heat_template': 'template',
+                                      'vim_auth': {'password': 'secret'}}}
+        _result, queries = self._count_queries(
+            self.vnfm_plugin._create_device_post, self.context,
+            device_db['id'], 'instance-id', None, device_dict)
+        self.assertEqual(2, queries)
+        self.assertEqual({'heat_template': 'template',
+                          'progress': '1/2 resources complete'},
+                         self.vnfm_plugin.get_vnf(
+                             self.context, device_db['id'])['attributes'])
+
+    def test_device_attributes_replaced_in_one_update(self):
+        self._insert_dummy_device_template()
+        device_db = self._insert_standby_device(
+            'ab2e6c87-f46d-4f36-8c4c-1c1a0f4e1a61', status='PENDING_UPDATE')
+        attributes = dict(('key%d' % i, 'value%d' % i) for i in range(20))
+        device_dict = {'attributes': dict(attributes,
+                                          vim_auth={'password': 'secret'})}
+        _result, queries = self._count_queries(
+            self.vnfm_plugin._update_device_post, self.context,
+            device_db['id'], 'ACTIVE', device_dict)
+        self.assertEqual(1, queries)
+        self.assertEqual(attributes, self.vnfm_plugin.get_vnf(
+            self.context, device_db['id'])['attributes'])
 
     def test_update_vnf(self):
         self._insert_dummy_device_template()
@@ -218,4 +546,44 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         self.assertIn('attributes', result)
         self.assertIn('mgmt_url', result)
         self._pool.spawn_n.assert_called_once_with(mock.ANY, mock.ANY,
-                                                   mock.ANY, mock.ANY)
+                                                   mock.ANY)
+        job = self._assert_lifecycle_job(dummy_device_obj['id'],
+                                         'update_wait')
+        self.assertIn('attributes', job['payload'])
+
+    def _get_ready_device(self, monitoring_policy=None):
+        attributes = {'config': 'config'}
+        if monitoring_policy:
+            attributes['monitoring_policy'] = json.dumps(monitoring_policy)
+        return {'id': 'eb84260e-5ff7-4332-b032-50a14d6c1123',
+                'mgmt_url': '{"vdu1": "10.0.0.10"}',
+                'attributes': attributes}
+
+    @mock.patch('eventlet.sleep')
+    def test_wait_device_ready_probes_monitor_driver(self, mock_sleep):
+        device_dict = self._get_ready_device(
+            {'vdus': {'vdu1': {'ping': {'monitoring_params': {}}}}})
+        self._vnf_monitor.monitor_call.side_effect = ['failure', True]
+        self.vnfm_plugin._wait_device_ready(device_dict)
+        self._vnf_monitor.monitor_call.assert_called_with(
+            'ping', device_dict, {'mgmt_ip': '10.0.0.10'})
+        mock_sleep.assert_called_once_with(1)
+
+    @mock.patch('eventlet.sleep')
+    @mock.patch('socket.create_connection')
+    def test_wait_device_ready_probes_tcp_port(self, mock_connect,
+                                              mock_sleep):
+        mock_connect.side_effect = [socket.error, socket.error, mock.Mock()]
+        self.vnfm_plugin._wait_device_ready(self._get_ready_device())
+        mock_connect.assert_called_with(('10.0.0.10', 22), mock.ANY)
+        self.assertEqual([mock.call(1), mock.call(2)],
+                         mock_sleep.call_args_list)
+
+    @mock.patch('eventlet.sleep')
+    @mock.patch('socket.create_connection', side_effect=socket.error)
+    def test_wait_device_ready_gives_up_at_deadline(self, mock_connect,
+                                                   mock_sleep):
+        self.config(config_ready_timeout=10, group='tacker')
+        self.vnfm_plugin._wait_device_ready(self._get_ready_device())
+        self.assertEqual([mock.call(1), mock.call(2), mock.call(4),
+                          mock.call(8)], mock_sleep.call_args_list)
@@ -0,0 +1,146 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from tacker.plugins.common import constants
+from tacker.tests.unit import base
+from tacker.vm import reconciler
+
+DEVICE_ID = '6261579e-d6f3-49ad-8bc3-a9cb974778ff'
+STACK_ID = '4a4c2d44-8a52-4895-9a75-9d1c76c3e738'
+
+
+def _get_device(status, instance_id=STACK_ID, device_id=DEVICE_ID,
+                region_name='RegionOne'):
+    return {'id': device_id, 'status': status, 'instance_id': instance_id,
+            'vim_id': 'vim', 'placement_attr': {'region_name': region_name},
+            'device_template': {'infra_driver': 'heat'},
+            'attributes': {'config': 'config', 'vim_auth': 'secret'}}
+
+
+def _get_stack(status, stack_id=STACK_ID, device_id=DEVICE_ID):
+    return mock.Mock(id=stack_id, stack_status=status,
+                     stack_status_reason='reason',
+                     stack_name='tacker.vm.infra_drivers.heat.heat_'
+                                'DeviceHeat-' + device_id)
+
+
+class TestDeviceReconciler(base.TestCase):
+    def setUp(self):
+        super(TestDeviceReconciler, self).setUp()
+        self.plugin = mock.Mock()
+        self.plugin._infra_driver_name.side_effect = (
+            lambda device: device['device_template']['infra_driver'])
+        self.plugin._get_jobs_by_device.return_value = []
+        self.plugin._get_devices_updated_before.return_value = set()
+        self.executor = mock.Mock()
+        self.heat_client = mock.Mock()
+        self.heat_client.list.return_value = []
+        mock.patch('tacker.vm.infra_drivers.heat.heat.HeatClient',
+                   return_value=self.heat_client).start()
+        self.addCleanup(mock.patch.stopall)
+        self.reconciler = reconciler.DeviceReconciler(self.plugin,
+                                                      self.executor)
+
+    def _reconcile(self, devices, stacks=()):
+        self.plugin.get_devices.return_value = devices
+        self.heat_client.list.return_value = list(stacks)
+        self.reconciler.run_once()
+        return self.reconciler.run_once()
+
+    def test_first_pass_only_records_suspects(self):
+        self.plugin.get_devices.return_value = [
+            _get_device(constants.PENDING_CREATE)]
+        self.assertEqual([], self.reconciler.run_once())
+        self.plugin._get_devices_updated_before.assert_called_once_with(
+            mock.ANY, [DEVICE_ID], self.reconciler._started_at)
+        self.assertFalse(self.heat_client.list.called)
+
+    def test_startup_pass_reconciles_devices_idle_before_start(self):
+        self.plugin.get_devices.return_value = [
+            _get_device(constants.PENDING_DELETE)]
+        self.plugin._get_devices_updated_before.return_value = set(
+            [DEVICE_ID])
+        self.assertEqual([DEVICE_ID], self.reconciler.run_once())
+        self.plugin._delete_device_post.assert_called_once_with(
+            mock.ANY, DEVICE_ID, None)
+
+    def test_later_pass_needs_device_idle_on_last_pass(self):
+        self.plugin.get_devices.return_value = []
+        self.reconciler.run_once()
+        self.plugin.get_devices.return_value = [
+            _get_device(constants.PENDING_DELETE)]
+        self.plugin._get_devices_updated_before.return_value = set(
+            [DEVICE_ID])
+        self.assertEqual([], self.reconciler.run_once())
+        self.assertEqual([DEVICE_ID], self.reconciler.run_once())
+
+    def test_device_with_job_is_skipped(self):
+        self.plugin._get_jobs_by_device.return_value = [
+            {'device_id': DEVICE_ID}]
+        self.assertEqual([], self._reconcile(
+            [_get_device(constants.PENDING_CREATE)]))
+
+    def test_one_list_call_per_region(self):
+        devices = [_get_device(constants.PENDING_DELETE, device_id=str(i),
+                               region_name=region)
+                   for i, region in enumerate(['r1', 'r1', 'r2'])]
+        self._reconcile(devices)
+        self.assertEqual(2, self.heat_client.list.call_count)
+        self.assertEqual(3, self.plugin._delete_device_post.call_count)
+
+    def test_create_without_stack_goes_error(self):
+        device = _get_device(constants.PENDING_CREATE)
+        self._reconcile([device])
+        self.plugin._create_device_post.assert_called_once_with(
+            mock.ANY, DEVICE_ID, None, None, device)
+        self.assertEqual(constants.ERROR, device['status'])
+
+    def test_create_failed_stack_goes_error(self):
+        device = _get_device(constants.PENDING_CREATE)
+        self._reconcile([device], [_get_stack('CREATE_FAILED')])
+        self.plugin.set_device_error_status_reason.assert_called_once_with(
+            mock.ANY, DEVICE_ID, 'reason')
+        self.plugin._create_device_post.assert_called_once_with(
+            mock.ANY, DEVICE_ID, STACK_ID, None, device)
+        self.assertFalse(self.executor.submit.called)
+
+    def test_create_in_progress_records_stack_by_name(self):
+        device = _get_device(constants.PENDING_CREATE, instance_id=None)
+        self._reconcile([device], [_get_stack('CREATE_IN_PROGRESS')])
+        self.plugin._create_device_instance.assert_called_once_with(
+            mock.ANY, DEVICE_ID, STACK_ID, device)
+        self.executor.submit.assert_called_once_with(
+            mock.ANY, DEVICE_ID, 'create_wait')
+
+    def test_update_resubmits_stored_attributes(self):
+        self._reconcile([_get_device(constants.PENDING_UPDATE)],
+                        [_get_stack('CREATE_COMPLETE')])
+        self.executor.submit.assert_called_once_with(
+            mock.ANY, DEVICE_ID, 'update_wait',
+            {'attributes': {'config': 'config'}})
+
+    def test_delete_without_stack_removes_device(self):
+        self._reconcile([_get_device(constants.PENDING_DELETE)],
+                        [_get_stack('CREATE_COMPLETE', stack_id='other')])
+        self.plugin._delete_device_post.assert_called_once_with(
+            mock.ANY, DEVICE_ID, None)
+
+    def test_delete_not_issued_is_sent_again(self):
+        self._reconcile([_get_device(constants.PENDING_DELETE)],
+                        [_get_stack('CREATE_COMPLETE')])
+        self.plugin._device_manager.invoke.assert_called_once_with(
+            'heat', 'delete', plugin=self.plugin, context=mock.ANY,
+            device_id=STACK_ID, auth_attr=mock.ANY, region_name='RegionOne')
+        self.executor.submit.assert_called_once_with(
+            mock.ANY, DEVICE_ID, 'delete_wait')
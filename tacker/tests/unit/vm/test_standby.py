@@ -0,0 +1,100 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from tacker.plugins.common import constants
+from tacker.tests.unit import base
+from tacker.vm import standby
+
+TEMPLATE_ID = 'eb094833-995e-49f0-a047-dfb56aaf7c4e'
+VIM_ID = '6261579e-d6f3-49ad-8bc3-a9cb974778ff'
+
+
+class TestStandbyPool(base.TestCase):
+    def setUp(self):
+        super(TestStandbyPool, self).setUp()
+        self.config(pools=['%s:%s:3' % (TEMPLATE_ID, VIM_ID)],
+                    group='standby_pool')
+        self.plugin = mock.Mock()
+        self.plugin._get_standby_devices.return_value = []
+        self.plugin.get_device_template.return_value = {
+            'tenant_id': 'tenant', 'name': 'vnfd', 'description': ''}
+        self.pool = standby.StandbyPool(self.plugin)
+
+    def _get_request(self, **kwargs):
+        request = {'template_id': TEMPLATE_ID, 'vim_id': VIM_ID,
+                   'attributes': {'config': 'config'},
+                   'placement_attr': {}}
+        request.update(kwargs)
+        return request
+
+    def test_claim(self):
+        request = self._get_request()
+        self.plugin._claim_standby_device.return_value = {'id': 'standby'}
+        self.assertEqual({'id': 'standby'},
+                         self.pool.claim(mock.sentinel.context, request))
+        self.plugin._claim_standby_device.assert_called_once_with(
+            mock.sentinel.context, TEMPLATE_ID, VIM_ID, request)
+        self.assertEqual(1, self.pool.hits[(TEMPLATE_ID, VIM_ID)])
+
+    def test_claim_empty_pool(self):
+        self.plugin._claim_standby_device.return_value = None
+        self.assertIsNone(self.pool.claim(None, self._get_request()))
+        self.assertEqual(1, self.pool.misses[(TEMPLATE_ID, VIM_ID)])
+
+    def test_claim_skips_requests_with_parameters(self):
+        request = self._get_request(attributes={'param_values': 'values'})
+        self.assertIsNone(self.pool.claim(None, request))
+        self.assertIsNone(self.pool.claim(None, self._get_request(
+            vim_id='other')))
+        self.assertFalse(self.plugin._claim_standby_device.called)
+
+    def test_run_once_refills(self):
+        self.plugin._get_standby_devices.return_value = [
+            mock.Mock(id='1', status=constants.ACTIVE),
+            mock.Mock(id='2', status=constants.ERROR)]
+        self.plugin._create_devices_pre.side_effect = (
+            lambda context, devices: devices)
+        context = mock.MagicMock()
+        with mock.patch.object(standby.t_context, 'get_admin_context',
+                               return_value=context):
+            self.pool.run_once()
+        self.plugin.delete_device.assert_called_once_with(context, '2')
+        self.plugin._lock_device_template.assert_called_once_with(
+            context, TEMPLATE_ID)
+        devices = self.plugin._create_devices_pre.call_args[0][1]
+        self.assertEqual(2, len(devices))
+        self.assertTrue(devices[0]['standby'])
+        self.assertEqual('tenant', devices[0]['tenant_id'])
+        self.plugin._submit_create_jobs.assert_called_once_with(
+            context, devices, [self.plugin.get_vim.return_value] * 2)
+        self.assertTrue(self.pool.stats()[0]['refill_lag'] >= 0)
+
+    def test_run_once_refilled_by_other_worker(self):
+        # another worker topped the pool up while this one waited for the
+        # template lock
+        self.plugin._get_standby_devices.side_effect = [
+            [], [mock.Mock(id=str(i), status=constants.PENDING_CREATE)
+                 for i in range(3)]]
+        self.pool._refill(mock.MagicMock(), TEMPLATE_ID, VIM_ID, 3)
+        self.assertTrue(self.plugin._lock_device_template.called)
+        self.assertFalse(self.plugin._create_devices_pre.called)
+        self.assertFalse(self.plugin._submit_create_jobs.called)
+
+    def test_run_once_full_pool(self):
+        self.plugin._get_standby_devices.return_value = [
+            mock.Mock(id=str(i), status=constants.PENDING_CREATE)
+            for i in range(3)]
+        self.pool.run_once()
+        self.assertFalse(self.plugin._lock_device_template.called)
+        self.assertFalse(self.plugin._create_devices_pre.called)
@@ -13,6 +13,7 @@ import mock
 
 from oslo_config import cfg
 
+from tacker import context
 from tacker.extensions import nfvo
 from tacker import manager
 from tacker.tests.unit import base
@@ -30,3 +31,62 @@ class TestVIMClient(base.TestCase):
                                return_value=service_plugins):
             self.assertRaises(nfvo.VimDefaultNameNotDefined,
                               vimclient.get_vim, None)
+
+
+class TestVIMClientCache(base.TestCase):
+
+    def setUp(self):
+        super(TestVIMClientCache, self).setUp()
+        self.context = context.get_admin_context()
+        self.vimclient = vim_client.VimClient()
+        self._mock('tacker.vm.vim_client.VimClient._cache', {})
+        self.key_mtime = self._mock(
+            'tacker.vm.vim_client.VimClient._vim_key_mtime')
+        self.key_mtime.return_value = 1.0
+        self._mock('tacker.vm.vim_client.VimClient._decode_vim_auth',
+                   mock.Mock(return_value='decoded'))
+        self.nfvo_plugin = mock.Mock()
+        self.nfvo_plugin.get_vim.side_effect = self._get_vim
+        self._mock('tacker.manager.TackerManager.get_service_plugins',
+                   mock.Mock(return_value={'NFVO': self.nfvo_plugin}))
+
+    def _get_vim(self, context, vim_id, mask_password=False):
+        return {'id': vim_id, 'name': 'VIM0',
+                'auth_url': 'http://localhost:5000',
+                'auth_cred': {'username': 'admin', 'password': 'encoded'},
+                'placement_attr': {'regions': ['RegionOne']}}
+
+    def test_get_vim_cached(self):
+        vim = self.vimclient.get_vim(self.context, 'vim-id')
+        vim['vim_auth']['password'] = 'changed'
+        vim = self.vimclient.get_vim(self.context, 'vim-id',
+                                     region_name='RegionOne')
+        self.assertEqual('decoded', vim['vim_auth']['password'])
+        self.assertEqual(1, self.nfvo_plugin.get_vim.call_count)
+        self.assertRaises(nfvo.VimRegionNotFoundException,
+                          self.vimclient.get_vim, self.context, 'vim-id',
+                          region_name='RegionTwo')
+
+    def test_get_vim_cache_scoped_to_tenant(self):
+        self.vimclient.get_vim(self.context, 'vim-id')
+        self.vimclient.get_vim(
+            context.Context('user', 'tenant', is_admin=False), 'vim-id')
+        self.assertEqual(2, self.nfvo_plugin.get_vim.call_count)
+
+    def test_get_vim_key_file_changed(self):
+        self.vimclient.get_vim(self.context, 'vim-id')
+        self.key_mtime.return_value = 2.0
+        self.vimclient.get_vim(self.context, 'vim-id')
+        self.assertEqual(2, self.nfvo_plugin.get_vim.call_count)
+
+    def test_get_vim_expired(self):
+        self.config(vim_auth_cache_ttl=0, group='nfvo_vim')
+        self.vimclient.get_vim(self.context, 'vim-id')
+        self.vimclient.get_vim(self.context, 'vim-id')
+        self.assertEqual(2, self.nfvo_plugin.get_vim.call_count)
+
+    def test_invalidate(self):
+        self.vimclient.get_vim(self.context, 'vim-id')
+        vim_client.VimClient.invalidate('vim-id')
+        self.vimclient.get_vim(self.context, 'vim-id')
+        self.assertEqual(2, self.nfvo_plugin.get_vim.call_count)
@@ -0,0 +1,83 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import uuid
+
+import mock
+import six
+from webob import exc
+
+from tacker.extensions import vnfm
+from tacker.plugins.common import constants
+from tacker.tests.unit import test_api_v2
+from tacker.tests.unit import test_api_v2_extension
+
+
+_get_path = test_api_v2._get_path
+
+
+class VnfmExtensionTestCase(test_api_v2_extension.ExtensionTestCase):
+    fmt = 'json'
+
+    _PATH_VNF_SUMMARIES = 'vnf-summaries'
+
+    def setUp(self):
+        super(VnfmExtensionTestCase, self).setUp()
+        self._setUpExtension(
+            'tacker.extensions.vnfm.VNFMPluginBase',
+            constants.VNFM, vnfm.RESOURCE_ATTRIBUTE_MAP,
+            vnfm.Vnfm, None, translate_resource_name=True)
+        instance = self.plugin.return_value
+        # the mocked plugin answers like the real one does
+        for action in ('get', 'create', 'update', 'delete'):
+            name = '%s_vnf_summary' % action
+            getattr(instance, name).side_effect = six.get_unbound_function(
+                getattr(vnfm.VNFMPluginBase, name))
+
+    def test_vnf_summary_list(self):
+        return_value = [{
+            'tenant_id': str(uuid.uuid4()),
+            'vnfd_id': str(uuid.uuid4()),
+            'vim_id': str(uuid.uuid4()),
+            'status': constants.ACTIVE,
+            'count': 2,
+        }]
+        instance = self.plugin.return_value
+        instance.get_vnf_summaries.return_value = return_value
+
+        res = self.api.get(_get_path(self._PATH_VNF_SUMMARIES, fmt=self.fmt))
+        instance.get_vnf_summaries.assert_called_with(
+            mock.ANY, fields=mock.ANY, filters=mock.ANY)
+        self.assertEqual(exc.HTTPOk.code, res.status_int)
+        self.assertEqual(return_value,
+                         self.deserialize(res)['vnf_summaries'])
+
+    def test_vnf_summary_get(self):
+        res = self.api.get(
+            _get_path(self._PATH_VNF_SUMMARIES, id=str(uuid.uuid4()),
+                      fmt=self.fmt),
+            expect_errors=True)
+        self.assertEqual(exc.HTTPNotImplemented.code, res.status_int)
+
+    def test_vnf_summary_create(self):
+        res = self.api.post(
+            _get_path(self._PATH_VNF_SUMMARIES, fmt=self.fmt),
+            self.serialize({'vnf_summary': {}}),
+            content_type='application/%s' % self.fmt, expect_errors=True)
+        self.assertEqual(exc.HTTPNotImplemented.code, res.status_int)
+
+    def test_vnf_summary_delete(self):
+        res = self.api.delete(
+            _get_path(self._PATH_VNF_SUMMARIES, id=str(uuid.uuid4()),
+                      fmt=self.fmt),
+            expect_errors=True)
+        self.assertEqual(exc.HTTPNotImplemented.code, res.status_int)
@@ -51,6 +51,23 @@ class DeviceAbstractDriver(extensions.PluginInterface):
     def create_wait(self, plugin, context, device_dict, device_id):
         """wait for device creation to complete."""
 
+    def get_placement_group_size(self):
+        """Return how many devices create_group may create together."""
+        return 1
+
+    # @abc.abstractmethod
+    def create_group(self, plugin, context, devices, auth_attr):
+        """Create devices together and return dict of device id to id.
+
+        Only called by the plugin when get_placement_group_size() returns
+        more than 1. All devices share their template and VIM region.
+        Drivers that cannot create devices together create them one by one.
+        """
+        return dict((device['id'],
+                     self.create(plugin=plugin, context=context,
+                                 device=device, auth_attr=auth_attr))
+                    for device in devices)
+
     @abc.abstractmethod
     def update(self, plugin, context, device_id, device_dict, device):
         # device_dict: old device_dict to be updated
@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import sys
 import time
 
@@ -31,6 +32,7 @@ from tacker.common import clients
 from tacker.common import log
 from tacker.extensions import vnfm
 from tacker.vm.infra_drivers import abstract_driver
+from tacker.vm.infra_drivers.heat import stack_events
 from tacker.vm.tosca import utils as toscautils
 
 
@@ -48,11 +50,52 @@ OPTS = [
     cfg.DictOpt('flavor_extra_specs',
                default={},
                help=_("Flavor Extra Specs")),
+    cfg.IntOpt('placement_group_size',
+               default=0,
+               help=_("Maximum number of devices of a bulk create that are "
+                      "packed as nested stacks into one heat stack. 0 or 1 "
+                      "creates one stack per device")),
+    cfg.BoolOpt('share_flavors_and_images',
+                default=False,
+                help=_("Create the flavors and images of TOSCA VDUs once "
+                       "per VIM region in a shared stack and reuse them "
+                       "for every VNF with the same flavor or image, "
+                       "instead of creating them in each VNF stack. Shared "
+                       "flavors and images are not removed with the VNFs")),
+    cfg.BoolOpt('track_stack_events',
+                default=False,
+                help=_("Follow the events of a stack being created instead "
+                       "of fetching the whole stack on every poll, and show "
+                       "the number of completed resources on the device")),
+    cfg.StrOpt('respawn_mode',
+               default='stack',
+               choices=['stack', 'vdu'],
+               help=_("How the respawn monitor action recovers a device. "
+                      "'stack' recreates the whole stack, 'vdu' replaces "
+                      "only the server of the failed VDU with a stack "
+                      "update")),
 ]
 CONF.register_opts(OPTS, group='tacker_heat')
 STACK_RETRIES = cfg.CONF.tacker_heat.stack_retries
 STACK_RETRY_WAIT = cfg.CONF.tacker_heat.stack_retry_wait
 STACK_FLAVOR_EXTRA = cfg.CONF.tacker_heat.flavor_extra_specs
+TEMPLATE_CACHE_SIZE = 64
+
+# instance id of a device in a placement group: <stack id>#<resource name>
+GROUP_SEPARATOR = '#'
+
+# name prefix of the stacks holding the flavors and images shared by VNFs
+SHARED_STACK_PREFIX = 'tacker-shared-'
+
+# property holding the number of members of the scalable resource types
+SCALING_GROUP_PROPERTIES = {
+    'OS::Heat::ResourceGroup': 'count',
+    'OS::Heat::AutoScalingGroup': 'desired_capacity',
+}
+
+# device attribute holding the updated_time of a stack before it was scaled,
+# until update_wait has seen the stack enter the scaling update
+SCALE_UPDATED_TIME = 'scale_stack_updated_time'
 
 # Global map of individual resource type and
 # incompatible properties, alternate properties pair for
@@ -75,6 +118,12 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
 
     def __init__(self):
         super(DeviceHeat, self).__init__()
+        self._translated_templates = {}
+        # (auth url, region, shared stack name) -> flavor or image id
+        self._shared_resources = {}
+        self._stack_events = stack_events.StackEvents()
+        self._stack_events.start()
+        self._group_stacks = {}
 
     def get_type(self):
         return 'heat'
@@ -251,8 +300,198 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
         return unsupported_resource_prop
 
     @log.log
-    def create(self, plugin, context, device, auth_attr):
-        LOG.debug(_('device %s'), device)
+    def _translate_vnfd(self, heatclient_, vnfd_yaml, dev_attrs, fields):
+        """Translate a VNFD into a heat template.
+
+        :return: tuple of the heat template, the monitoring policy and the
+                 attributes to add to the device
+        """
+        unsupported_res_prop = self.fetch_unsupported_resource_prop(
+            heatclient_)
+        vdu_attrs = {}
+        vnfd_dict = yamlparser.simple_ordered_parse(vnfd_yaml)
+        LOG.debug('vnfd_dict %s', vnfd_dict)
+
+        monitoring_dict = {'vdus': {}}
+
+        if 'tosca_definitions_version' in vnfd_dict:
+            parsed_params = dev_attrs.pop('param_values', {})
+
+            toscautils.updateimports(vnfd_dict)
+
+            try:
+                tosca = ToscaTemplate(parsed_params=parsed_params,
+                                  a_file=False, yaml_dict_tpl=vnfd_dict)
+
+            except Exception as e:
+                LOG.debug("tosca-parser error: %s", str(e))
+                raise vnfm.ToscaParserFailed(error_msg_details=str(e))
+
+            monitoring_dict = toscautils.get_vdu_monitoring(tosca)
+            mgmt_ports = toscautils.get_mgmt_ports(tosca)
+            res_tpl = toscautils.get_resources_dict(tosca,
+                                                    STACK_FLAVOR_EXTRA)
+            existing_res = self._share_resources(heatclient_, res_tpl)
+            toscautils.post_process_template(tosca)
+            try:
+                translator = TOSCATranslator(tosca, parsed_params)
+                heat_template_yaml = translator.translate()
+            except Exception as e:
+                LOG.debug("heat-translator error: %s", str(e))
+                raise vnfm.HeatTranslatorFailed(error_msg_details=str(e))
+            heat_template_yaml = toscautils.post_process_heat_template(
+                heat_template_yaml, mgmt_ports, res_tpl,
+                unsupported_res_prop, existing_res)
+        else:
+            assert 'template' not in fields
+            assert 'template_url' not in fields
+            template_dict = yaml.load(HEAT_TEMPLATE_BASE)
+            outputs_dict = {}
+            template_dict['outputs'] = outputs_dict
+
+            if 'get_input' in vnfd_yaml:
+                self._process_parameterized_input(dev_attrs, vnfd_dict)
+
+            KEY_LIST = (('description', 'description'), )
+            for (key, vnfd_key) in KEY_LIST:
+                if vnfd_key in vnfd_dict:
+                    template_dict[key] = vnfd_dict[vnfd_key]
+
+            for vdu_id, vdu_dict in vnfd_dict.get('vdus', {}).items():
+                template_dict.setdefault('resources', {})[vdu_id] = {
+                    "type": "OS::Nova::Server"
+                }
+                resource_dict = template_dict['resources'][vdu_id]
+                KEY_LIST = (('image', 'vm_image'),
+                            ('flavor', 'instance_type'))
+                resource_dict['properties'] = {}
+                properties = resource_dict['properties']
+                for (key, vdu_key) in KEY_LIST:
+                    properties[key] = vdu_dict[vdu_key]
+                if 'network_interfaces' in vdu_dict:
+                    self._process_vdu_network_interfaces(vdu_id,
+                     vdu_dict, properties, template_dict,
+                     unsupported_res_prop)
+                if ('user_data' in vdu_dict and
+                        'user_data_format' in vdu_dict):
+                    properties['user_data_format'] = vdu_dict[
+                        'user_data_format']
+                    properties['user_data'] = vdu_dict['user_data']
+                elif ('user_data' in vdu_dict or
+                        'user_data_format' in vdu_dict):
+                    raise vnfm.UserDataFormatNotFound()
+                if 'placement_policy' in vdu_dict:
+                    if 'availability_zone' in vdu_dict['placement_policy']:
+                        properties['availability_zone'] = vdu_dict[
+                            'placement_policy']['availability_zone']
+                if 'config' in vdu_dict:
+                    properties['config_drive'] = True
+                    metadata = properties.setdefault('metadata', {})
+                    metadata.update(vdu_dict['config'])
+                    for key, value in metadata.items():
+                        metadata[key] = value[:255]
+                if 'key_name' in vdu_dict:
+                    properties['key_name'] = vdu_dict['key_name']
+
+                monitoring_policy = vdu_dict.get('monitoring_policy',
+                                                 'noop')
+                failure_policy = vdu_dict.get('failure_policy', 'noop')
+
+                # Convert the old monitoring specification to the new
+                # network.  This should be removed after Mitaka
+                if (monitoring_policy == 'ping' and
+                        failure_policy == 'respawn'):
+                    vdu_dict['monitoring_policy'] = {
+                        'ping': {'actions': {'failure': 'respawn'}}}
+                    vdu_dict.pop('failure_policy')
+
+                if monitoring_policy != 'noop':
+                    monitoring_dict['vdus'][vdu_id] = \
+                        vdu_dict['monitoring_policy']
+
+                # to pass necessary parameters to plugin upwards.
+                for key in ('service_type',):
+                    if key in vdu_dict:
+                        vdu_attrs[vdu_id] = jsonutils.dumps(
+                            {key: vdu_dict[key]})
+
+                heat_template_yaml = yaml.dump(template_dict)
+
+        return heat_template_yaml, monitoring_dict, vdu_attrs
+
+    def _share_resources(self, heatclient_, res_tpl):
+        """Replace the flavors and images of res_tpl by shared ones.
+
+        :return: dict of resource type to dict of VDU name to the id of
+                 the shared resource. They are removed from res_tpl.
+        """
+        existing_res = {}
+        if not CONF.tacker_heat.share_flavors_and_images:
+            return existing_res
+        for res, res_dict in res_tpl.items():
+            for vdu, properties in list(res_dict.items()):
+                res_id = self._get_shared_resource(heatclient_, res,
+                                                   properties)
+                if res_id is not None:
+                    existing_res.setdefault(res, {})[vdu] = res_id
+                    del res_dict[vdu]
+        return existing_res
+
+    def _get_shared_resource(self, heatclient_, res, properties):
+        # equal flavor specs or image artifacts share one stack whose name
+        # is derived from their content
+        digest = hashlib.sha1(jsonutils.dumps(
+            [res, properties], sort_keys=True).encode('utf-8')).hexdigest()
+        stack_name = SHARED_STACK_PREFIX + res + '-' + digest
+        cache_key = (heatclient_.auth_url, heatclient_.region_name,
+                     stack_name)
+        res_id = self._shared_resources.get(cache_key)
+        if res_id is not None:
+            return res_id
+
+        try:
+            stacks = list(heatclient_.list(filters={'name': stack_name}))
+            if stacks:
+                stack_id = stacks[0].id
+            else:
+                template = {
+                    'heat_template_version': '2013-05-23',
+                    'resources': {res: {
+                        'type': toscautils.HEAT_RESOURCE_MAP[res],
+                        'properties': properties}},
+                    'outputs': {'id': {'value': {'get_resource': res}}}}
+                stack_id = heatclient_.create(
+                    {'stack_name': stack_name,
+                     'template': yaml.dump(template)})['stack']['id']
+            stack = heatclient_.get(stack_id)
+            stack_retries = STACK_RETRIES
+            while (stack.stack_status == 'CREATE_IN_PROGRESS' and
+                   stack_retries > 0):
+                time.sleep(STACK_RETRY_WAIT)
+                stack = heatclient_.get(stack_id)
+                stack_retries = stack_retries - 1
+        except Exception:
+            LOG.exception(_("failed to get shared %(res)s %(stack)s, the "
+                            "VNF stack creates its own"),
+                          {'res': res, 'stack': stack_name})
+            return None
+        if stack.stack_status != 'CREATE_COMPLETE':
+            LOG.warning(_("shared %(res)s stack %(stack)s is %(status)s, "
+                          "the VNF stack creates its own"),
+                        {'res': res, 'stack': stack_name,
+                         'status': stack.stack_status})
+            return None
+
+        res_id = dict((output['output_key'], output['output_value'])
+                      for output in stack.outputs).get('id')
+        if res_id is not None:
+            if len(self._shared_resources) >= TEMPLATE_CACHE_SIZE:
+                self._shared_resources.clear()
+            self._shared_resources[cache_key] = res_id
+        return res_id
+
+    def _get_stack_fields(self, device, heatclient_, auth_attr,
+                          region_name):
         attributes = device['device_template']['attributes'].copy()
         vnfd_yaml = attributes.pop('vnfd', None)
         fields = dict((key, attributes.pop(key)) for key
@@ -272,120 +511,21 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
                 fields.setdefault(key, {}).update(
                     jsonutils.loads(dev_attrs.pop(key)))
 
-        region_name = device.get('placement_attr', {}).get('region_name', None)
-        heatclient_ = HeatClient(auth_attr, region_name)
-        unsupported_res_prop = self.fetch_unsupported_resource_prop(
-            heatclient_)
-
         LOG.debug('vnfd_yaml %s', vnfd_yaml)
         if vnfd_yaml is not None:
-            vnfd_dict = yamlparser.simple_ordered_parse(vnfd_yaml)
-            LOG.debug('vnfd_dict %s', vnfd_dict)
-
-            monitoring_dict = {'vdus': {}}
-
-            if 'tosca_definitions_version' in vnfd_dict:
-                parsed_params = dev_attrs.pop('param_values', {})
-
-                toscautils.updateimports(vnfd_dict)
-
-                try:
-                    tosca = ToscaTemplate(parsed_params=parsed_params,
-                                      a_file=False, yaml_dict_tpl=vnfd_dict)
-
-                except Exception as e:
-                    LOG.debug("tosca-parser error: %s", str(e))
-                    raise vnfm.ToscaParserFailed(error_msg_details=str(e))
-
-                monitoring_dict = toscautils.get_vdu_monitoring(tosca)
-                mgmt_ports = toscautils.get_mgmt_ports(tosca)
-                res_tpl = toscautils.get_resources_dict(tosca,
-                                                        STACK_FLAVOR_EXTRA)
-                toscautils.post_process_template(tosca)
-                try:
-                    translator = TOSCATranslator(tosca, parsed_params)
-                    heat_template_yaml = translator.translate()
-                except Exception as e:
-                    LOG.debug("heat-translator error: %s", str(e))
-                    raise vnfm.HeatTranslatorFailed(error_msg_details=str(e))
-                heat_template_yaml = toscautils.post_process_heat_template(
-                    heat_template_yaml, mgmt_ports, res_tpl,
-                    unsupported_res_prop)
-            else:
-                assert 'template' not in fields
-                assert 'template_url' not in fields
-                template_dict = yaml.load(HEAT_TEMPLATE_BASE)
-                outputs_dict = {}
-                template_dict['outputs'] = outputs_dict
-
-                if 'get_input' in vnfd_yaml:
-                    self._process_parameterized_input(dev_attrs, vnfd_dict)
-
-                KEY_LIST = (('description', 'description'), )
-                for (key, vnfd_key) in KEY_LIST:
-                    if vnfd_key in vnfd_dict:
-                        template_dict[key] = vnfd_dict[vnfd_key]
-
-                for vdu_id, vdu_dict in vnfd_dict.get('vdus', {}).items():
-                    template_dict.setdefault('resources', {})[vdu_id] = {
-                        "type": "OS::Nova::Server"
-                    }
-                    resource_dict = template_dict['resources'][vdu_id]
-                    KEY_LIST = (('image', 'vm_image'),
-                                ('flavor', 'instance_type'))
-                    resource_dict['properties'] = {}
-                    properties = resource_dict['properties']
-                    for (key, vdu_key) in KEY_LIST:
-                        properties[key] = vdu_dict[vdu_key]
-                    if 'network_interfaces' in vdu_dict:
-                        self._process_vdu_network_interfaces(vdu_id,
-                         vdu_dict, properties, template_dict,
-                         unsupported_res_prop)
-                    if ('user_data' in vdu_dict and
-                            'user_data_format' in vdu_dict):
-                        properties['user_data_format'] = vdu_dict[
-                            'user_data_format']
-                        properties['user_data'] = vdu_dict['user_data']
-                    elif ('user_data' in vdu_dict or
-                            'user_data_format' in vdu_dict):
-                        raise vnfm.UserDataFormatNotFound()
-                    if 'placement_policy' in vdu_dict:
-                        if 'availability_zone' in vdu_dict['placement_policy']:
-                            properties['availability_zone'] = vdu_dict[
-                                'placement_policy']['availability_zone']
-                    if 'config' in vdu_dict:
-                        properties['config_drive'] = True
-                        metadata = properties.setdefault('metadata', {})
-                        metadata.update(vdu_dict['config'])
-                        for key, value in metadata.items():
-                            metadata[key] = value[:255]
-                    if 'key_name' in vdu_dict:
-                        properties['key_name'] = vdu_dict['key_name']
-
-                    monitoring_policy = vdu_dict.get('monitoring_policy',
-                                                     'noop')
-                    failure_policy = vdu_dict.get('failure_policy', 'noop')
-
-                    # Convert the old monitoring specification to the new
-                    # network.  This should be removed after Mitaka
-                    if (monitoring_policy == 'ping' and
-                            failure_policy == 'respawn'):
-                        vdu_dict['monitoring_policy'] = {
-                            'ping': {'actions': {'failure': 'respawn'}}}
-                        vdu_dict.pop('failure_policy')
-
-                    if monitoring_policy != 'noop':
-                        monitoring_dict['vdus'][vdu_id] = \
-                            vdu_dict['monitoring_policy']
-
-                    # to pass necessary parameters to plugin upwards.
-                    for key in ('service_type',):
-                        if key in vdu_dict:
-                            device.setdefault(
-                                'attributes', {})[vdu_id] = jsonutils.dumps(
-                                    {key: vdu_dict[key]})
-
-                    heat_template_yaml = yaml.dump(template_dict)
+            # devices created from the same VNFD and parameters on the same
+            # VIM region share their translation
+            cache_key = (vnfd_yaml, dev_attrs.get('param_values'),
+                         auth_attr.get('auth_url'), region_name)
+            translated = self._translated_templates.get(cache_key)
+            if translated is None:
+                translated = self._translate_vnfd(heatclient_, vnfd_yaml,
+                                                  dev_attrs, fields)
+                if len(self._translated_templates) >= TEMPLATE_CACHE_SIZE:
+                    self._translated_templates.clear()
+                self._translated_templates[cache_key] = translated
+            heat_template_yaml, monitoring_dict, vdu_attrs = translated
+            device.setdefault('attributes', {}).update(vdu_attrs)
 
             fields['template'] = heat_template_yaml
             if not device['attributes'].get('heat_template'):
@@ -403,6 +543,15 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
                 name += ('-RESPAWN-%s') % str(device['attributes'][
                     'failure_count'])
             fields['stack_name'] = name
+        return fields
+
+    @log.log
+    def create(self, plugin, context, device, auth_attr):
+        LOG.debug(_('device %s'), device)
+        region_name = device.get('placement_attr', {}).get('region_name', None)
+        heatclient_ = HeatClient(auth_attr, region_name)
+        fields = self._get_stack_fields(device, heatclient_, auth_attr,
+                                        region_name)
 
         # service context is ignored
         LOG.debug(_('service_context: %s'), device.get('service_context', []))
@@ -412,17 +561,139 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
         stack = heatclient_.create(fields)
         return stack['stack']['id']
 
+    def get_placement_group_size(self):
+        return max(CONF.tacker_heat.placement_group_size, 1)
+
+    @log.log
+    def create_group(self, plugin, context, devices, auth_attr):
+        """Create devices as nested stacks of one heat stack.
+
+        :return: dict of device id to instance id
+        """
+        region_name = devices[0].get('placement_attr', {}).get(
+            'region_name', None)
+        heatclient_ = HeatClient(auth_attr, region_name)
+        template_dict = yaml.load(HEAT_TEMPLATE_BASE)
+        resources = template_dict.setdefault('resources', {})
+        outputs = template_dict.setdefault('outputs', {})
+        files = {}
+        # template -> (file name, output keys) of the nested stacks
+        template_files = {}
+        instance_ids = {}
+        for index, device in enumerate(devices):
+            fields = self._get_stack_fields(device, heatclient_, auth_attr,
+                                            region_name)
+            files.update(fields.get('files', {}))
+            if 'template' in fields:
+                template = fields['template']
+                if template not in template_files:
+                    name = 'vnf-%d.yaml' % len(template_files)
+                    files[name] = template
+                    template_files[template] = (
+                        name, yaml.load(template).get('outputs') or {})
+                nested_type, nested_outputs = template_files[template]
+            else:
+                nested_type = fields['template_url']
+                nested_outputs = {}
+
+            resource_name = 'vnf%d' % index
+            resources[resource_name] = {
+                'type': nested_type,
+                'properties': fields.get('parameters', {})}
+            for key in nested_outputs:
+                if key.startswith('mgmt_ip-'):
+                    outputs[resource_name + ':' + key] = {
+                        'value': {'get_attr': [resource_name, key]}}
+            instance_ids[device['id']] = resource_name
+
+        fields = {'stack_name': (__name__ + '_' + self.__class__.__name__ +
+                                 '-group-' + devices[0]['id']),
+                  'template': yaml.dump(template_dict),
+                  'files': files}
+        LOG.debug(_('fields: %s'), fields)
+        stack = heatclient_.create(fields)
+        stack_id = stack['stack']['id']
+        return dict((device_id, stack_id + GROUP_SEPARATOR + resource_name)
+                    for device_id, resource_name in instance_ids.items())
+
+    @staticmethod
+    def _split_instance_id(instance_id):
+        stack_id, _sep, resource_name = instance_id.partition(
+            GROUP_SEPARATOR)
+        return stack_id, resource_name or None
+
+    def _get_group_stack(self, heatclient_, stack_id):
+        # all members of a placement group share the polls of their stack
+        now = time.time()
+        cached = self._group_stacks.get(stack_id)
+        if cached is None or now - cached[0] >= STACK_RETRY_WAIT:
+            if len(self._group_stacks) >= TEMPLATE_CACHE_SIZE:
+                self._group_stacks.clear()
+            cached = self._group_stacks[stack_id] = (
+                now, heatclient_.get(stack_id))
+        return cached[1]
+
+    @staticmethod
+    def _set_mgmt_url(device_dict, outputs, prefix=''):
+        LOG.debug(_('outputs %s'), outputs)
+        PREFIX = prefix + 'mgmt_ip-'
+        mgmt_ips = dict((output['output_key'][len(PREFIX):],
+                         output['output_value'])
+                        for output in outputs
+                        if output.get('output_key', '').startswith(PREFIX))
+        if mgmt_ips:
+            device_dict['mgmt_url'] = jsonutils.dumps(mgmt_ips)
+
+    def _get_stack_polling(self):
+        """Return the number of polls of a stack and the wait between them.
+
+        With heat notifications the waiters are woken up when the stack is
+        done, so it is polled rarely within the same total wait time.
+        """
+        interval = self._stack_events.poll_interval
+        if not interval or interval <= STACK_RETRY_WAIT:
+            return STACK_RETRIES, STACK_RETRY_WAIT
+        return max(STACK_RETRIES * STACK_RETRY_WAIT // interval, 1), interval
+
+    def _create_group_member_wait(self, heatclient_, device_dict, device_id):
+        stack_id, resource_name = self._split_instance_id(device_id)
+        stack = self._get_group_stack(heatclient_, stack_id)
+        stack_retries, retry_wait = self._get_stack_polling()
+        while (stack.stack_status == 'CREATE_IN_PROGRESS' and
+               stack_retries > 0):
+            self._stack_events.wait(stack_id, retry_wait)
+            stack = self._get_group_stack(heatclient_, stack_id)
+            stack_retries = stack_retries - 1
+
+        if stack.stack_status != 'CREATE_COMPLETE':
+            # other members may have failed the stack, look at this one only
+            resource = heatclient_.resource_get(stack_id, resource_name)
+            if resource.resource_status != 'CREATE_COMPLETE':
+                raise vnfm.DeviceCreateWaitFailed(
+                    device_id=device_id,
+                    reason=resource.resource_status_reason)
+        self._set_mgmt_url(device_dict, stack.outputs, resource_name + ':')
+
     def create_wait(self, plugin, context, device_dict, device_id, auth_attr):
         region_name = device_dict.get('placement_attr', {}).get(
             'region_name', None)
         heatclient_ = HeatClient(auth_attr, region_name)
+        if GROUP_SEPARATOR in device_id:
+            self._create_group_member_wait(heatclient_, device_dict,
+                                           device_id)
+            return
+
+        if CONF.tacker_heat.track_stack_events:
+            self._create_wait_events(plugin, context, heatclient_,
+                                     device_dict, device_id)
+            return
 
         stack = heatclient_.get(device_id)
         status = stack.stack_status
-        stack_retries = STACK_RETRIES
+        stack_retries, retry_wait = self._get_stack_polling()
         error_reason = None
         while status == 'CREATE_IN_PROGRESS' and stack_retries > 0:
-            time.sleep(STACK_RETRY_WAIT)
+            self._stack_events.wait(device_id, retry_wait)
             try:
                 stack = heatclient_.get(device_id)
             except Exception:
@@ -453,15 +724,70 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
             raise vnfm.DeviceCreateWaitFailed(device_id=device_id,
                                               reason=error_reason)
 
-        outputs = stack.outputs
-        LOG.debug(_('outputs %s'), outputs)
-        PREFIX = 'mgmt_ip-'
-        mgmt_ips = dict((output['output_key'][len(PREFIX):],
-                         output['output_value'])
-                        for output in outputs
-                        if output.get('output_key', '').startswith(PREFIX))
-        if mgmt_ips:
-            device_dict['mgmt_url'] = jsonutils.dumps(mgmt_ips)
+        self._set_mgmt_url(device_dict, stack.outputs)
+
+    @staticmethod
+    def _count_template_resources(device_dict):
+        heat_template = device_dict['attributes'].get('heat_template')
+        try:
+            return len(yaml.safe_load(heat_template)['resources'])
+        except Exception:
+            return None
+
+    def _create_wait_events(self, plugin, context, heatclient_, device_dict,
+                            stack_id):
+        """Wait for a stack by following its events.
+
+        Only the events after the last one seen are fetched on each poll,
+        the stack itself is fetched once it is done.
+        """
+        total = self._count_template_resources(device_dict)
+        completed = set()
+        marker = None
+        status = None
+        stack_retries, retry_wait = self._get_stack_polling()
+        while True:
+            events = heatclient_.events_list(stack_id, marker=marker,
+                                             sort_dir='asc')
+            for event in events:
+                marker = event.id
+                if event.physical_resource_id == stack_id:
+                    if event.resource_status in ('CREATE_COMPLETE',
+                                                 'CREATE_FAILED'):
+                        status = event.resource_status
+                elif event.resource_status == 'CREATE_COMPLETE':
+                    completed.add(event.resource_name)
+            if events and plugin is not None:
+                if total:
+                    progress = _('{done}/{total} resources complete').format(
+                        done=len(completed), total=total)
+                else:
+                    progress = _('{done} resources complete').format(
+                        done=len(completed))
+                plugin.set_device_progress(context, device_dict['id'],
+                                           progress)
+            if status is not None or stack_retries == 0:
+                break
+            self._stack_events.wait(stack_id, retry_wait)
+            stack_retries = stack_retries - 1
+
+        if status is None:
+            error_reason = _("Resource creation is not completed within"
+                             " {wait} seconds as creation of stack {stack}"
+                             " is not completed").format(
+                                 wait=(STACK_RETRIES * STACK_RETRY_WAIT),
+                                 stack=stack_id)
+            LOG.warning(_("VNF Creation failed: %(reason)s"),
+                        {'reason': error_reason})
+            raise vnfm.DeviceCreateWaitFailed(device_id=stack_id,
+                                              reason=error_reason)
+
+        # the outputs are only needed once the stack is done
+        stack = heatclient_.get(stack_id)
+        if stack.stack_status != 'CREATE_COMPLETE':
+            raise vnfm.DeviceCreateWaitFailed(
+                device_id=stack_id, reason=stack.stack_status_reason)
+        self._set_mgmt_url(device_dict, stack.outputs)
 
     @log.log
     def update(self, plugin, context, device_id, device_dict, device,
@@ -469,7 +795,13 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
         region_name = device_dict.get('placement_attr', {}).get(
             'region_name', None)
         heatclient_ = HeatClient(auth_attr, region_name)
-        heatclient_.get(device_id)
+        stack = heatclient_.get(self._split_instance_id(device_id)[0])
+
+        scale = device['device'].get('attributes', {}).get('scale')
+        if scale:
+            self._scale(heatclient_, device_id, scale)
+            device_dict.setdefault('attributes', {})[SCALE_UPDATED_TIME] = (
+                stack.updated_time or '')
 
         # update config attribute
         config_yaml = device_dict.get('attributes', {}).get('config', '')
@@ -505,27 +837,211 @@ class DeviceHeat(abstract_driver.DeviceAbstractDriver):
         new_yaml = yaml.dump(config_dict)
         device_dict.setdefault('attributes', {})['config'] = new_yaml
 
+    def _scale(self, heatclient_, device_id, scale):
+        """Set the number of members of the scaling groups of a stack.
+
+        :param scale: dict of VDU name to its new number of members
+        """
+        if GROUP_SEPARATOR in device_id:
+            raise vnfm.InvalidScaleRequest(
+                vdu=', '.join(scale),
+                reason=_('VNFs in a placement group can not be scaled'))
+        template = heatclient_.stacks.template(device_id)
+        resources = template.get('resources', {})
+        for vdu_name, count in scale.items():
+            resource = resources.get(vdu_name, {})
+            count_property = SCALING_GROUP_PROPERTIES.get(
+                resource.get('type'))
+            if count_property is None:
+                raise vnfm.InvalidScaleRequest(
+                    vdu=vdu_name,
+                    reason=_('it is not a scaling group of the stack'))
+            try:
+                count = int(count)
+            except (TypeError, ValueError):
+                count = -1
+            if count < 0:
+                raise vnfm.InvalidScaleRequest(
+                    vdu=vdu_name,
+                    reason=_('the count must be a non-negative integer'))
+            resource.setdefault('properties', {})[count_property] = count
+
+        # only the changed groups are touched, heat keeps everything else
+        LOG.debug('scaling stack %(stack)s to %(scale)s',
+                  {'stack': device_id, 'scale': scale})
+        heatclient_.update(device_id, existing=True, template=template)
+
     def update_wait(self, plugin, context, device_id, auth_attr,
-                    region_name=None):
-        # do nothing but checking if the stack exists at the moment
+                    region_name=None, device_dict=None):
+        heatclient_ = HeatClient(auth_attr, region_name)
+        stack_id, resource_name = self._split_instance_id(device_id)
+        stack = heatclient_.get(stack_id)
+        if resource_name is not None:
+            # members of a placement group are never updated on heat
+            return
+
+        scaled_from = None
+        if device_dict is not None:
+            scaled_from = device_dict.get('attributes', {}).pop(
+                SCALE_UPDATED_TIME, None)
+
+        def _updating(stack):
+            if stack.stack_status == 'UPDATE_IN_PROGRESS':
+                return True
+            # the stack may not have entered the scaling update yet and
+            # still shows the status of its previous action
+            return (scaled_from is not None and
+                    (stack.updated_time or '') == scaled_from)
+
+        stack_retries, retry_wait = self._get_stack_polling()
+        wait = stack_retries * retry_wait
+        while _updating(stack) and stack_retries > 0:
+            self._stack_events.wait(stack_id, retry_wait)
+            stack = heatclient_.get(stack_id)
+            stack_retries = stack_retries - 1
+
+        if _updating(stack):
+            error_reason = _("Update of stack {stack} is not completed "
+                             "within {wait} seconds").format(
+                                 stack=stack_id, wait=wait)
+            raise vnfm.DeviceUpdateWaitFailed(reason=error_reason)
+        if stack.stack_status == 'UPDATE_FAILED':
+            raise vnfm.DeviceUpdateWaitFailed(
+                reason=stack.stack_status_reason)
+
+        # a scaled group changes the management addresses of its VDU
+        if device_dict is not None:
+            self._set_mgmt_url(device_dict, stack.outputs)
+
+    def respawn_vdu(self, plugin, context, device_dict, vdu_name,
+                    auth_attr):
+        """Replace the server of a failed VDU keeping the rest of the stack.
+
+        :return: False when the device has to be respawned as a whole
+        """
+        device_id = device_dict['instance_id']
+        if (CONF.tacker_heat.respawn_mode != 'vdu' or not vdu_name or
+                not device_id or GROUP_SEPARATOR in device_id):
+            return False
+
+        region_name = device_dict.get('placement_attr', {}).get(
+            'region_name', None)
         heatclient_ = HeatClient(auth_attr, region_name)
-        heatclient_.get(device_id)
+        try:
+            heatclient_.resource_get(device_id, vdu_name)
+        except heatException.HTTPNotFound:
+            LOG.warning(_("VDU %(vdu)s is not a resource of stack "
+                          "%(stack)s"), {'vdu': vdu_name, 'stack': device_id})
+            return False
+
+        # heat replaces the resources marked unhealthy on the next update
+        heatclient_.resource_mark_unhealthy(
+            device_id, vdu_name, _('respawned by tacker monitor'))
+        heatclient_.update(device_id, existing=True)
+
+        # the stack may not have entered the update yet, the marked resource
+        # stays CHECK_FAILED until it is replaced
+        stack_retries = STACK_RETRIES
+        while stack_retries > 0:
+            stack = heatclient_.get(device_id)
+            resource = heatclient_.resource_get(device_id, vdu_name)
+            if (not stack.stack_status.endswith('_IN_PROGRESS') and
+                    resource.resource_status != 'CHECK_FAILED'):
+                break
+            time.sleep(STACK_RETRY_WAIT)
+            stack_retries = stack_retries - 1
+
+        if stack.stack_status != 'UPDATE_COMPLETE':
+            raise vnfm.DeviceCreateWaitFailed(
+                device_id=device_id,
+                reason=stack.stack_status_reason or _(
+                    "Replacement of VDU {vdu} is not completed within "
+                    "{wait} seconds").format(
+                        vdu=vdu_name,
+                        wait=(STACK_RETRIES * STACK_RETRY_WAIT)))
+        self._set_mgmt_url(device_dict, stack.outputs)
+        return True
 
     def delete(self, plugin, context, device_id, auth_attr, region_name=None):
         heatclient_ = HeatClient(auth_attr, region_name)
-        heatclient_.delete(device_id)
+        stack_id, resource_name = self._split_instance_id(device_id)
+        if resource_name is None:
+            heatclient_.delete(device_id)
+            return
+
+        # a group member is removed by updating its stack without it.
+        # Concurrent removals would each write back the template they read,
+        # so they hold the rows of the members from reading the template
+        # until heat accepted the update.
+        for retry in range(STACK_RETRIES):
+            try:
+                with context.session.begin(subtransactions=True):
+                    plugin._lock_instance_group(context,
+                                                stack_id + GROUP_SEPARATOR)
+                    if self._remove_group_member(heatclient_, stack_id,
+                                                 resource_name):
+                        return
+            except heatException.HTTPConflict:
+                pass
+            except heatException.HTTPNotFound:
+                return
+            time.sleep(STACK_RETRY_WAIT)
+        raise vnfm.HeatClientException(
+            msg=_('stack %s is busy') % stack_id)
+
+    def _remove_group_member(self, heatclient_, stack_id, resource_name):
+        """Update the stack without the member, False while it is busy."""
+        # the template of a stack being updated may not be the one applied
+        if heatclient_.get(stack_id).stack_status.endswith('_IN_PROGRESS'):
+            return False
+        template = heatclient_.stacks.template(stack_id)
+        template['resources'].pop(resource_name, None)
+        outputs = template.get('outputs') or {}
+        for key in list(outputs):
+            if key.startswith(resource_name + ':'):
+                outputs.pop(key)
+        if not template['resources']:
+            heatclient_.delete(stack_id)
+        else:
+            heatclient_.stacks.update(stack_id, existing=True,
+                                      template=template)
+        return True
+
+    def _delete_group_member_wait(self, heatclient_, device_id):
+        stack_id, resource_name = self._split_instance_id(device_id)
+        for retry in range(STACK_RETRIES):
+            try:
+                resource = heatclient_.resource_get(stack_id, resource_name)
+            except heatException.HTTPNotFound:
+                return
+            if resource.resource_status == 'DELETE_FAILED':
+                raise vnfm.DeviceCreateWaitFailed(
+                    device_id=device_id,
+                    reason=resource.resource_status_reason)
+            time.sleep(STACK_RETRY_WAIT)
+
+        error_reason = _("Resource cleanup for device is not completed "
+                         "within {wait} seconds as {resource} of stack "
+                         "{stack} is not deleted").format(
+                             wait=(STACK_RETRIES * STACK_RETRY_WAIT),
+                             resource=resource_name, stack=stack_id)
+        raise vnfm.DeviceCreateWaitFailed(device_id=device_id,
+                                          reason=error_reason)
 
     @log.log
     def delete_wait(self, plugin, context, device_id, auth_attr,
                     region_name=None):
         heatclient_ = HeatClient(auth_attr, region_name)
+        if GROUP_SEPARATOR in device_id:
+            self._delete_group_member_wait(heatclient_, device_id)
+            return
 
         stack = heatclient_.get(device_id)
         status = stack.stack_status
         error_reason = None
-        stack_retries = STACK_RETRIES
+        stack_retries, retry_wait = self._get_stack_polling()
         while (status == 'DELETE_IN_PROGRESS' and stack_retries > 0):
-            time.sleep(STACK_RETRY_WAIT)
+            self._stack_events.wait(device_id, retry_wait)
             try:
                 stack = heatclient_.get(device_id)
             except heatException.HTTPNotFound:
@@ -562,7 +1078,10 @@ class HeatClient(object):
     def __init__(self, auth_attr, region_name=None):
         # context, password are unused
         self.heat = clients.OpenstackClients(auth_attr, region_name).heat
+        self.auth_url = auth_attr.get('auth_url')
+        self.region_name = region_name
         self.stacks = self.heat.stacks
+        self.resources = self.heat.resources
         self.resource_types = self.heat.resource_types
 
     def create(self, fields):
@@ -589,6 +1108,26 @@ class HeatClient(object):
     def get(self, stack_id):
         return self.stacks.get(stack_id)
 
+    def update(self, stack_id, **kwargs):
+        try:
+            return self.stacks.update(stack_id, **kwargs)
+        except heatException.HTTPException:
+            type_, value, tb = sys.exc_info()
+            raise vnfm.HeatClientException(msg=value)
+
+    def list(self, **kwargs):
+        return self.stacks.list(**kwargs)
+
+    def events_list(self, stack_id, **kwargs):
+        return self.heat.events.list(stack_id, **kwargs)
+
+    def resource_get(self, stack_id, resource_name):
+        return self.resources.get(stack_id, resource_name)
+
+    def resource_mark_unhealthy(self, stack_id, resource_name, reason):
+        return self.resources.mark_unhealthy(stack_id, resource_name, True,
+                                             reason)
+
     def resource_attr_support(self, resource_name, property_name):
         resource = self.resource_types.get(resource_name)
         return property_name in resource['attributes']
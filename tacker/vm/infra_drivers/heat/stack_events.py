@@ -0,0 +1,149 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import itertools
+import os
+import time
+
+import eventlet
+from eventlet import event
+from oslo_concurrency import lockutils
+from oslo_config import cfg
+from oslo_log import log as logging
+import oslo_messaging
+
+from tacker.common import rpc as n_rpc
+from tacker.i18n import _LE
+from tacker.i18n import _LW
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+OPTS = [
+    cfg.BoolOpt('stack_notifications',
+                default=False,
+                help=_("Wake up the waiters of a stack as soon as heat "
+                       "notifies the end of a stack action. Polling the "
+                       "stack is kept as a fallback")),
+    cfg.StrOpt('notification_topic',
+               default='notifications',
+               help=_("Topic heat sends its notifications to")),
+    cfg.IntOpt('notification_poll_interval',
+               default=60,
+               help=_("Interval to poll a stack while waiting for its "
+                      "notification")),
+]
+CONF.register_opts(OPTS, group='tacker_heat')
+
+# stacks that finished while nobody waited on them, remembered in case the
+# waiter shows up right after polling the old status
+FINISHED_STACKS_SIZE = 256
+
+
+class StackEvents(object):
+    """Wakes up the waiters of a stack on heat notifications.
+
+    Heat sends orchestration.stack.<action>.end when a stack action
+    completes. Waiters sleep on an event keyed by stack id instead of a
+    fixed poll interval.
+    """
+
+    filter_rule = oslo_messaging.NotificationFilter(
+        event_type=r'^orchestration\.stack\.\w+\.end$')
+
+    def __init__(self):
+        self._listener = None
+        self._pid = None
+        self._worker_lock = None
+        self._waiters = {}
+        self._finished = collections.OrderedDict()
+
+    def start(self):
+        if not CONF.tacker_heat.stack_notifications:
+            return
+        self._pid = os.getpid()
+        targets = [oslo_messaging.Target(
+            topic=CONF.tacker_heat.notification_topic)]
+        try:
+            # a pool per process: every API worker waits for the stacks it
+            # created itself, so each one has to see all of the
+            # notifications next to the other consumers of the topic. The
+            # broker keeps the queue of a pool, a restarted worker takes
+            # over the pool of the worker it replaces.
+            pool = 'tacker-%s-%d' % (CONF.host, self._worker_index())
+            self._listener = n_rpc.get_notification_listener(
+                targets, [self], pool=pool)
+            self._listener.start()
+        except Exception:
+            LOG.exception(_LE('Failed to listen to heat notifications, '
+                              'stacks are polled'))
+            self._listener = None
+
+    def _worker_index(self):
+        """Lowest index not held by another running process of the host."""
+        lock_path = CONF.oslo_concurrency.lock_path
+        if not lock_path:
+            LOG.warning(_LW('lock_path is not set, the API workers share '
+                            'one pool of heat notifications'))
+            return 0
+        for index in itertools.count():
+            # the lock is released when the process ends
+            lock = lockutils.InterProcessLock(os.path.join(
+                lock_path, 'tacker-heat-notifications-%d' % index))
+            if lock.acquire(blocking=False):
+                self._worker_lock = lock
+                return index
+
+    def _check_fork(self):
+        # the driver is loaded before the API workers are forked. The
+        # connection of the parent is not shared, a worker listens on its
+        # own on first use.
+        if self._listener is not None and self._pid != os.getpid():
+            self._listener = None
+            self.start()
+
+    @property
+    def poll_interval(self):
+        self._check_fork()
+        if self._listener is None:
+            return None
+        return CONF.tacker_heat.notification_poll_interval
+
+    def info(self, ctxt, publisher_id, event_type, payload, metadata):
+        # stack_identity is the arn of the stack ending with its id
+        stack_id = payload.get('stack_identity', '').rsplit('/', 1)[-1]
+        LOG.debug('%(event_type)s for stack %(stack)s',
+                  {'event_type': event_type, 'stack': stack_id})
+        waiter = self._waiters.get(stack_id)
+        if waiter is not None:
+            if not waiter.ready():
+                waiter.send(event_type)
+            return
+        self._finished[stack_id] = event_type
+        while len(self._finished) > FINISHED_STACKS_SIZE:
+            self._finished.popitem(last=False)
+
+    def wait(self, stack_id, timeout):
+        """Sleep until the stack ends an action or timeout seconds passed."""
+        self._check_fork()
+        if self._listener is None:
+            time.sleep(timeout)
+            return
+        if self._finished.pop(stack_id, None) is not None:
+            return
+        waiter = self._waiters.setdefault(stack_id, event.Event())
+        try:
+            with eventlet.Timeout(timeout, False):
+                waiter.wait()
+        finally:
+            if self._waiters.get(stack_id) is waiter:
+                del self._waiters[stack_id]
@@ -14,9 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
-
-
+import eventlet
+from eventlet import event
 from keystoneclient import auth as ks_auth
 from keystoneclient.auth.identity import v2 as v2_auth
 from keystoneclient import session as ks_session
@@ -39,6 +38,11 @@ OPTS = [
     cfg.StrOpt('region_name',
                help=_('Name of nova region to use. Useful if keystone manages'
                       ' more than one region.')),
+    cfg.IntOpt('server_poll_interval', default=5,
+               help=_('Interval to poll the status of the servers being '
+                      'created or deleted')),
+    cfg.IntOpt('server_wait_timeout', default=600,
+               help=_('Time to wait for a server to be created or deleted')),
 ]
 CONF.register_opts(OPTS, group=TACKER_NOVA_CONF_SECTION)
 _NICS = 'nics'          # converted by novaclient => 'networks'
@@ -68,6 +72,65 @@ class DefaultAuthPlugin(v2_auth.Password):
         return super(DefaultAuthPlugin, self).get_endpoint(session, **kwargs)
 
 
+class ServerPoller(object):
+    """Polls the servers that are waited for with one list call.
+
+    The list is limited to the servers changed since the oldest waited
+    server was fetched, deleted servers included.
+    """
+
+    def __init__(self, nova_client):
+        self._nova_client = nova_client
+        # server id -> (done, updated, event)
+        self._waiters = {}
+        self._polling = False
+
+    def wait(self, server, done, timeout):
+        """Return the status of server once done(status) or None."""
+        if done(server.status):
+            return server.status
+        waiter = event.Event()
+        self._waiters[server.id] = (done, server.updated, waiter)
+        if not self._polling:
+            self._polling = True
+            eventlet.spawn_n(self._poll)
+        try:
+            with eventlet.Timeout(timeout, False):
+                return waiter.wait()
+        finally:
+            if self._waiters.get(server.id, (None, None, None))[2] is waiter:
+                del self._waiters[server.id]
+
+    def _poll(self):
+        try:
+            while self._waiters:
+                eventlet.sleep(CONF.tacker_nova.server_poll_interval)
+                try:
+                    self.poll_once()
+                except Exception:
+                    LOG.exception(_LE('Failed to poll the nova servers'))
+        finally:
+            self._polling = False
+
+    def poll_once(self):
+        waiters = dict(self._waiters)
+        if not waiters:
+            return
+        since = min(updated for (_done, updated, _waiter)
+                    in waiters.values())
+        servers = self._nova_client().servers.list(
+            search_opts={'changes-since': since})
+        for server in servers:
+            done, _updated, waiter = waiters.get(server.id,
+                                                 (None, None, None))
+            if waiter is None or waiter.ready():
+                continue
+            LOG.debug(_('server %(server)s status: %(status)s'),
+                      {'server': server.id, 'status': server.status})
+            if done(server.status):
+                waiter.send(server.status)
+
+
 class DeviceNova(abstract_driver.DeviceAbstractDriver):
 
     """Nova driver of hosting device."""
@@ -82,8 +145,17 @@ class DeviceNova(abstract_driver.DeviceAbstractDriver):
         # avoid circular import
         from novaclient import client
         self._novaclient = client
+        self._nova = None
+        self._poller = ServerPoller(self._nova_client)
 
     def _nova_client(self, token=None):
+        # the session keeps the token and the connections to nova, so one
+        # client serves all of the requests
+        if self._nova is None:
+            self._nova = self._make_nova_client()
+        return self._nova
+
+    def _make_nova_client(self):
         auth = ks_auth.load_from_conf_options(cfg.CONF,
                                               TACKER_NOVA_CONF_SECTION)
         endpoint_override = None
@@ -230,15 +302,15 @@ class DeviceNova(abstract_driver.DeviceAbstractDriver):
     def create_wait(self, plugin, context, device_dict, device_id):
         nova = self._nova_client()
         instance = nova.servers.get(device_id)
-        status = instance.status
-        # TODO(yamahata): timeout and error
-        while status == 'BUILD':
-            time.sleep(5)
-            instance = nova.servers.get(instance.id)
-            status = instance.status
-            LOG.debug(_('status: %s'), status)
-
+        status = self._poller.wait(instance,
+                                   lambda status: status != 'BUILD',
+                                   CONF.tacker_nova.server_wait_timeout)
         LOG.debug(_('status: %s'), status)
+        if status is None:
+            raise RuntimeError(_("creation of server %(server)s is not "
+                                 "completed within %(wait)s seconds") %
+                               {'server': device_id,
+                                'wait': CONF.tacker_nova.server_wait_timeout})
         if status == 'ERROR':
             raise RuntimeError(_("creation of server %s faild") % device_id)
 
@@ -264,14 +336,20 @@ class DeviceNova(abstract_driver.DeviceAbstractDriver):
 
     def delete_wait(self, plugin, context, device_id):
         nova = self._nova_client()
-        # TODO(yamahata): timeout and error
-        while True:
-            try:
-                instance = nova.servers.get(device_id)
-                LOG.debug(_('instance status %s'), instance.status)
-            except self._novaclient.exceptions.NotFound:
-                break
-            if instance.status == 'ERROR':
-                raise RuntimeError(_("deletion of server %s faild") %
-                                   device_id)
-            time.sleep(5)
+        try:
+            instance = nova.servers.get(device_id)
+        except self._novaclient.exceptions.NotFound:
+            return
+        status = self._poller.wait(
+            instance,
+            lambda status: status in ('DELETED', 'SOFT_DELETED', 'ERROR'),
+            CONF.tacker_nova.server_wait_timeout)
+        LOG.debug(_('instance status %s'), status)
+        if status is None:
+            raise RuntimeError(_("deletion of server %(server)s is not "
+                                 "completed within %(wait)s seconds") %
+                               {'server': device_id,
+                                'wait': CONF.tacker_nova.server_wait_timeout})
+        if status == 'ERROR':
+            raise RuntimeError(_("deletion of server %s faild") %
+                               device_id)
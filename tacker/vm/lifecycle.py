@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+
+import eventlet
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from tacker import context as t_context
+from tacker.i18n import _LE, _LW
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+OPTS = [
+    cfg.IntOpt('job_lease_time', default=120,
+               help=_('Seconds a worker holds a lifecycle job before other '
+                      'tacker-server processes may take it over. The lease '
+                      'is renewed while the job is running')),
+    cfg.IntOpt('job_poll_interval', default=10,
+               help=_('Interval to look for lifecycle jobs left behind by '
+                      'dead workers or submitted by other processes')),
+    cfg.IntOpt('job_max_attempts', default=3,
+               help=_('Number of times a failing lifecycle job is retried '
+                      'before it is dropped')),
+    cfg.IntOpt('job_claim_batch', default=50,
+               help=_('Maximum number of lifecycle jobs claimed in one '
+                      'poll')),
+]
+CONF.register_opts(OPTS, group='lifecycle')
+
+
+class LifecycleExecutor(object):
+    """Runs device lifecycle steps from the durable job table.
+
+    Every step that used to live only in a greenthread is first written
+    as a job and then run by a worker greenthread holding a lease on it.
+    If the process dies, the lease expires and a poller in any
+    tacker-server process sharing the database resumes the job.
+    """
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+        self._handlers = {}
+        self.owner = '%s:%d' % (CONF.host, os.getpid())
+        self._lease_time = CONF.lifecycle.job_lease_time
+        self._poll_interval = CONF.lifecycle.job_poll_interval
+        self._max_attempts = CONF.lifecycle.job_max_attempts
+        self._claim_batch = CONF.lifecycle.job_claim_batch
+
+    def register(self, action, handler):
+        """Register handler(context, device_id, payload) for action.
+
+        The handler also receives the keyword arguments given to submit()
+        when it runs in the submitting process. They are not persisted, so
+        a resumed job runs without them.
+        """
+        self._handlers[action] = handler
+
+    def start(self):
+        eventlet.spawn_n(self._poll_jobs)
+
+    def submit(self, context, device_id, action, payload=None, **kwargs):
+        job = self._plugin._create_job(context, device_id, action, payload)
+        LOG.debug('submitted lifecycle job %(job)s', {'job': job})
+        self._plugin.spawn_n(self._dispatch, context, job['id'], **kwargs)
+        return job
+
+    def _poll_jobs(self):
+        while True:
+            eventlet.sleep(self._poll_interval)
+            try:
+                self.run_once()
+            except Exception:
+                LOG.exception(_LE('Failed to poll lifecycle jobs'))
+
+    def run_once(self):
+        context = t_context.get_admin_context()
+        job_ids = self._plugin._get_claimable_job_ids(
+            context, self._lease_time, self._claim_batch)
+        for job_id in job_ids:
+            # resumed jobs no longer have their originating request context
+            self._plugin.spawn_n(self._dispatch,
+                                 t_context.get_admin_context(), job_id)
+        return job_ids
+
+    def _heartbeat(self, job_id):
+        context = t_context.get_admin_context()
+        while True:
+            eventlet.sleep(self._lease_time / 2)
+            if not self._plugin._renew_job_lease(context, job_id, self.owner,
+                                                 self._lease_time):
+                LOG.warning(_LW('lost the lease of lifecycle job %s'),
+                            job_id)
+                return
+
+    def _dispatch(self, context, job_id, **kwargs):
+        job = self._plugin._claim_job(context, job_id, self.owner,
+                                      self._lease_time)
+        if job is None:
+            LOG.debug('lifecycle job %s is taken by another worker', job_id)
+            return
+
+        heartbeat = eventlet.spawn(self._heartbeat, job_id)
+        try:
+            handler = self._handlers[job['action']]
+            handler(context, job['device_id'], job['payload'], **kwargs)
+        except Exception:
+            LOG.exception(_LE('lifecycle job %(job_id)s %(action)s for '
+                              'device %(device_id)s failed'),
+                          {'job_id': job_id, 'action': job['action'],
+                           'device_id': job['device_id']})
+            if job['attempts'] < self._max_attempts:
+                self._plugin._release_job(context, job_id, self.owner)
+                return
+            LOG.error(_LE('giving up lifecycle job %(job_id)s after '
+                          '%(attempts)d attempts'),
+                      {'job_id': job_id, 'attempts': job['attempts']})
+        finally:
+            heartbeat.kill()
+        self._plugin._delete_job(context, job_id)
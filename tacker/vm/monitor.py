@@ -28,7 +28,7 @@ import six
 from tacker.common import clients
 from tacker.common import driver_manager
 from tacker import context as t_context
-from tacker.vm.infra_drivers.heat import heat
+from tacker.plugins.common import constants
 
 
 LOG = logging.getLogger(__name__)
@@ -149,7 +149,7 @@ class VNFMonitor(object):
 
                 if driver_return in actions:
                     action = actions[driver_return]
-                    hosting_vnf['action_cb'](hosting_vnf, action)
+                    hosting_vnf['action_cb'](hosting_vnf, action, vdu)
 
     def mark_dead(self, device_id):
         self._hosting_vnfs[device_id]['dead'] = True
@@ -176,7 +176,8 @@ class VNFMonitor(object):
 class ActionPolicy(object):
     @classmethod
     @abc.abstractmethod
-    def execute_action(cls, plugin, device_dict):
+    def execute_action(cls, plugin, device_dict, auth_attr=None, vdu=None):
+        """Run the action for device_dict whose VDU vdu failed."""
         pass
 
     _POLICIES = {}
@@ -207,7 +208,7 @@ class ActionPolicy(object):
 @ActionPolicy.register('respawn')
 class ActionRespawn(ActionPolicy):
     @classmethod
-    def execute_action(cls, plugin, device_dict):
+    def execute_action(cls, plugin, device_dict, auth_attr=None, vdu=None):
         LOG.error(_('device %s dead'), device_dict['id'])
         if plugin._mark_device_dead(device_dict['id']):
             plugin._vnf_monitor.mark_dead(device_dict['id'])
@@ -236,8 +237,34 @@ class ActionRespawn(ActionPolicy):
 
 @ActionPolicy.register('respawn', 'heat')
 class ActionRespawnHeat(ActionPolicy):
+    @staticmethod
+    def _respawn_vdu(plugin, context, device_dict, auth_attr, vdu):
+        try:
+            respawned = plugin._device_manager.invoke(
+                'heat', 'respawn_vdu', plugin=plugin, context=context,
+                device_dict=device_dict, vdu_name=vdu, auth_attr=auth_attr)
+        except Exception:
+            LOG.exception(_('failed to replace vdu %(vdu)s of device '
+                            '%(device_id)s, respawning the whole device'),
+                          {'vdu': vdu, 'device_id': device_dict['id']})
+            return False
+        if not respawned:
+            return False
+
+        device_id = device_dict['id']
+        plugin._create_device_post(context, device_id,
+                                   device_dict['instance_id'],
+                                   device_dict['mgmt_url'], device_dict)
+        plugin._create_device_status(context, device_id, constants.ACTIVE)
+        device_dict['status'] = constants.ACTIVE
+        LOG.info(_('replaced vdu %(vdu)s of device %(device_id)s'),
+                 {'vdu': vdu, 'device_id': device_id})
+        plugin.config_device(context, device_dict)
+        plugin.add_device_to_monitor(device_dict, auth_attr)
+        return True
+
     @classmethod
-    def execute_action(cls, plugin, device_dict, auth_attr):
+    def execute_action(cls, plugin, device_dict, auth_attr=None, vdu=None):
         device_id = device_dict['id']
         LOG.error(_('device %s dead'), device_id)
         if plugin._mark_device_dead(device_dict['id']):
@@ -246,17 +273,22 @@ class ActionRespawnHeat(ActionPolicy):
             failure_count = int(attributes.get('failure_count', '0')) + 1
             failure_count_str = str(failure_count)
             attributes['failure_count'] = failure_count_str
-            attributes['dead_instance_id_' + failure_count_str] = device_dict[
-                'instance_id']
             placement_attr = device_dict.get('placement_attr', {})
             region_name = placement_attr.get('region_name')
-            # kill heat stack
-            heatclient = heat.HeatClient(auth_attr=auth_attr,
-                                         region_name=region_name)
-            heatclient.delete(device_dict['instance_id'])
-
             # TODO(anyone) set the current request ctxt instead of admin ctxt
             context = t_context.get_admin_context()
+            if cls._respawn_vdu(plugin, context, device_dict, auth_attr, vdu):
+                return
+
+            attributes['dead_instance_id_' + failure_count_str] = device_dict[
+                'instance_id']
+
+            # kill heat stack. the driver only removes the nested stack of
+            # a device in a placement group
+            plugin._device_manager.invoke(
+                'heat', 'delete', plugin=plugin, context=context,
+                device_id=device_dict['instance_id'], auth_attr=auth_attr,
+                region_name=region_name)
             update_device_dict = plugin.create_device_sync(context,
                                                            device_dict)
             plugin.config_device(context, update_device_dict)
@@ -266,7 +298,7 @@ class ActionRespawnHeat(ActionPolicy):
 @ActionPolicy.register('log')
 class ActionLogOnly(ActionPolicy):
     @classmethod
-    def execute_action(cls, plugin, device_dict):
+    def execute_action(cls, plugin, device_dict, auth_attr=None, vdu=None):
         device_id = device_dict['id']
         LOG.error(_('device %s dead'), device_id)
 
@@ -274,7 +306,7 @@ class ActionLogOnly(ActionPolicy):
 @ActionPolicy.register('log_and_kill')
 class ActionLogAndKill(ActionPolicy):
     @classmethod
-    def execute_action(cls, plugin, device_dict):
+    def execute_action(cls, plugin, device_dict, auth_attr=None, vdu=None):
         device_id = device_dict['id']
         if plugin._mark_device_dead(device_dict['id']):
             plugin._vnf_monitor.mark_dead(device_dict['id'])
@@ -14,29 +14,40 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import copy
 import inspect
 import six
+import socket
+import time
 
 import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 
 from tacker.api.v1 import attributes
 from tacker.common import driver_manager
 from tacker.common.exceptions import MgmtDriverException
+from tacker.db.vm import lifecycle_db
 from tacker.db.vm import vm_db
 from tacker.extensions import vnfm
-from tacker.i18n import _LE
+from tacker.i18n import _LE, _LW
 from tacker.plugins.common import constants
+from tacker.vm import lifecycle
 from tacker.vm.mgmt_drivers import constants as mgmt_constants
 from tacker.vm import monitor
+from tacker.vm import reconciler
+from tacker.vm import standby
 from tacker.vm import vim_client
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
+READY_PROBE_TIMEOUT = 5
+READY_PROBE_MAX_INTERVAL = 16
+
 
 class VNFMMgmtMixin(object):
     OPTS = [
@@ -46,7 +57,13 @@ class VNFMMgmtMixin(object):
                    'Hosting Device/logical service '
                    'instance tacker plugin will use')),
         cfg.IntOpt('boot_wait', default=30,
-            help=_('Time interval to wait for VM to boot'))
+            help=_('Time interval to wait for VM to boot')),
+        cfg.IntOpt('config_ready_timeout', default=300,
+            help=_('Maximum time to wait for a device to become reachable '
+                   'before its config is pushed')),
+        cfg.IntOpt('config_ready_port', default=22,
+            help=_('TCP port probed for reachability of management '
+                   'addresses without a monitoring policy')),
     ]
     cfg.CONF.register_opts(OPTS, 'tacker')
 
@@ -98,7 +115,8 @@ class VNFMMgmtMixin(object):
             kwargs=kwargs)
 
 
-class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
+class VNFMPlugin(vm_db.VNFMPluginDb, lifecycle_db.LifecycleJobDbMixin,
+                 VNFMMgmtMixin):
     """VNFMPlugin which supports VNFM framework.
 
     Plugin which supports Tacker framework
@@ -110,6 +128,9 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
     ]
     cfg.CONF.register_opts(OPTS, 'tacker')
     supported_extension_aliases = ['vnfm']
+    __native_bulk_support = True
+    __native_pagination_support = True
+    __native_sorting_support = True
 
     def __init__(self):
         super(VNFMPlugin, self).__init__()
@@ -120,10 +141,38 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
             'tacker.tacker.device.drivers',
             cfg.CONF.tacker.infra_driver)
         self._vnf_monitor = monitor.VNFMonitor(self.boot_wait)
+        self._lifecycle = lifecycle.LifecycleExecutor(self)
+        self._lifecycle.register('create', self._create_device_start_job)
+        self._lifecycle.register('create_group',
+                                 self._create_device_group_job)
+        self._lifecycle.register('create_wait', self._create_device_job)
+        self._lifecycle.register('update_wait', self._update_device_job)
+        self._lifecycle.register('delete_wait', self._delete_device_job)
+        self._lifecycle.start()
+        self._reconciler = reconciler.DeviceReconciler(self, self._lifecycle)
+        self._reconciler.start()
+        self._standby_pool = standby.StandbyPool(self)
+        self._standby_pool.start()
 
     def spawn_n(self, function, *args, **kwargs):
         self._pool.spawn_n(function, *args, **kwargs)
 
+    def _get_pending_device(self, context, device_id, status):
+        try:
+            device_dict = self.get_device(context, device_id)
+        except vnfm.DeviceNotFound:
+            LOG.warning(_('device %s is gone, dropping its lifecycle job'),
+                        device_id)
+            return None
+        if device_dict['status'] != status:
+            LOG.warning(_('device %(device_id)s is %(status)s, not '
+                          '%(expected)s. dropping its lifecycle job'),
+                        {'device_id': device_id,
+                         'status': device_dict['status'],
+                         'expected': status})
+            return None
+        return device_dict
+
     ###########################################################################
     # hosting device template
 
@@ -165,23 +214,76 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
         dev_attrs = device_dict['attributes']
         mgmt_url = device_dict['mgmt_url']
         if 'monitoring_policy' in dev_attrs and mgmt_url:
-            def action_cb(hosting_vnf_, action):
+            def action_cb(hosting_vnf_, action, vdu=None):
                 action_cls = monitor.ActionPolicy.get_policy(action,
                                                              device_dict)
                 if action_cls:
                     action_cls.execute_action(self, hosting_vnf['device'],
-                                              vim_auth)
+                                              vim_auth, vdu=vdu)
 
             hosting_vnf = self._vnf_monitor.to_hosting_vnf(
                 device_dict, action_cb)
             LOG.debug('hosting_vnf: %s', hosting_vnf)
             self._vnf_monitor.add_hosting_vnf(hosting_vnf)
 
+    @staticmethod
+    def _is_port_open(mgmt_ip, port, timeout):
+        try:
+            sock = socket.create_connection((mgmt_ip, port), timeout)
+        except socket.error:
+            return False
+        sock.close()
+        return True
+
+    def _is_device_ready(self, device_dict, mgmt_ips):
+        policy = device_dict['attributes'].get('monitoring_policy')
+        vdupolicies = jsonutils.loads(policy).get('vdus', {}) if policy else {}
+        for vdu, mgmt_ip in mgmt_ips.items():
+            if not mgmt_ip:
+                continue
+            ready = False
+            for driver, driver_policy in vdupolicies.get(vdu, {}).items():
+                params = dict(driver_policy.get('monitoring_params', {}))
+                params.setdefault('mgmt_ip', mgmt_ip)
+                ready = self._vnf_monitor.monitor_call(
+                    driver, device_dict, params) is True
+                if ready:
+                    break
+            if not vdupolicies.get(vdu):
+                ready = self._is_port_open(mgmt_ip,
+                                           cfg.CONF.tacker.config_ready_port,
+                                           READY_PROBE_TIMEOUT)
+            if not ready:
+                LOG.debug('vdu %(vdu)s of device %(device_id)s is not '
+                          'ready yet', {'vdu': vdu,
+                                        'device_id': device_dict['id']})
+                return False
+        return True
+
+    def _wait_device_ready(self, device_dict):
+        mgmt_url = device_dict.get('mgmt_url')
+        if not mgmt_url:
+            eventlet.sleep(self.boot_wait)
+            return
+        mgmt_ips = jsonutils.loads(mgmt_url)
+        deadline = time.time() + cfg.CONF.tacker.config_ready_timeout
+        interval = 1
+        while not self._is_device_ready(device_dict, mgmt_ips):
+            if time.time() + interval > deadline:
+                LOG.warning(_LW('device %(device_id)s is not reachable '
+                                'after %(timeout)s seconds, pushing config '
+                                'anyway'),
+                            {'device_id': device_dict['id'],
+                             'timeout': cfg.CONF.tacker.config_ready_timeout})
+                return
+            eventlet.sleep(interval)
+            interval = min(interval * 2, READY_PROBE_MAX_INTERVAL)
+
     def config_device(self, context, device_dict):
         config = device_dict['attributes'].get('config')
         if not config:
             return
-        eventlet.sleep(self.boot_wait)      # wait for vm to be ready
+        self._wait_device_ready(device_dict)
         device_id = device_dict['id']
         update = {
             'device': {
@@ -240,11 +342,16 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
         device_dict['status'] = new_status
         self._create_device_status(context, device_id, new_status)
 
-    def get_vim(self, context, device):
+    def get_vim(self, context, device, vim_cache=None):
         region_name = device.setdefault('placement_attr', {}).get(
             'region_name', None)
-        vim_res = self.vim_client.get_vim(context, device['vim_id'],
-                                          region_name)
+        if vim_cache is None:
+            vim_cache = {}
+        key = (device['vim_id'], region_name)
+        if key not in vim_cache:
+            vim_cache[key] = self.vim_client.get_vim(
+                context, device['vim_id'], region_name)
+        vim_res = vim_cache[key]
         device['placement_attr']['vim_name'] = vim_res['vim_name']
         device['vim_id'] = vim_res['vim_id']
         return vim_res['vim_auth']
@@ -269,20 +376,144 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
                                      device_dict)
             return
         device_dict['instance_id'] = instance_id
+        self._create_device_instance(context, device_id, instance_id,
+                                     device_dict)
         return device_dict
 
+    def _create_device_job(self, context, device_id, payload):
+        device_dict = self._get_pending_device(context, device_id,
+                                               constants.PENDING_CREATE)
+        if device_dict is None:
+            return
+        vim_auth = self.get_vim(context, device_dict)
+        self._create_device_wait(context, device_dict, vim_auth)
+        self.add_device_to_monitor(device_dict, vim_auth)
+        self.config_device(context, device_dict)
+
     def create_device(self, context, device):
         device_info = device['device']
         vim_auth = self.get_vim(context, device_info)
+        device_dict = self._standby_pool.claim(context, device_info)
+        if device_dict is not None:
+            # the device is already up, only the requested config is missing
+            self.spawn_n(self.config_device, context, device_dict)
+            return device_dict
         device_dict = self._create_device(context, device_info, vim_auth)
-
-        def create_device_wait():
-            self._create_device_wait(context, device_dict, vim_auth)
-            self.add_device_to_monitor(device_dict, vim_auth)
-            self.config_device(context, device_dict)
-        self.spawn_n(create_device_wait)
+        if device_dict is not None:
+            self._lifecycle.submit(context, device_dict['id'], 'create_wait')
         return device_dict
 
+    def _create_device_start_job(self, context, device_id, payload,
+                                 vim_auth=None):
+        device_dict = self._get_pending_device(context, device_id,
+                                               constants.PENDING_CREATE)
+        if device_dict is None:
+            return
+        if vim_auth is None:
+            vim_auth = self.get_vim(context, device_dict)
+        if device_dict['instance_id'] is None:
+            driver_name = self._infra_driver_name(device_dict)
+            self.mgmt_create_pre(context, device_dict)
+            try:
+                instance_id = self._device_manager.invoke(
+                    driver_name, 'create', plugin=self, context=context,
+                    device=device_dict, auth_attr=vim_auth)
+            except Exception as e:
+                LOG.exception(_LE('failed to create device %s'), device_id)
+                device_dict['status'] = constants.ERROR
+                self.set_device_error_status_reason(context, device_id,
+                                                    six.text_type(e))
+                instance_id = None
+
+            if instance_id is None:
+                self._create_device_post(context, device_id, None, None,
+                                         device_dict)
+                self.mgmt_create_post(context, device_dict)
+                return
+            device_dict['instance_id'] = instance_id
+            self._create_device_instance(context, device_id, instance_id,
+                                         device_dict)
+        self._create_device_wait(context, device_dict, vim_auth)
+        self.add_device_to_monitor(device_dict, vim_auth)
+        self.config_device(context, device_dict)
+
+    def _create_device_group_job(self, context, device_id, payload,
+                                 vim_auth=None):
+        device_dicts = [self._get_pending_device(context, member_id,
+                                                 constants.PENDING_CREATE)
+                        for member_id in payload['device_ids']]
+        device_dicts = [device_dict for device_dict in device_dicts
+                        if device_dict and device_dict['instance_id'] is None]
+        if not device_dicts:
+            return
+        if vim_auth is None:
+            vim_auth = self.get_vim(context, device_dicts[0])
+        driver_name = self._infra_driver_name(device_dicts[0])
+        for device_dict in device_dicts:
+            self.mgmt_create_pre(context, device_dict)
+        try:
+            instance_ids = self._device_manager.invoke(
+                driver_name, 'create_group', plugin=self, context=context,
+                devices=device_dicts, auth_attr=vim_auth)
+        except Exception as e:
+            LOG.exception(_LE('failed to create device group %s'),
+                          payload['device_ids'])
+            for device_dict in device_dicts:
+                device_dict['status'] = constants.ERROR
+                self.set_device_error_status_reason(
+                    context, device_dict['id'], six.text_type(e))
+                self._create_device_post(context, device_dict['id'], None,
+                                         None, device_dict)
+                self.mgmt_create_post(context, device_dict)
+            return
+
+        for device_dict in device_dicts:
+            instance_id = instance_ids[device_dict['id']]
+            device_dict['instance_id'] = instance_id
+            self._create_device_instance(context, device_dict['id'],
+                                         instance_id, device_dict)
+            self._lifecycle.submit(context, device_dict['id'], 'create_wait')
+
+    def _group_devices(self, device_dicts, vim_auths):
+        """Split devices into groups the infra driver creates together."""
+        groups = collections.OrderedDict()
+        for device_dict, vim_auth in zip(device_dicts, vim_auths):
+            key = (self._infra_driver_name(device_dict),
+                   device_dict['template_id'], device_dict['vim_id'],
+                   device_dict['placement_attr'].get('region_name'),
+                   device_dict['attributes'].get('param_values'))
+            groups.setdefault(key, []).append((device_dict, vim_auth))
+
+        for key, members in groups.items():
+            size = self._device_manager.invoke(
+                key[0], 'get_placement_group_size') or 1
+            for index in range(0, len(members), size):
+                yield members[index:index + size]
+
+    def create_device_bulk(self, context, devices):
+        device_infos = [device['device'] for device in devices['devices']]
+        vim_cache = {}
+        vim_auths = [self.get_vim(context, device_info, vim_cache)
+                     for device_info in device_infos]
+        device_dicts = self._create_devices_pre(context, device_infos)
+        self._submit_create_jobs(context, device_dicts, vim_auths)
+        return device_dicts
+
+    def _submit_create_jobs(self, context, device_dicts, vim_auths):
+        # stacks are created by the lifecycle jobs. The decrypted vim
+        # credentials are only handed over in memory.
+        for members in self._group_devices(device_dicts, vim_auths):
+            device_dict, vim_auth = members[0]
+            if len(members) == 1:
+                self._lifecycle.submit(context, device_dict['id'], 'create',
+                                       vim_auth=vim_auth)
+            else:
+                device_ids = [member[0]['id'] for member in members]
+                self._lifecycle.submit(context, device_dict['id'],
+                                       'create_group',
+                                       {'device_ids': device_ids},
+                                       vim_auth=vim_auth)
+
     # not for wsgi, but for service to create hosting device
     # the device is NOT added to monitor.
     def create_device_sync(self, context, device):
@@ -306,8 +537,13 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
             self._device_manager.invoke(
                 driver_name, 'update_wait', plugin=self,
                 context=context, device_id=instance_id, auth_attr=vim_auth,
-                region_name=region_name)
+                region_name=region_name, device_dict=device_dict)
             self.mgmt_call(context, device_dict, kwargs)
+        except vnfm.DeviceUpdateWaitFailed as e:
+            LOG.error(_('VNF update failed'))
+            new_status = constants.ERROR
+            self.set_device_error_status_reason(context, device_dict['id'],
+                                                six.text_type(e))
         except MgmtDriverException as e:
             LOG.error(_('VNF configuration failed'))
             new_status = constants.ERROR
@@ -319,6 +555,16 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
         self._update_device_post(context, device_dict['id'],
                                  new_status, device_dict)
 
+    def _update_device_job(self, context, device_id, payload):
+        device_dict = self._get_pending_device(context, device_id,
+                                               constants.PENDING_UPDATE)
+        if device_dict is None:
+            return
+        device_dict['attributes'] = payload.get(
+            'attributes', device_dict['attributes'])
+        vim_auth = self.get_vim(context, device_dict)
+        self._update_device_wait(context, device_dict, vim_auth)
+
     def update_device(self, context, device_id, device):
         device_dict = self._update_device_pre(context, device_id)
         vim_auth = self.get_vim(context, device_dict)
@@ -340,7 +586,13 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
                 self.mgmt_update_post(context, device_dict)
                 self._update_device_post(context, device_id, constants.ERROR)
 
-        self.spawn_n(self._update_device_wait, context, device_dict, vim_auth)
+        # the updated attributes are only known in memory until the update
+        # completes, so they travel with the job
+        attributes = dict((key, value) for (key, value)
+                          in device_dict['attributes'].items()
+                          if 'vim_auth' not in key)
+        self._lifecycle.submit(context, device_id, 'update_wait',
+                               {'attributes': attributes})
         return device_dict
 
     def _delete_device_wait(self, context, device_dict, auth_attr):
@@ -369,6 +621,14 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
         device_id = device_dict['id']
         self._delete_device_post(context, device_id, e)
 
+    def _delete_device_job(self, context, device_id, payload):
+        device_dict = self._get_pending_device(context, device_id,
+                                               constants.PENDING_DELETE)
+        if device_dict is None:
+            return
+        vim_auth = self.get_vim(context, device_dict)
+        self._delete_device_wait(context, device_dict, vim_auth)
+
     def delete_device(self, context, device_id):
         device_dict = self._delete_device_pre(context, device_id)
         vim_auth = self.get_vim(context, device_dict)
@@ -402,7 +662,7 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
                 self.mgmt_delete_post(context, device_dict)
                 self._delete_device_post(context, device_id, e)
 
-        self.spawn_n(self._delete_device_wait, context, device_dict, vim_auth)
+        self._lifecycle.submit(context, device_id, 'delete_wait')
 
     def create_vnf(self, context, vnf):
         vnf['device'] = vnf.pop('vnf')
@@ -413,6 +673,18 @@ class VNFMPlugin(vm_db.VNFMPluginDb, VNFMMgmtMixin):
         vnf_response['vnfd_id'] = vnf_response.pop('template_id')
         return vnf_response
 
+    def create_vnf_bulk(self, context, vnfs):
+        devices = []
+        for vnf in vnfs['vnfs']:
+            vnf_attributes = vnf['vnf']
+            vnf_attributes['template_id'] = vnf_attributes.pop('vnfd_id')
+            devices.append({'device': vnf_attributes})
+        vnf_dicts = self.create_device_bulk(context, {'devices': devices})
+        vnf_responses = copy.deepcopy(vnf_dicts)
+        for vnf_response in vnf_responses:
+            vnf_response['vnfd_id'] = vnf_response.pop('template_id')
+        return vnf_responses
+
     def update_vnf(
             self, context, vnf_id, vnf):
         vnf['device'] = vnf.pop('vnf')
@@ -0,0 +1,223 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+
+import eventlet
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+from tacker import context as t_context
+from tacker.i18n import _LE, _LW
+from tacker.plugins.common import constants
+from tacker.vm.infra_drivers.heat import heat
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+OPTS = [
+    cfg.IntOpt('reconcile_interval', default=300,
+               help=_('Interval to look for devices left in a PENDING_* '
+                      'status without a lifecycle job. At startup a device '
+                      'not updated since the process started is '
+                      'reconciled, afterwards a device has to be found in '
+                      'the same state on two passes. 0 disables the '
+                      'reconciler')),
+]
+CONF.register_opts(OPTS, group='lifecycle')
+
+PENDING_STATES = (constants.PENDING_CREATE, constants.PENDING_UPDATE,
+                  constants.PENDING_DELETE)
+
+
+class DeviceReconciler(object):
+    """Drives devices stuck in a PENDING_* status to their real state.
+
+    Devices whose lifecycle job was lost or given up are looked up on
+    their VIM with one stack list call per VIM/region and either
+    finished directly or handed back to the lifecycle executor.
+    """
+
+    def __init__(self, plugin, executor):
+        self._plugin = plugin
+        self._executor = executor
+        self._interval = CONF.lifecycle.reconcile_interval
+        self._started_at = timeutils.utcnow()
+        # device id -> status of devices without a job on the last pass,
+        # None before the startup pass
+        self._suspects = None
+
+    def start(self):
+        if self._interval > 0:
+            eventlet.spawn_n(self._reconcile_devices)
+
+    def _reconcile_devices(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                LOG.exception(_LE('Failed to reconcile pending devices'))
+            eventlet.sleep(self._interval)
+
+    def run_once(self):
+        context = t_context.get_admin_context()
+        devices = self._plugin.get_devices(
+            context, filters={'status': list(PENDING_STATES)})
+        jobs = self._plugin._get_jobs_by_device(
+            context, [device['id'] for device in devices])
+        busy = set(job['device_id'] for job in jobs)
+
+        # a request may still be between marking the device pending and
+        # submitting its job, so only act on what was already idle last time
+        suspects = dict((device['id'], device['status'])
+                        for device in devices if device['id'] not in busy)
+        if self._suspects is None:
+            # the requests that left a device untouched since before this
+            # process started are gone
+            idle = set()
+            if suspects:
+                idle = self._plugin._get_devices_updated_before(
+                    context, list(suspects), self._started_at)
+            stuck = [device for device in devices if device['id'] in idle]
+        else:
+            stuck = [device for device in devices
+                     if self._suspects.get(device['id']) ==
+                     device['status'] and
+                     suspects.get(device['id']) == device['status']]
+        self._suspects = suspects
+
+        regions = collections.defaultdict(list)
+        for device in stuck:
+            driver_name = self._plugin._infra_driver_name(device)
+            if driver_name != 'heat':
+                LOG.warning(_LW('can not reconcile device %(device_id)s '
+                                'of infra driver %(driver)s'),
+                            {'device_id': device['id'],
+                             'driver': driver_name})
+                continue
+            region_name = device['placement_attr'].get('region_name')
+            regions[(device['vim_id'], region_name)].append(device)
+
+        for (vim_id, region_name), region_devices in regions.items():
+            try:
+                self._reconcile_region(context, region_name, region_devices)
+            except Exception:
+                LOG.exception(_LE('Failed to reconcile devices on vim '
+                                  '%(vim_id)s region %(region)s'),
+                              {'vim_id': vim_id, 'region': region_name})
+        return [device['id'] for device in stuck]
+
+    def _reconcile_region(self, context, region_name, devices):
+        vim_auth = self._plugin.get_vim(context, devices[0])
+        heatclient_ = heat.HeatClient(vim_auth, region_name)
+        stacks = list(heatclient_.list())
+        LOG.debug('reconciling %(count)d devices against %(stacks)d stacks '
+                  'in region %(region)s', {'count': len(devices),
+                                           'stacks': len(stacks),
+                                           'region': region_name})
+        for device in devices:
+            stack = self._find_stack(device, stacks)
+            LOG.info(_('reconciling device %(device_id)s %(status)s with '
+                       'stack %(stack)s'),
+                     {'device_id': device['id'], 'status': device['status'],
+                      'stack': stack and stack.stack_status})
+            try:
+                if device['status'] == constants.PENDING_CREATE:
+                    self._reconcile_create(context, device, stack)
+                elif device['status'] == constants.PENDING_UPDATE:
+                    self._reconcile_update(context, device, stack)
+                else:
+                    self._reconcile_delete(context, device, stack, vim_auth)
+            except Exception:
+                LOG.exception(_LE('Failed to reconcile device %s'),
+                              device['id'])
+
+    @staticmethod
+    def _find_stack(device, stacks):
+        instance_id = device['instance_id']
+        if instance_id:
+            # devices of a placement group share their stack
+            instance_id = heat.DeviceHeat._split_instance_id(instance_id)[0]
+        for stack in stacks:
+            if instance_id:
+                if stack.id == instance_id:
+                    return stack
+            # the stack id is not recorded when the worker died right after
+            # asking heat for it, but the stack name carries the device id
+            elif stack.stack_name.endswith('-' + device['id']):
+                return stack
+
+    @staticmethod
+    def _failed(stack):
+        return stack.stack_status.endswith('_FAILED')
+
+    def _set_error(self, context, device, reason):
+        device['status'] = constants.ERROR
+        self._plugin.set_device_error_status_reason(context, device['id'],
+                                                    reason)
+
+    def _reconcile_create(self, context, device, stack):
+        if stack is None or self._failed(stack):
+            instance_id = stack and (device['instance_id'] or stack.id)
+            self._set_error(context, device,
+                            stack and stack.stack_status_reason or
+                            _('stack for the device is not found'))
+            self._plugin._create_device_post(context, device['id'],
+                                             instance_id, None, device)
+            self._plugin.mgmt_create_post(context, device)
+            return
+
+        if not device['instance_id']:
+            device['instance_id'] = stack.id
+            self._plugin._create_device_instance(context, device['id'],
+                                                 stack.id, device)
+        # the management url comes from the stack outputs
+        self._executor.submit(context, device['id'], 'create_wait')
+
+    def _reconcile_update(self, context, device, stack):
+        if stack is None or self._failed(stack):
+            self._set_error(context, device,
+                            stack and stack.stack_status_reason or
+                            _('stack for the device is not found'))
+            self._plugin.mgmt_update_post(context, device)
+            self._plugin._update_device_post(context, device['id'],
+                                             constants.ERROR, device)
+            return
+
+        # the requested attributes died with the job, re-apply what is stored
+        attributes = dict((key, value) for (key, value)
+                          in device['attributes'].items()
+                          if 'vim_auth' not in key)
+        self._executor.submit(context, device['id'], 'update_wait',
+                              {'attributes': attributes})
+
+    def _reconcile_delete(self, context, device, stack, vim_auth):
+        if stack is None or stack.stack_status == 'DELETE_COMPLETE':
+            self._plugin.mgmt_delete_post(context, device)
+            self._plugin._delete_device_post(context, device['id'], None)
+            return
+
+        if stack.stack_status == 'DELETE_FAILED':
+            self._set_error(context, device, stack.stack_status_reason)
+            self._plugin.mgmt_delete_post(context, device)
+            self._plugin._delete_device_post(context, device['id'],
+                                             stack.stack_status_reason)
+            return
+
+        if stack.stack_status != 'DELETE_IN_PROGRESS':
+            # the worker died before the delete request reached heat
+            self._plugin._device_manager.invoke(
+                'heat', 'delete', plugin=self._plugin, context=context,
+                device_id=device['instance_id'] or stack.id,
+                auth_attr=vim_auth,
+                region_name=device['placement_attr'].get('region_name'))
+        self._executor.submit(context, device['id'], 'delete_wait')
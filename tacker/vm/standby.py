@@ -0,0 +1,191 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import time
+
+import eventlet
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from tacker import context as t_context
+from tacker.i18n import _LE, _LW
+from tacker.plugins.common import constants
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+OPTS = [
+    cfg.ListOpt('pools', default=[],
+                help=_('Standby pools as <vnfd id>:<vim id>:<size>. That '
+                       'many ACTIVE devices of the VNFD are kept ready on '
+                       'the VIM and handed out to VNF create requests '
+                       'without parameters')),
+    cfg.IntOpt('refill_interval', default=30,
+               help=_('Interval to check and refill the standby pools')),
+]
+CONF.register_opts(OPTS, group='standby_pool')
+
+# attributes a create request may carry and still get a standby device.
+# anything else changes how the device is instantiated.
+CLAIMABLE_ATTRIBUTES = ('config', )
+
+
+class StandbyPool(object):
+    """Keeps pre-instantiated devices ready for VNF create requests.
+
+    A create request for a VNFD and VIM with a pool takes over one of the
+    ACTIVE standby devices instead of instantiating a new one. A
+    greenthread creates replacements in the background.
+    """
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+        self._interval = CONF.standby_pool.refill_interval
+        self._sizes = {}
+        for pool in CONF.standby_pool.pools:
+            try:
+                template_id, vim_id, size = pool.split(':')
+                self._sizes[(template_id, vim_id)] = int(size)
+            except ValueError:
+                LOG.error(_LE('invalid standby pool %s'), pool)
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        # pool key -> time the pool was first found short of devices
+        self._short_since = {}
+
+    def start(self):
+        if self._sizes:
+            eventlet.spawn_n(self._refill_pools)
+
+    def _refill_pools(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                LOG.exception(_LE('Failed to refill standby pools'))
+            eventlet.sleep(self._interval)
+
+    def claim(self, context, device):
+        """Return a standby device taken over for device or None."""
+        key = (device['template_id'], device['vim_id'])
+        if key not in self._sizes:
+            return None
+        if (device.get('placement_attr', {}).get('region_name') or
+                set(device.get('attributes') or {}) -
+                set(CLAIMABLE_ATTRIBUTES)):
+            return None
+
+        device_dict = self._plugin._claim_standby_device(
+            context, key[0], key[1], device)
+        if device_dict is None:
+            self.misses[key] += 1
+            LOG.warning(_LW('standby pool of vnfd %(template_id)s on vim '
+                            '%(vim_id)s is empty'),
+                        {'template_id': key[0], 'vim_id': key[1]})
+            return None
+        self.hits[key] += 1
+        LOG.info(_('device %(device_id)s taken from the standby pool of '
+                   'vnfd %(template_id)s on vim %(vim_id)s'),
+                 {'device_id': device_dict['id'], 'template_id': key[0],
+                  'vim_id': key[1]})
+        return device_dict
+
+    def stats(self):
+        """Return the state of each pool for monitoring."""
+        context = t_context.get_admin_context()
+        now = time.time()
+        stats = []
+        for (template_id, vim_id), size in self._sizes.items():
+            devices = self._plugin._get_standby_devices(context, template_id,
+                                                        vim_id)
+            key = (template_id, vim_id)
+            since = self._short_since.get(key)
+            stats.append({
+                'vnfd_id': template_id, 'vim_id': vim_id, 'size': size,
+                'ready': len([device for device in devices
+                              if device.status == constants.ACTIVE]),
+                'hits': self.hits[key], 'misses': self.misses[key],
+                'refill_lag': since and int(now - since) or 0})
+        return stats
+
+    def run_once(self):
+        context = t_context.get_admin_context()
+        for (template_id, vim_id), size in self._sizes.items():
+            try:
+                self._refill(context, template_id, vim_id, size)
+            except Exception:
+                LOG.exception(_LE('Failed to refill the standby pool of '
+                                  'vnfd %(template_id)s on vim %(vim_id)s'),
+                              {'template_id': template_id, 'vim_id': vim_id})
+        for stat in self.stats():
+            LOG.info(_('standby pool of vnfd %(vnfd_id)s on vim %(vim_id)s: '
+                       '%(ready)d of %(size)d ready, %(hits)d hits, '
+                       '%(misses)d misses, refill lag %(refill_lag)ds'),
+                     stat)
+
+    def _count_live(self, devices):
+        return len([device for device in devices
+                    if device.status not in (constants.ERROR,
+                                             constants.PENDING_DELETE)])
+
+    def _refill(self, context, template_id, vim_id, size):
+        key = (template_id, vim_id)
+        devices = self._plugin._get_standby_devices(context, template_id,
+                                                    vim_id)
+        for device in devices:
+            if device.status == constants.ERROR:
+                # a broken standby device is never handed out, replace it
+                LOG.warning(_LW('removing standby device %s in error'),
+                            device.id)
+                self._plugin.delete_device(context, device.id)
+
+        if self._count_live(devices) >= size:
+            self._short_since.pop(key, None)
+            return
+        self._short_since.setdefault(key, time.time())
+
+        template = self._plugin.get_device_template(context, template_id)
+        standby_device = {
+            'tenant_id': template['tenant_id'],
+            'template_id': template_id,
+            'vim_id': vim_id,
+            'name': 'standby-' + template['name'],
+            'description': template.get('description', ''),
+            'standby': True,
+            'attributes': {},
+            'placement_attr': {},
+        }
+        vim_auth = self._plugin.get_vim(context, standby_device)
+
+        # every API worker runs a refill greenthread. The template row lock
+        # serializes them, so each one counts the devices the others have
+        # just inserted and the pool is topped up only once.
+        with context.session.begin(subtransactions=True):
+            self._plugin._lock_device_template(context, template_id)
+            count = size - self._count_live(
+                self._plugin._get_standby_devices(context, template_id,
+                                                  vim_id))
+            if count <= 0:
+                return
+            LOG.debug('creating %(count)d standby devices of vnfd '
+                      '%(template_id)s on vim %(vim_id)s',
+                      {'count': count, 'template_id': template_id,
+                       'vim_id': vim_id})
+            device_dicts = self._plugin._create_devices_pre(
+                context, [dict(standby_device, attributes={},
+                               placement_attr=dict(
+                                   standby_device['placement_attr']))
+                          for _i in range(count)])
+
+        # the stacks are only created once the devices are committed
+        self._plugin._submit_create_jobs(context, device_dicts,
+                                         [vim_auth] * count)
@@ -153,6 +153,13 @@ def add_resources_tpl(heat_dict, hot_res_tpl):
             }
 
 
+@log.log
+def add_existing_resources(heat_dict, existing_res):
+    for res, res_dict in iteritems(existing_res):
+        for vdu, res_id in iteritems(res_dict):
+            heat_dict["resources"][vdu]["properties"][res] = res_id
+
+
 @log.log
 def convert_unsupported_res_prop(heat_dict, unsupported_res_prop):
     res_dict = heat_dict['resources']
@@ -177,7 +184,7 @@ def convert_unsupported_res_prop(heat_dict, unsupported_res_prop):
 
 @log.log
 def post_process_heat_template(heat_tpl, mgmt_ports, res_tpl,
-                               unsupported_res_prop=None):
+                               unsupported_res_prop=None, existing_res=None):
     #
     # TODO(bobh) - remove when heat-translator can support literal strings.
     #
@@ -200,6 +207,8 @@ def post_process_heat_template(heat_tpl, mgmt_ports, res_tpl,
             heat_dict['outputs'] = output
         LOG.debug(_('Added output for %s'), outputname)
     add_resources_tpl(heat_dict, res_tpl)
+    if existing_res:
+        add_existing_resources(heat_dict, existing_res)
     if unsupported_res_prop:
         convert_unsupported_res_prop(heat_dict, unsupported_res_prop)
     return yaml.dump(heat_dict)
@@ -13,7 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import os
+import time
 
 from cryptography.fernet import Fernet
 from oslo_config import cfg
@@ -28,27 +30,91 @@ CONF = cfg.CONF
 
 OPTS = [
     cfg.StrOpt(
-        'default_vim', help=_('Default VIM for launching VNFs'))
+        'default_vim', help=_('Default VIM for launching VNFs')),
+    cfg.IntOpt(
+        'vim_auth_cache_ttl', default=300,
+        help=_('Seconds the decrypted auth of a VIM is kept in memory for '
+               'VNF requests. 0 disables the cache')),
 ]
 cfg.CONF.register_opts(OPTS, 'nfvo_vim')
 
 
 class VimClient(object):
+    # (tenant id or None for admin, vim id or name) -> (expiry, key file
+    # mtime, vim info, vim auth). Shared by all the clients of the process
+    # and only ever kept in memory.
+    _cache = {}
+
+    @classmethod
+    def invalidate(cls, vim_id=None):
+        """Forget the cached auth of vim_id or of all VIMs."""
+        for key, entry in list(cls._cache.items()):
+            if vim_id is None or entry[2]['id'] == vim_id:
+                cls._cache.pop(key, None)
+
+    @staticmethod
+    def _cache_key(context, vim_ref):
+        # the VIMs a non admin context sees are scoped to its tenant
+        return (None if context.is_admin else context.tenant_id, vim_ref)
+
+    def _get_cached(self, context, vim_ref):
+        key = self._cache_key(context, vim_ref)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expiry, mtime, vim_info, vim_res = entry
+        if expiry < time.time() or mtime != self._vim_key_mtime(
+                vim_info['id']):
+            self._cache.pop(key, None)
+            return None
+        return vim_info, copy.deepcopy(vim_res)
+
+    def _set_cached(self, context, vim_ref, vim_info, vim_res):
+        ttl = CONF.nfvo_vim.vim_auth_cache_ttl
+        if ttl <= 0:
+            return
+        mtime = self._vim_key_mtime(vim_info['id'])
+        if mtime is None:
+            return
+        cached_info = {'id': vim_info['id'],
+                       'placement_attr': vim_info['placement_attr']}
+        self._cache[self._cache_key(context, vim_ref)] = (
+            time.time() + ttl, mtime, cached_info, copy.deepcopy(vim_res))
+
     def get_vim(self, context, vim_id=None, region_name=None):
         """Get Vim information for provided VIM id
 
         Initiate the NFVO plugin, request VIM information for the provided
         VIM id and validate region
         """
-        nfvo_plugin = manager.TackerManager.get_service_plugins().get(
-            constants.NFVO)
-
-        if not vim_id:
+        if vim_id:
+            vim_ref = vim_id
+        else:
             LOG.debug(_('VIM id not provided. Attempting to find default '
                         'VIM id'))
             vim_name = cfg.CONF.nfvo_vim.default_vim
             if not vim_name:
                 raise nfvo.VimDefaultNameNotDefined()
+            vim_ref = ('name', vim_name)
+
+        cached = self._get_cached(context, vim_ref)
+        if cached:
+            vim_info, vim_res = cached
+            LOG.debug('VIM auth of vim %s found in cache', vim_info['id'])
+        else:
+            vim_info, vim_res = self._load_vim(context, vim_id)
+            self._set_cached(context, vim_ref, vim_info, vim_res)
+        if region_name and not self.region_valid(vim_info['placement_attr']
+                                                 ['regions'], region_name):
+            raise nfvo.VimRegionNotFoundException(region_name=region_name)
+        return vim_res
+
+    def _load_vim(self, context, vim_id):
+        nfvo_plugin = manager.TackerManager.get_service_plugins().get(
+            constants.NFVO)
+
+        if not vim_id:
+            vim_name = cfg.CONF.nfvo_vim.default_vim
             try:
                 vim_info = nfvo_plugin.get_vim_by_name(context, vim_name,
                                                        mask_password=False)
@@ -62,14 +128,10 @@ class VimClient(object):
             except Exception:
                 raise nfvo.VimNotFoundException(vim_id=vim_id)
         LOG.debug(_('VIM info found for vim id %s'), vim_id)
-        if region_name and not self.region_valid(vim_info['placement_attr']
-                                                 ['regions'], region_name):
-            raise nfvo.VimRegionNotFoundException(region_name=region_name)
-
         vim_auth = self._build_vim_auth(vim_info)
         vim_res = {'vim_auth': vim_auth, 'vim_id': vim_info['id'],
                    'vim_name': vim_info.get('name', vim_info['id'])}
-        return vim_res
+        return vim_info, vim_res
 
     @staticmethod
     def region_valid(vim_regions, region_name):
@@ -97,6 +159,14 @@ class VimClient(object):
             raise nfvo.VimNotFoundException('Unable to decode VIM auth key')
         return f.decrypt(cred)
 
+    @staticmethod
+    def _vim_key_mtime(vim_id):
+        try:
+            return os.stat(os.path.join(CONF.vim_keys.openstack,
+                                        vim_id)).st_mtime
+        except OSError:
+            return None
+
     @staticmethod
     def _find_vim_key(vim_id):
         key_file = os.path.join(CONF.vim_keys.openstack, vim_id)